@@ -17,20 +17,32 @@ import os
 import random
 import re
 import sys
+import time
 import traceback
 from datetime import datetime
 from itertools import chain
+from typing import List
 
 import aiohttp
 import discord
 
 from scripts.base.dbconn import DBConnector
-from scripts.helpers.logger import CustomLogger
+from scripts.base.pokemirror import CollectionMirror
+from scripts.helpers.charts import ChartRenderer
+from scripts.helpers.event_log import EventSink
+from scripts.helpers.hot_reload import HotReloader, diff_configs
+from scripts.helpers.jobs import JobQueue
+from scripts.helpers.logger import LEVELS, CustomLogger
+from scripts.helpers.loop_monitor import LoopMonitor
+from scripts.helpers.metrics import BotMetrics, instrument
+from scripts.helpers.profiler import MemoryTracker, SamplingProfiler
+from scripts.helpers.registry import CommandRegistry
+from scripts.helpers.spawn_recorder import SpawnRecorder
 from scripts.helpers.stats_monitor import StatsMonitor
 from scripts.helpers.utils import (
     OverriddenMessage, SnoozeSpam, TaskTracker, check_for_updates,
-    get_ascii, get_formatted_time,
-    get_rand_headers, parse_command,
+    db_maintainer, get_ascii, get_formatted_time,
+    get_rand_headers, parse_command, pokelog_checker,
     prettify_discord, sleep_handler
 )
 
@@ -66,33 +78,133 @@ class PokeBall(discord.Client):
         self.autocatcher_enabled = False
         self.lock = asyncio.Lock(loop=self.loop)
         self.verified = True
+        self.configs = {}
         self.update_configs()
         # Classes
-        self.logger = CustomLogger(self.error_log_path)
-        self.stats = StatsMonitor(self)
+        self.logger = CustomLogger(
+            self.error_log_path,
+            level=self.configs.get("console_log_level", "info"),
+            max_bytes=self.configs.get("error_log_max_kb", 1024) * 1024,
+            backup_count=self.configs.get("error_log_backups", 5)
+        )
         self.database = DBConnector(self.pokedb_path)
+        self.metrics = BotMetrics(self)
+        db_observers = []
+        if self.configs.get("event_log", True):
+            self.logger.attach_sink(EventSink(
+                retention_days=self.configs.get("event_log_retention_days", 14)
+            ))
+            db_observers.append(self.__log_db_event)
+        if self.metrics.port:
+            db_observers.append(self.metrics.observe_db)
+            self.metrics.start()
+        if db_observers:
+            instrument(self.database, db_observers)
         self.database.create_caught_table()
+        self.database.create_summary_table()
+        self.database.create_spawns_table()
+        self.database.create_stats_table()
+        self.database.create_jobs_table()
+        self.stats = StatsMonitor(self)
+        self.spawn_recorder = SpawnRecorder(self)
+        self.charts = ChartRenderer()
+        self.loop_monitor = LoopMonitor(self)
+        self.loop_monitor.configure_debug(self.loop)
+        self.profiler = SamplingProfiler()
+        self.mem_tracker = MemoryTracker()
+        if self.configs.get("collection_mirror", False):
+            self.database.attach_mirror(
+                CollectionMirror.from_db(self.database)
+            )
         # Commands
         self.task_tracker = TaskTracker(self)
+        self.jobs = JobQueue(self)
         self.user_changed = {}
+        self.registry = CommandRegistry()
         for module in os.listdir("scripts/commands"):
             if module.endswith("commands.py"):
                 module_type = module.split("commands.py")[0]
                 self.load_commands(module_type)
+        self.hot_reloader = HotReloader(self)
 
-    def update_configs(self):
+    def update_configs(self) -> List[str]:
         """
         Get the latest configs loaded into the running bot.
+        Returns the keys which changed.
         """
         with open(self.config_path, encoding='utf-8') as cfg_file:
-            self.configs = json.load(cfg_file)
-        self.autocatcher_enabled = self.configs["autocatcher"]
-        self.autolog = self.configs["autolog"]
-        self.guild_mode = self.configs["default_guildmode"]
-        self.channel_mode = self.configs["default_channelmode"]
+            configs = json.load(cfg_file)
+        return self.apply_configs(configs)
+
+    def apply_configs(self, configs: dict) -> List[str]:
+        """
+        Swaps in the configs and recomputes only the state derived from the changed keys.
+        Everything is derived on the first load.
+        Returns the keys which changed.
+        """
+        changed = diff_configs(self.configs, configs)
+        first_load = not self.configs
+        self.configs = configs
+        derivers = [
+            (
+                ("autocatcher", "autolog", "default_guildmode", "default_channelmode",
+                 "owner_id", "command_prefix", "priority_only"),
+                self.__derive_settings
+            ),
+            (("priority", "avoid"), self.__derive_name_sets),
+            (
+                ("blacklist_channels", "whitelist_channels",
+                 "blacklist_guilds", "whitelist_guilds"),
+                self.__derive_filters
+            ),
+            (("clone_id",), self.__derive_catch_prefix),
+            (("console_log_level",), self.__derive_log_level)
+        ]
+        for keys, deriver in derivers:
+            if first_load or changed.intersection(keys):
+                deriver(first_load, changed)
+        return sorted(changed)
+
+    def __derive_settings(self, first_load: bool, changed: set):
+        # On a reload, toggles flipped with commands survive unless their key changed.
+        attrs = {
+            "autocatcher_enabled": "autocatcher",
+            "autolog": "autolog",
+            "guild_mode": "default_guildmode",
+            "channel_mode": "default_channelmode",
+            "priority_only": "priority_only"
+        }
+        for attr, key in attrs.items():
+            if first_load or key in changed:
+                setattr(self, attr, self.configs[key])
         self.owner_id = int(self.configs['owner_id'])
         self.prefix = self.configs['command_prefix']
-        self.priority_only = self.configs["priority_only"]
+
+    def __derive_name_sets(self, *args):
+        self.priority_names = frozenset(
+            poke.title() for poke in self.configs['priority']
+        )
+        self.avoid_names = frozenset(
+            poke.lower() for poke in self.configs['avoid']
+        )
+
+    def __derive_filters(self, *args):
+        self.filters = {
+            key: frozenset(self.configs[key])
+            for key in (
+                "blacklist_channels", "whitelist_channels",
+                "blacklist_guilds", "whitelist_guilds"
+            )
+        }
+
+    def __derive_catch_prefix(self, *args):
+        if self.catcher is not None:
+            self.catcher.pref = f'<@{int(self.configs["clone_id"])}> '
+
+    def __derive_log_level(self, *args):
+        if getattr(self, "logger", None) is not None:
+            level = str(self.configs.get("console_log_level", "info")).lower()
+            self.logger.level = LEVELS.get(level, LEVELS["info"])
 
     def load_commands(
         self, module_type: str,
@@ -100,7 +212,8 @@ class PokeBall(discord.Client):
     ):
         """
         Import all the command modules.
-        If reload_module=True, existing module will be reloaded.
+        If reload_module=True, existing module will be reloaded,
+        taking over the state of the old instance.
         """
         if reload_module:
             module = importlib.reload(
@@ -112,7 +225,12 @@ class PokeBall(discord.Client):
             )
         cmd_class = getattr(module, f"{module_type.title()}Commands")
         cmd_obj = cmd_class(ctx=self, database=self.database, logger=self.logger)
+        old_obj = getattr(self, f"{module_type}commands", None)
+        if reload_module and old_obj is not None:
+            # Running commands keep their bound methods of the old instance.
+            cmd_obj.carry_over(old_obj)
         setattr(self, f"{module_type}commands", cmd_obj)
+        self.registry.register(module_type, cmd_obj)
         if module_type == "advanced":
             self.advanced = True
         return cmd_obj
@@ -140,7 +258,10 @@ class PokeBall(discord.Client):
         # Captcha Lock
         if any([
             all([
-                self.stats.total("catches") >= random.randint(995, 999),
+                # Stats survive restarts, so only the last 24 hrs are counted.
+                self.stats.window_total(
+                    "catches", 24 * 60 * 60
+                ) >= random.randint(995, 999),
                 (
                     datetime.now() - self.start_time
                 ).total_seconds() < (24 * 60 * 60)
@@ -203,15 +324,56 @@ class PokeBall(discord.Client):
                 catcher = getattr(customcommands, "Autocatcher", catcher)
             self.catcher = catcher(self, self.database, self.logger)
             self.loop.create_task(self.stats.checkpointer())
+        self.spawn_recorder.start()
         self.ready = True
         if "sleep_handler" not in [
             task._coro.__name__
             for task in asyncio.all_tasks()
         ]:
             self.loop.create_task(sleep_handler(self))
+        if "db_maintainer" not in [
+            task._coro.__name__
+            for task in asyncio.all_tasks()
+        ]:
+            self.loop.create_task(db_maintainer(self))
+        if "pokelog_checker" not in [
+            task._coro.__name__
+            for task in asyncio.all_tasks()
+        ]:
+            self.loop.create_task(pokelog_checker(self))
+        if self.metrics.server and "sampler" not in [
+            task._coro.__name__
+            for task in asyncio.all_tasks()
+        ]:
+            self.loop.create_task(self.metrics.sampler())
+        if self.loop_monitor.enabled and "heartbeat" not in [
+            task._coro.__name__
+            for task in asyncio.all_tasks()
+        ]:
+            self.loop.create_task(self.loop_monitor.heartbeat())
+            self.loop.create_task(self.loop_monitor.reporter())
+        if not self.jobs.resumed:
+            self.loop.create_task(self.jobs.resume())
+        if self.hot_reloader.enabled and "watcher" not in [
+            task._coro.__name__
+            for task in asyncio.all_tasks()
+        ]:
+            self.loop.create_task(self.hot_reloader.watcher())
         self.__pprinter()
         await check_for_updates(self)
 
+    async def close(self):
+        """
+        Flushes the buffered spawns and the stats before logging out.
+        """
+        self.spawn_recorder.flush()
+        self.stats.checkpoint()
+        self.charts.shutdown()
+        self.metrics.stop()
+        self.loop_monitor.stop()
+        await super().close()
+        self.logger.flush()
+
     # region Private Functions
 
     def __bl_wl_check(self, message: discord.Message):
@@ -220,19 +382,19 @@ class PokeBall(discord.Client):
         """
         blacklist_checks = [
             self.channel_mode == "blacklist",
-            message.channel.id in self.configs["blacklist_channels"]
+            message.channel.id in self.filters["blacklist_channels"]
         ]
         whitelist_checks = [
             self.channel_mode == "whitelist",
-            message.channel.id not in self.configs["whitelist_channels"]
+            message.channel.id not in self.filters["whitelist_channels"]
         ]
         blackguild_checks = [
             self.guild_mode == "blacklist",
-            message.guild.id in self.configs["blacklist_guilds"]
+            message.guild.id in self.filters["blacklist_guilds"]
         ]
         whiteguild_checks = [
             self.guild_mode == "whitelist",
-            message.guild.id not in self.configs["whitelist_guilds"]
+            message.guild.id not in self.filters["whitelist_guilds"]
         ]
         return_checks = [
             all(blacklist_checks),
@@ -280,10 +442,12 @@ class PokeBall(discord.Client):
         )
         self.verified = False
         await sleeper()
-        self.stats = StatsMonitor(self)
+        self.stats = StatsMonitor(self, rehydrate=False)
         self.start_time = datetime.now()
         self.allow_spam = alw_spm
         self.autocatcher_enabled = ac_enbl
+        if self.autocatcher_enabled:
+            self.loop.create_task(self.stats.checkpointer())
         if coro:
             self.loop.create_task(coro)
 
@@ -307,23 +471,8 @@ class PokeBall(discord.Client):
         cmd = f'cmd_{parsed["Command"]}'
         args = parsed["Args"]
         option_dict = parsed["Kwargs"]
-        method = None
-        for com in [
-            getattr(self, comtype)
-            for comtype in sorted(
-                dir(self),
-                key=lambda x:x.startswith("custom"),
-                reverse=True
-            )
-            if all([
-                comtype.endswith('commands'),
-                comtype != "load_commands"
-            ])
-        ]:
-            if com.enabled:
-                method = getattr(com, cmd, None)
-                if method:
-                    return method, cmd, args, option_dict
+        entry = self.registry.get(parsed["Command"])
+        method = entry.method if entry else None
         return method, cmd, args, option_dict
 
     def __pprinter(self):
@@ -474,11 +623,19 @@ class PokeBall(discord.Client):
             "mentions": message.mentions or [],
             **option_dict
         }
+        cmd_name = method.__name__.replace("cmd_", "")
+        self.logger.event(
+            "command", phase="start",
+            command=cmd_name, channel_id=message.channel.id
+        )
+        tstart = time.perf_counter()
+        success = False
         try:
             task = method(**kwargs)
             # Decorators return None
             if task:
                 await task
+            success = True
         except Exception:  # pylint: disable=broad-except
             tb_obj = traceback.format_exc()
             self.logger.pprint(
@@ -486,5 +643,15 @@ class PokeBall(discord.Client):
                 timestamp=True,
                 color="red"
             )
+        finally:
+            self.logger.event(
+                "command", phase="end",
+                command=cmd_name, channel_id=message.channel.id,
+                ms=(time.perf_counter() - tstart) * 1000, ok=success
+            )
+
+    def __log_db_event(self, method: str, seconds: float):
+        if seconds * 1000 >= self.configs.get("event_log_db_min_ms", 5):
+            self.logger.event("db", method=method, ms=seconds * 1000)
 
     # endregion
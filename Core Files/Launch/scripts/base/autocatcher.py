@@ -11,6 +11,7 @@ import asyncio
 import contextlib
 import random
 import re
+import time
 import traceback
 from datetime import datetime
 from typing import Tuple, TYPE_CHECKING, Union
@@ -23,7 +24,7 @@ from ..helpers.checks import (
     poketwo_hint, poketwo_reply_cmd, priority_checks,
     spawn_checks
 )
-from ..helpers.utils import get_embed, log_formatter, send_embed, typowrite, wait_for
+from ..helpers.utils import get_embed, log_formatter_bulk, send_embed, typowrite, wait_for
 from .pokedetector import PokeDetector
 
 if TYPE_CHECKING:
@@ -72,6 +73,7 @@ class Autocatcher:
 
     [async] monitor(message)
         The main function which patches the autocatcher onto the selfbot.
+        Every spawn is recorded along with its outcome and stage latencies.
     """
     def __init__(self, ctx: PokeBall, *args, **kwargs):
         self.ctx = ctx
@@ -247,13 +249,12 @@ class Autocatcher:
                         title_contains="Your pokémon"
                     ), timeout=max(0.5, self.ctx.configs["delay"])
                 )
-                raw_list = reply.embeds[0].description.splitlines()
                 refined_list = [
-                    log_formatter(self.ctx, pokeline)
-                    for pokeline in raw_list
-                    if not self.database.assert_pokeid(
-                        log_formatter(self.ctx, pokeline)["pokeid"]
+                    row
+                    for row in log_formatter_bulk(
+                        self.ctx, reply.embeds[0].description
                     )
+                    if not self.database.assert_pokeid(row["pokeid"])
                 ]
                 latest = sorted(refined_list, key=lambda x: x["pokeid"])[-1]
                 latest.update({
@@ -421,15 +422,37 @@ class Autocatcher:
             return True
 
     async def _precatch(
-        self, message: discord.Message
+        self, message: discord.Message,
+        spawn: dict = None
     ) -> Union[tuple, None]:
         if not spawn_checks(message, ctx=self.ctx):
             return None
         self.ctx.catching = True
+        if spawn is None:
+            spawn = {}
+        spawn.update(self.ctx.spawn_recorder.new(message))
         url = message.embeds[0].image.url
+        tstart = time.perf_counter()
         img_path = await self.detector.get_image_path(url)
+        tdownload = time.perf_counter()
         name, confidence = self.detector.predict(img_path)
         name = name.title()
+        spawn.update({
+            "name": name,
+            "confidence": confidence,
+            "download_ms": (tdownload - tstart) * 1000,
+            "predict_ms": (time.perf_counter() - tdownload) * 1000
+        })
+        self.logger.event(
+            "prediction",
+            **{
+                key: spawn[key]
+                for key in (
+                    "guild_id", "channel_id", "name",
+                    "confidence", "download_ms", "predict_ms"
+                )
+            }
+        )
         if any([
             not self.ctx.sleep,
             all([
@@ -448,6 +471,7 @@ class Autocatcher:
                 timestamp=True,
                 color="yellow"
             )
+            spawn["skip_reason"] = "low_confidence"
             return None
         self.logger.pprint(
             f"A {name} ({confidence * 100:2.2f}% confident) spawned "
@@ -459,13 +483,16 @@ class Autocatcher:
 
     async def _catch(
         self, message: discord.Message,
-        name: str
+        name: str, spawn: dict = None
     ) -> Union[discord.Message, None]:
+        if spawn is None:
+            spawn = {}
         typo_rate = int(self.ctx.configs.get("typo_rate", 0))
         name2 = name.lower() if not typo_rate else typowrite(name, typo_rate)
         if delay_checks(name, ctx=self.ctx):
             too_late = await self._let_others_catch(message, name)
             if too_late:
+                spawn["outcome"] = "sniped"
                 return None
         name = name.lower()
         if name2 != name:
@@ -475,6 +502,7 @@ class Autocatcher:
             else:
                 catch_msg = await message.channel.send(f"{self.pref}c {name2}")
             await asyncio.sleep(random.uniform(0.5, 1.0))
+        tstart = time.perf_counter()
         if self.ctx.configs["delay"] > 0:
             async with message.channel.typing():
                 catch_msg = await message.channel.send(f"{self.pref}c {name}")
@@ -488,6 +516,7 @@ class Autocatcher:
             ),
             timeout=max(0.5, self.ctx.configs["delay"])
         )
+        spawn["catch_ms"] = (time.perf_counter() - tstart) * 1000
         if not caught_reply:
             self.logger.pprint(
                 f"Unable to read the reply for the catch message.\n"
@@ -502,7 +531,22 @@ class Autocatcher:
         """
         The main function which patches the autocatcher onto the selfbot.
         """
-        rets = await self._precatch(message)
+        spawn = {}
+        try:
+            await self._monitor(message, spawn)
+        except Exception:
+            spawn.setdefault("outcome", "failed")
+            raise
+        finally:
+            # Only spawns which passed the spawn checks get populated.
+            if spawn:
+                spawn.setdefault("outcome", "skipped")
+                self.ctx.metrics.observe_spawn(spawn)
+                self.ctx.spawn_recorder.record(spawn)
+                self.logger.event("spawn", **spawn)
+
+    async def _monitor(self, message: discord.Message, spawn: dict):
+        rets = await self._precatch(message, spawn)
         if not rets:
             self.ctx.catching = False
             return
@@ -510,11 +554,14 @@ class Autocatcher:
         orig_name = name
         if catch_checks(name, ctx=self.ctx):
             try:
-                caught_reply = await self._catch(message, name)
+                caught_reply = await self._catch(message, name, spawn)
                 if not caught_reply:
+                    # The catch was attempted unless someone else sniped it.
+                    spawn.setdefault("outcome", "failed")
                     self.ctx.catching = False
                     return
                 if "wrong" in caught_reply.content:
+                    spawn["outcome"] = "wrong"
                     self.ctx.stats.update_misses(name)
                     self.ctx.stats.update_misses_urls(name, url)
                     rets = await self._handle_wrong(message, name, confidence)
@@ -522,15 +569,23 @@ class Autocatcher:
                         self.ctx.catching = False
                         return
                     caught_reply, name = rets
+                    if self.ctx.user.mentioned_in(caught_reply):
+                        # Caught on the retry with the hinted name.
+                        spawn["outcome"] = "caught"
                 elif self.ctx.user.mentioned_in(caught_reply):
+                    spawn["outcome"] = "caught"
                     self.ctx.stats.update_catches(name)
                     self.ctx.stats.update_confidence(name, confidence)
                     self.caught_pokemons += 1
                     await self._handle_logging(message, caught_reply, name)
+                else:
+                    spawn["outcome"] = "failed"
                 self.ctx.catching = False
             except discord.errors.Forbidden:
+                spawn["outcome"] = "failed"
                 self._lock_channel(message.channel)
             except Exception:  # pylint: disable=broad-except
+                spawn["outcome"] = "failed"
                 tb_obj = traceback.format_exc()
                 self.logger.pprint(
                     tb_obj,
@@ -547,8 +602,12 @@ class Autocatcher:
             not self.ctx.priority_only
         ]):
             self.ctx.catching = False
+            spawn["skip_reason"] = "catch_rate"
             self.logger.pprint(
                 f"Skipping {name} randomly based on catch rate.",
                 timestamp=True,
                 color="blue"
             )
+        else:
+            # Duplicates, avoided pokemons or non-priority ones while asleep.
+            spawn["skip_reason"] = "filtered"
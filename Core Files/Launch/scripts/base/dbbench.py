@@ -0,0 +1,311 @@
+"""
+Benchmark Suite for the DBConnector.
+
+Generates synthetic collections of different sizes and times the public
+methods of the DBConnector against each of them.
+Run it from the Launch folder:
+    python -m scripts.base.dbbench --sizes 1000 5000 20000
+    python -m scripts.base.dbbench --save-baseline
+"""
+
+# pylint: disable=too-many-arguments, too-many-locals
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Callable, Dict, List, Optional
+
+from .dbconn import DBConnector
+
+
+class CollectionGenerator:
+    """Generates realistic looking rows for the caught_pokemons table.
+
+    Species frequencies follow a Zipf-like distribution, so that a few
+    common pokemons make up most of the collection, just like real spawns.
+    IVs are the sum of 6 random stats (0-31 each) like in Poketwo and
+    levels are skewed towards the low spawn levels.
+
+    Attributes
+    ----------
+    names : list
+        the pokemon names to draw the species from.
+    legendaries : set
+        names which are logged with the legendary category.
+    priority : set
+        names which are logged with the priority category.
+    seed : int
+        seed for the random number generator.
+
+    Methods
+    -------
+    generate(size)
+        Returns a list of `size` rows ready for DBConnector.insert_bulk.
+    """
+    def __init__(
+        self, names: List[str],
+        legendaries: Optional[List[str]] = None,
+        priority: Optional[List[str]] = None,
+        seed: int = 79, skew: float = 1.1
+    ):
+        self.rng = random.Random(seed)
+        self.names = [name.title() for name in names]
+        self.rng.shuffle(self.names)
+        self.weights = [
+            1 / pow(rank + 1, skew)
+            for rank in range(len(self.names))
+        ]
+        self.legendaries = {name.title() for name in legendaries or []}
+        self.priority = {name.title() for name in priority or []}
+        self.seed = seed
+
+    def _category(self, name: str) -> str:
+        if self.rng.randint(1, 4096) == 1:
+            return "shiny"
+        if name in self.legendaries:
+            return "legendary"
+        if name in self.priority:
+            return "priority"
+        return "common"
+
+    def generate(self, size: int) -> List[Dict]:
+        """
+        Returns a list of `size` rows ready for DBConnector.insert_bulk.
+        """
+        species = self.rng.choices(self.names, weights=self.weights, k=size)
+        start = datetime.now() - timedelta(days=365)
+        rows = []
+        for pokeid, name in enumerate(species, start=1):
+            total_iv = sum(self.rng.randint(0, 31) for _ in range(6))
+            rows.append({
+                "caught_on": (
+                    start + timedelta(seconds=pokeid * 30)
+                ).strftime("%Y-%m-%d %H:%M:%S"),
+                "name": name,
+                "pokeid": pokeid,
+                "level": min(100, int(self.rng.triangular(1, 100, 15))),
+                "iv": round(total_iv / 186 * 100, 2),
+                "category": self._category(name),
+                "nickname": (
+                    f"{name[:3]}{pokeid}"
+                    if self.rng.random() < 0.01
+                    else None
+                )
+            })
+        return rows
+
+
+def time_call(func: Callable, repeats: int = 5, setup: Callable = None) -> Dict:
+    """
+    Times a function call `repeats` times and returns the statistics.
+    """
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        tstart = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - tstart)
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "runs": repeats
+    }
+
+
+def bench_size(
+    rows: List[Dict], db_dir: str,
+    repeats: int = 5, page_size: int = 20
+) -> Dict:
+    """
+    Runs the whole suite against a fresh database filled with the given rows.
+    """
+    size = len(rows)
+    db_path = os.path.join(db_dir, f"bench_{size}.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    database = DBConnector(db_path)
+    database.create_caught_table()
+    database.create_summary_table()
+    results = {}
+
+    # Pokelog inserts a page of 20 pokemons at a time.
+    results["insert_bulk"] = time_call(
+        lambda: [
+            database.insert_bulk(rows[i:i + page_size])
+            for i in range(0, size, page_size)
+        ],
+        repeats=1
+    )
+    rng = random.Random(size)
+    pokeids = [row["pokeid"] for row in rows]
+    names = list({row["name"] for row in rows})
+    probes = rng.choices(pokeids, k=1000) + rng.sample(
+        range(size + 1, size * 2 + 2), k=min(size, 1000)
+    )
+    read_suite = {
+        "assert_pokeid": lambda: [
+            database.assert_pokeid(pokeid) for pokeid in probes
+        ],
+        "get_total": lambda: [database.get_total(name) for name in names],
+        "get_ids": lambda: [database.get_ids(name) for name in names],
+        "get_summary": database.get_summary,
+        "get_duplicates": lambda: database.get_duplicates(count=3),
+        "get_trash": lambda: database.get_trash(
+            iv_threshold=90.0, max_dupes=2, avoid=[]
+        ),
+        "fetch_query": lambda: database.fetch_query(),
+        "fetch_query[dup_count]": lambda: database.fetch_query(dup_count=3),
+        "fetch_page": lambda: database.fetch_page(
+            page_size=page_size, order_by="name", dup_count=3
+        )
+    }
+    for method, func in read_suite.items():
+        results[method] = time_call(func, repeats=repeats)
+
+    victims = rng.sample(pokeids, k=max(1, size // 10))
+    victim_rows = [rows[pokeid - 1] for pokeid in victims]
+    results["delete_caught"] = time_call(
+        lambda: database.delete_caught(victims),
+        repeats=repeats,
+        setup=lambda: database.insert_bulk(victim_rows)
+    )
+    results["reset_caught"] = time_call(
+        database.reset_caught,
+        repeats=1
+    )
+    database.conn.close()
+    os.remove(db_path)
+    return results
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float = 1.25) -> Dict:
+    """
+    Compares the medians of a report against a baseline report.
+    Ratios above the tolerance are flagged as regressions.
+    """
+    comparison = {}
+    for size, methods in report["results"].items():
+        base_methods = baseline.get("results", {}).get(size, {})
+        for method, stats in methods.items():
+            if method not in base_methods:
+                continue
+            ratio = stats["median"] / max(base_methods[method]["median"], 1e-9)
+            comparison.setdefault(size, {})[method] = {
+                "ratio": round(ratio, 3),
+                "regression": ratio > tolerance
+            }
+    return comparison
+
+
+def run(
+    sizes: List[int], pokeclasses_path: str,
+    pokeranks_path: str, config_path: str,
+    repeats: int = 5, seed: int = 79
+) -> Dict:
+    """
+    Runs the benchmark for every size and returns the report.
+    """
+    with open(pokeclasses_path, encoding='utf-8') as pc_file:
+        names = pc_file.read().splitlines()
+    with open(pokeranks_path, encoding='utf-8') as pr_file:
+        pokeranks = json.load(pr_file)
+    priority = []
+    if os.path.exists(config_path):
+        with open(config_path, encoding='utf-8') as cfg_file:
+            priority = json.load(cfg_file).get("priority", [])
+    generator = CollectionGenerator(
+        names, legendaries=list(chain.from_iterable(pokeranks.values())),
+        priority=priority, seed=seed
+    )
+    report = {
+        "meta": {
+            "created_on": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "repeats": repeats
+        },
+        "results": {}
+    }
+    with tempfile.TemporaryDirectory() as db_dir:
+        for size in sizes:
+            print(f"Benchmarking a collection of {size:,} pokemons...")
+            rows = generator.generate(size)
+            report["results"][str(size)] = bench_size(
+                rows, db_dir, repeats=repeats
+            )
+    return report
+
+
+def print_report(report: Dict):
+    """
+    Prints the report as a table, along with the baseline ratios if present.
+    """
+    comparison = report.get("comparison", {})
+    for size, methods in report["results"].items():
+        print(f"\n{int(size):,} pokemons")
+        print("~" * 60)
+        for method, stats in methods.items():
+            line = f"{method:<24}{stats['median'] * 1000:>12.3f} ms"
+            ratio = comparison.get(size, {}).get(method)
+            if ratio:
+                flag = "  << REGRESSION" if ratio["regression"] else ""
+                line += f"{ratio['ratio']:>10.2f}x{flag}"
+            print(line)
+
+
+def main():
+    """
+    Command line entrypoint for the benchmark suite.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the DBConnector on synthetic collections."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+",
+        default=[1000, 5000, 20000]
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=79)
+    parser.add_argument("--pokeclasses_path", default="data/pokeclasses.txt")
+    parser.add_argument("--pokeranks_path", default="data/pokeranks.json")
+    parser.add_argument("--config_path", default="data/config.json")
+    parser.add_argument("--output", default="data/dbbench.json")
+    parser.add_argument("--baseline", default="data/dbbench_baseline.json")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="Save this run as the new baseline."
+    )
+    parsed = parser.parse_args()
+    report = run(
+        parsed.sizes, parsed.pokeclasses_path,
+        parsed.pokeranks_path, parsed.config_path,
+        repeats=parsed.repeats, seed=parsed.seed
+    )
+    if os.path.exists(parsed.baseline) and not parsed.save_baseline:
+        with open(parsed.baseline, encoding='utf-8') as base_file:
+            baseline = json.load(base_file)
+        report["baseline"] = baseline["meta"]
+        report["comparison"] = compare(
+            report, baseline, tolerance=parsed.tolerance
+        )
+    print_report(report)
+    output = parsed.baseline if parsed.save_baseline else parsed.output
+    with open(output, "w", encoding='utf-8') as out_file:
+        json.dump(report, out_file, indent=3)
+    print(f"\nSaved the report to {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,36 +5,108 @@ The Database Wrapper Module.
 # pylint: disable=too-many-public-methods, too-many-lines
 # pylint: disable=too-many-locals, too-many-arguments
 
+import os
 import sqlite3
-from typing import Dict, Optional, List, Union
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, List, Tuple, Union
+
+from .querybuilder import (
+    CAUGHT_COLUMNS, SPAWN_COLUMNS,
+    SPAWN_OUTCOMES, QueryBuilder
+)
 
 
 class DBConnector:
     """The API for transacting with the local Databse.
     The database being used is a simple SQLite DB.
-    Contains 1 table:
+    Contains 5 tables:
         1. caught_pokemons: Logs all the caught pokemons.
             Columns: [
                 caught_on: timestamp | name: text | pokeid: Unique, Int |
                 level: Int | iv: Real, Default 0.0 | category: text | nickname: text
             ]
+        2. species_summary: Per species aggregates of caught_pokemons.
+            Maintained by triggers on caught_pokemons, so it's never stale.
+            Columns: [
+                name: text, Primary Key | count: Int | max_iv: Real |
+                min_pokeid: Int | common: Int | priority: Int |
+                legendary: Int | shiny: Int
+            ]
+        3. spawns: Append-only history of every spawn seen by the autocatcher.
+            Written in batches by the SpawnRecorder.
+            Columns: [
+                ts: timestamp | guild_id: Int | channel_id: Int | name: text |
+                confidence: Real | download_ms: Real | predict_ms: Real |
+                catch_ms: Real | image_url: text | outcome: text
+            ]
+        4. stats_checkpoints: Autocatcher stats per checkpoint interval.
+            Rows hold the deltas since the previous checkpoint and get
+            downsampled from raw to hourly (after 24 hrs) to daily (after 30 days).
+            Columns: [
+                ts: timestamp | tier: text | duration: Real |
+                spawns: Int | catches: Int | misses: Int
+            ]
+        5. jobs: The plan and the progress of the resumable jobs.
+            Unfinished (queued/running) jobs are resumed after a restart.
+            Columns: [
+                job_id: Int, Primary Key | name: text | channel_id: Int |
+                status: text | plan: JSON text | checkpoint: JSON text |
+                error: text | created: timestamp | updated: timestamp
+            ]
 
     Attributes
     ----------
     db_path : str
         the path to the local database file.
+    builder : QueryBuilder
+        the parameterized SELECT builder with a cache of statement shapes.
+    mirror : CollectionMirror
+        an optional columnar copy of caught_pokemons, kept in sync on writes.
 
     Methods
     -------
     assert_pokeid(pokeid)
         Checks if a row with the given pokeid exists in the DB.
 
+    analyze()
+        Refresh the statistics used by the query planner.
+
+    attach_mirror(mirror)
+        Keeps the given in-memory mirror updated with every write.
+
+    compact()
+        Rebuild the indexes and the summary, then vacuum and truncate the WAL.
+
+    count_duplicate_names(count)
+        Get the number of species with at least count pokemons.
+
     create_caught_table()
         Creates the caught pokemons table if it doesn't exist.
 
+    create_jobs_table()
+        Creates the resumable jobs table if it doesn't exist.
+
+    create_spawns_table()
+        Creates the spawn history table and its indexes if they don't exist.
+
+    create_stats_table()
+        Creates the stats checkpoints table if it doesn't exist.
+
+    create_summary_table()
+        Creates the species summary table and its triggers if they don't exist.
+
     delete_caught(pokeids)
         Deletes the row with the given pokeid from the DB.
 
+    delete_jobs(before)
+        Deletes the finished jobs last updated before the given time.
+
+    downsample_stats(now)
+        Merge the old stats checkpoints into hourly and daily rows.
+
+    fetch_page(page_size, after, order_by, output_cols, kwargs)
+        Get a single page of rows using keyset pagination.
+
     fetch_query(
         output_cols, level_min, level_max,
         iv_min, iv_max, order_by,
@@ -42,21 +114,54 @@ class DBConnector:
     )
         A generic SELECT based on a list of parameters.
 
+    get_db_stats(row_counts)
+        Get the file sizes, page usage and row counts of the DB.
+
     get_duplicates(count, output_cols)
         Get the duplicates (name) in the DB.
 
+    get_duplicate_names(count, after, limit)
+        Get the names of the species with at least count pokemons, in order.
+
     get_ids(name)
         Get the pokeids for a given pokemon name.
 
+    get_jobs(statuses)
+        Get the persisted jobs, optionally only those with the given statuses.
+
+    get_max_pokeid()
+        Get the highest logged pokeid.
+
     get_total(name)
         Get total number of pokemons (of given name if provided).
 
     get_trash(name, iv_threshold, max_dupes, output_cols)
         Get all the pokemons which are better to be sold away.
 
+    get_stats_history(start, end, points)
+        Get the stats checkpoints of a time range, merged into at most points rows.
+
+    get_stats_totals()
+        Get the sums of all the stats checkpoints.
+
+    get_spawn_summary(start, end, channel_id)
+        Get the count, confidence and latencies of spawns per outcome.
+
+    get_summary(names, min_count)
+        Get the per species summary rows.
+
     insert_bulk(values)
         Insert multiple rows of pokemons
 
+    integrity_check(quick)
+        Run SQLite's integrity check and return the problems found.
+
+    insert_stats_checkpoint(duration, spawns, catches, misses, ts)
+        Persist the stats collected since the previous checkpoint.
+
+    insert_spawns(spawns)
+        Append a batch of spawns to the history in a single transaction.
+
     insert_caught(
         caught_on, name,
         pokeid, level, iv,
@@ -64,12 +169,65 @@ class DBConnector:
     )
         Insert a caught pokemon's details into the DB.
 
+    insert_job(name, channel_id, plan)
+        Persist a new job and return its id.
+
+    iter_query(
+        output_cols, level_min, level_max,
+        iv_min, iv_max, order_by,
+        limit, dup_count, after, chunk_size, kwargs
+    )
+        Same as fetch_query, but streams the rows as a generator.
+
+    iter_chunks(table, output_cols, chunk_size)
+        Stream a whole table as lists of chunk_size rows.
+
+    iter_spawns(start, end, channel_id, chunk_size)
+        Stream the spawn history within a time range.
+
+    rebuild_summary()
+        Recompute the species_summary table from caught_pokemons.
+
     reset_caught()
         Reset the caught_pokemons table.
+
+    reset_stats()
+        Purge all the persisted stats checkpoints.
+
+    update_job(job_id, status, checkpoint, error, workload)
+        Update the status and/or the progress of a persisted job.
+
+    upsert_bulk(values)
+        Insert multiple rows of pokemons, updating the already logged ones.
+
+    vacuum()
+        Rebuild the DB file to drop the free pages.
+
+    wal_checkpoint(mode)
+        Move the WAL contents into the DB file.
     """
-    def __init__(self, db_path: str = "pokeball.db"):
-        self.conn = sqlite3.connect(db_path)
+    def __init__(
+        self, db_path: str = "pokeball.db",
+        cache_size: int = 64
+    ):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, cached_statements=cache_size * 2)
         self.cursor = self.conn.cursor()
+        if db_path != ":memory:":
+            # Lets the offline dbtool read while the bot is writing.
+            self.cursor.execute("PRAGMA journal_mode=WAL;")
+        self.builder = QueryBuilder(
+            cache_size=cache_size,
+            dup_subquery="SELECT name FROM species_summary WHERE count >= ?"
+        )
+        self.mirror = None
+
+    def attach_mirror(self, mirror):
+        """
+        Attaches an in-memory mirror (like CollectionMirror) of caught_pokemons.
+        It has to provide add(rows), remove(pokeids) and clear().
+        """
+        self.mirror = mirror
 
     def create_caught_table(self):
         """
@@ -95,37 +253,272 @@ class DBConnector:
         )
         self.conn.commit()
 
+    def create_summary_table(self):
+        """
+        Creates the species summary table along with the triggers
+        which keep it in sync with the pokemon logging table.
+        """
+        categories = ("common", "priority", "legendary", "shiny")
+
+        def category_deltas(row: str, sign: str) -> str:
+            return ',\n'.join(
+                f"{cat} = {cat} {sign} ({row}.category = '{cat}')"
+                for cat in categories
+            )
+
+        def add_row(row: str) -> str:
+            return f'''
+                INSERT OR IGNORE INTO species_summary
+                (name, max_iv, min_pokeid)
+                VALUES
+                ({row}.name, {row}.iv, {row}.pokeid);
+                UPDATE species_summary SET
+                    count = count + 1,
+                    max_iv = MAX(
+                        COALESCE(max_iv, {row}.iv),
+                        COALESCE({row}.iv, max_iv)
+                    ),
+                    min_pokeid = MIN(min_pokeid, {row}.pokeid),
+                    {category_deltas(row, "+")}
+                WHERE name = {row}.name;
+            '''
+
+        def remove_row(row: str) -> str:
+            # Max IV and Min ID are recomputed only if the removed row held them.
+            return f'''
+                UPDATE species_summary SET
+                    count = count - 1,
+                    max_iv = CASE
+                        WHEN {row}.iv < max_iv THEN max_iv
+                        ELSE (
+                            SELECT MAX(iv) FROM caught_pokemons
+                            WHERE name = {row}.name
+                        )
+                    END,
+                    min_pokeid = CASE
+                        WHEN {row}.pokeid > min_pokeid THEN min_pokeid
+                        ELSE (
+                            SELECT MIN(pokeid) FROM caught_pokemons
+                            WHERE name = {row}.name
+                        )
+                    END,
+                    {category_deltas(row, "-")}
+                WHERE name = {row}.name;
+                DELETE FROM species_summary
+                WHERE name = {row}.name AND count <= 0;
+            '''
+
+        self.cursor.execute(
+            '''
+            SELECT COUNT(*) FROM sqlite_master
+            WHERE type = 'table' AND name = 'species_summary'
+            '''
+        )
+        existed = self.cursor.fetchone()[0] != 0
+        self.cursor.executescript(
+            f'''
+            CREATE TABLE
+            IF NOT EXISTS
+            species_summary(
+                name TEXT PRIMARY KEY,
+                count INTEGER DEFAULT 0 NOT NULL,
+                max_iv REAL,
+                min_pokeid INTEGER,
+                common INTEGER DEFAULT 0 NOT NULL,
+                priority INTEGER DEFAULT 0 NOT NULL,
+                legendary INTEGER DEFAULT 0 NOT NULL,
+                shiny INTEGER DEFAULT 0 NOT NULL
+            );
+            CREATE INDEX
+            IF NOT EXISTS
+            idx_caught_name ON caught_pokemons(name);
+            CREATE TRIGGER
+            IF NOT EXISTS
+            species_summary_insert
+            AFTER INSERT ON caught_pokemons
+            BEGIN
+                {add_row("NEW")}
+            END;
+            CREATE TRIGGER
+            IF NOT EXISTS
+            species_summary_delete
+            AFTER DELETE ON caught_pokemons
+            BEGIN
+                {remove_row("OLD")}
+            END;
+            CREATE TRIGGER
+            IF NOT EXISTS
+            species_summary_update
+            AFTER UPDATE OF name, pokeid, iv, category ON caught_pokemons
+            BEGIN
+                {remove_row("OLD")}
+                {add_row("NEW")}
+            END;
+            '''
+        )
+        if not existed:
+            self.rebuild_summary()
+
+    def create_spawns_table(self):
+        """
+        Creates the spawn history table.
+        The indexes back the time range and per channel queries.
+        """
+        self.cursor.executescript(
+            f'''
+            CREATE TABLE
+            IF NOT EXISTS
+            spawns(
+                ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                guild_id INTEGER,
+                channel_id INTEGER,
+                name TEXT,
+                confidence REAL,
+                download_ms REAL,
+                predict_ms REAL,
+                catch_ms REAL,
+                image_url TEXT,
+                outcome TEXT DEFAULT "skipped"
+                    CHECK (
+                        outcome IN ({', '.join(f'"{out}"' for out in SPAWN_OUTCOMES)})
+                    ) NOT NULL
+            );
+            CREATE INDEX
+            IF NOT EXISTS
+            idx_spawns_ts ON spawns(ts);
+            CREATE INDEX
+            IF NOT EXISTS
+            idx_spawns_channel ON spawns(channel_id, ts);
+            '''
+        )
+
+    def create_stats_table(self):
+        """
+        Creates the persisted stats checkpoints table.
+        """
+        self.cursor.executescript(
+            '''
+            CREATE TABLE
+            IF NOT EXISTS
+            stats_checkpoints(
+                ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                tier TEXT DEFAULT "raw"
+                    CHECK (tier IN ("raw", "hour", "day")) NOT NULL,
+                duration REAL DEFAULT 0.0 NOT NULL,
+                spawns INTEGER DEFAULT 0 NOT NULL,
+                catches INTEGER DEFAULT 0 NOT NULL,
+                misses INTEGER DEFAULT 0 NOT NULL
+            );
+            CREATE INDEX
+            IF NOT EXISTS
+            idx_stats_tier_ts ON stats_checkpoints(tier, ts);
+            CREATE INDEX
+            IF NOT EXISTS
+            idx_stats_ts ON stats_checkpoints(ts);
+            '''
+        )
+
+    def create_jobs_table(self):
+        """
+        Creates the resumable jobs table.
+        The plan, the checkpoint and the workload are stored as JSON text.
+        """
+        self.cursor.executescript(
+            '''
+            CREATE TABLE
+            IF NOT EXISTS
+            jobs(
+                job_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                status TEXT DEFAULT "queued"
+                    CHECK (
+                        status IN (
+                            "queued", "running", "done",
+                            "failed", "cancelled", "timeout"
+                        )
+                    ) NOT NULL,
+                plan TEXT DEFAULT "{}" NOT NULL,
+                checkpoint TEXT DEFAULT "{}" NOT NULL,
+                workload TEXT,
+                error TEXT,
+                created TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+            );
+            CREATE INDEX
+            IF NOT EXISTS
+            idx_jobs_status ON jobs(status);
+            '''
+        )
+        cols = [
+            row[1]
+            for row in self.cursor.execute("PRAGMA table_info(jobs);")
+        ]
+        if "workload" not in cols:
+            # Tables created before the workloads were split from the checkpoints.
+            self.cursor.execute("ALTER TABLE jobs ADD COLUMN workload TEXT;")
+            self.conn.commit()
+
+    def rebuild_summary(self):
+        """
+        Recomputes the species summary from the pokemon logging table.
+        Only needed for databases which were logged before the triggers existed.
+        """
+        self.cursor.execute(
+            '''
+            DELETE FROM species_summary;
+            '''
+        )
+        self.cursor.execute(
+            '''
+            INSERT INTO species_summary
+            SELECT
+                name, COUNT(*), MAX(iv), MIN(pokeid),
+                SUM(category = 'common'), SUM(category = 'priority'),
+                SUM(category = 'legendary'), SUM(category = 'shiny')
+            FROM caught_pokemons
+            GROUP BY name;
+            '''
+        )
+        self.conn.commit()
+
     def reset_caught(self):
         """
         Purges the pokemon log table.
         """
+        # Emptying the summary first turns the per-row triggers into no-ops.
+        self.cursor.execute(
+            '''
+            DELETE FROM species_summary;
+            '''
+        )
         self.cursor.execute(
             '''
             DELETE FROM caught_pokemons;
             '''
         )
         self.conn.commit()
+        if self.mirror is not None:
+            self.mirror.clear()
 
     def delete_caught(self, pokeids: Union[int, list]):
         """
         Deletes the specified ID(s) from the pokemon log table.
         """
-        if isinstance(pokeids, list):
-            if len(pokeids) > 1:
-                pokeid_str = f"IN {tuple(pokeids)}"
-            elif len(pokeids) == 0:
-                return
-            else:
-                pokeid_str = f"IS {pokeids[0]}"
-        else:   # Single integer ID
-            pokeid_str = f"IS {pokeids}"
-        self.cursor.execute(
-            f'''
-            DELETE FROM caught_pokemons
-            WHERE pokeid {pokeid_str};
+        if not isinstance(pokeids, list):   # Single integer ID
+            pokeids = [pokeids]
+        if len(pokeids) == 0:
+            return
+        self.cursor.executemany(
             '''
+            DELETE FROM caught_pokemons
+            WHERE pokeid = ?;
+            ''',
+            ((int(pokeid),) for pokeid in pokeids)
         )
         self.conn.commit()
+        if self.mirror is not None:
+            self.mirror.remove(int(pokeid) for pokeid in pokeids)
 
     # pylint: disable=invalid-name
     def insert_caught(
@@ -147,35 +540,105 @@ class DBConnector:
             (caught_on, name.title(), pokeid, level, iv, category, nickname)
         )
         self.conn.commit()
+        if self.mirror is not None:
+            self.mirror.add([
+                {"name": name, "pokeid": pokeid, "level": level, "iv": iv}
+            ])
 
     def insert_bulk(self, values: List[Dict]):
         """
         Bulk log a batch of pokemons.
         """
-        value_str = ',\n'.join(
-            f'''(
-                "{v['name'].title()}", {v['pokeid']}, {v['level']},
-                {v['iv']}, "{v['category']}", "{v['nickname']}"
-            )'''
-            for v in values
-        ).replace('"None"', 'null')
-
-        self.cursor.execute(
-            f'''
+        self.cursor.executemany(
+            '''
             INSERT OR IGNORE INTO caught_pokemons
             (name, pokeid, level, iv, category, nickname)
             VALUES
-            {value_str}
-            '''
+            (?, ?, ?, ?, ?, ?);
+            ''',
+            (
+                (
+                    v['name'].title(), v['pokeid'], v['level'],
+                    v['iv'], v['category'], v['nickname']
+                )
+                for v in values
+            )
         )
         self.conn.commit()
-        self.cursor.execute(
+        if self.mirror is not None:
+            self.mirror.add(values)
+
+    def insert_spawns(self, spawns: List[Dict]) -> int:
+        """
+        Appends a batch of spawns to the history using a single commit.
+        Missing columns are stored as NULL.
+        """
+        if not spawns:
+            return 0
+        self.cursor.executemany(
+            f'''
+            INSERT INTO spawns
+            ({', '.join(SPAWN_COLUMNS)})
+            VALUES
+            ({', '.join('?' * len(SPAWN_COLUMNS))});
+            ''',
+            (
+                tuple(spawn.get(col) for col in SPAWN_COLUMNS)
+                for spawn in spawns
+            )
+        )
+        self.conn.commit()
+        return len(spawns)
+
+    def upsert_bulk(self, values: List[Dict]) -> int:
+        """
+        Bulk log a batch of pokemons in a single transaction.
+        Already logged pokeids get their details overwritten.
+        """
+        values = [
+            (
+                v.get('caught_on'), v['name'].title(), int(v['pokeid']),
+                v['level'], v.get('iv'), v.get('category') or "common",
+                v.get('nickname')
+            )
+            for v in values
+        ]
+        if not values:
+            return 0
+        self.cursor.executemany(
             '''
-            SELECT * FROM caught_pokemons
-            WHERE pokeid > 2000
+            UPDATE caught_pokemons SET
+                caught_on = COALESCE(?, caught_on),
+                name = ?, level = ?, iv = COALESCE(?, 0.0),
+                category = ?, nickname = ?
+            WHERE pokeid = ?;
+            ''',
+            (
+                (caught_on, name, level, total_iv, category, nickname, pokeid)
+                for (
+                    caught_on, name, pokeid, level,
+                    total_iv, category, nickname
+                ) in values
+            )
+        )
+        self.cursor.executemany(
             '''
+            INSERT OR IGNORE INTO caught_pokemons
+            (caught_on, name, pokeid, level, iv, category, nickname)
+            VALUES
+            (COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, COALESCE(?, 0.0), ?, ?);
+            ''',
+            values
         )
-        return self.cursor.fetchall()
+        self.conn.commit()
+        if self.mirror is not None:
+            rows = [
+                {"name": name, "pokeid": pokeid, "level": level, "iv": total_iv}
+                for _, name, pokeid, level, total_iv, _, _ in values
+            ]
+            self.mirror.remove(row["pokeid"] for row in rows)
+            self.mirror.add(rows)
+        return len(values)
 
     def get_ids(self, name: str) -> List:
         """
@@ -213,17 +676,16 @@ class DBConnector:
         if name:
             self.cursor.execute(
                 '''
-                SELECT COUNT(*) FROM caught_pokemons
-                WHERE name IS ?
-                GROUP BY name
+                SELECT count FROM species_summary
+                WHERE name = ?
                 ''',
                 (name.title(),)
             )
         else:
             self.cursor.execute(
                 '''
-                SELECT COUNT(*)
-                FROM caught_pokemons
+                SELECT COALESCE(SUM(count), 0)
+                FROM species_summary
                 '''
             )
         count = self.cursor.fetchone()
@@ -231,6 +693,427 @@ class DBConnector:
             return count[0]
         return 0
 
+    def get_max_pokeid(self) -> int:
+        """
+        Get the highest logged pokeid (0 if nothing is logged).
+        """
+        self.cursor.execute(
+            '''
+            SELECT COALESCE(MAX(pokeid), 0) FROM caught_pokemons
+            '''
+        )
+        return self.cursor.fetchone()[0]
+
+    def get_summary(
+        self, names: Optional[List[str]] = None,
+        min_count: int = 1
+    ) -> List[Dict]:
+        """
+        Get the species summary rows, optionally only for the given names.
+        """
+        cols = [
+            "name", "count", "max_iv", "min_pokeid",
+            "common", "priority", "legendary", "shiny"
+        ]
+        query = f'''
+            SELECT {', '.join(cols)} FROM species_summary
+            WHERE count >= ?
+        '''
+        params = [min_count]
+        if names is not None:
+            names = [name.title() for name in names]
+            query += f"AND name IN ({', '.join('?' * len(names))})"
+            params.extend(names)
+        self.cursor.execute(query + "\nORDER BY name;", params)
+        return [
+            dict(zip(cols, row))
+            for row in self.cursor.fetchall()
+        ]
+
+    def iter_query(
+        self, output_cols: list = None, level_min: int = 0,
+        level_max: int = 100, iv_min: int = 0,
+        iv_max: int = 100.0, order_by: str = "name",
+        limit: int = -1, dup_count: int = 0,
+        after: Optional[Tuple] = None,
+        chunk_size: int = 500,
+        **kwargs
+    ) -> Iterator[Dict]:
+        """
+        Stream the ouput for a custom query based on the kwargs.
+        Rows are fetched from SQLite in chunks of chunk_size.
+        """
+        output_cols = list(output_cols or CAUGHT_COLUMNS)
+        query, params = self.builder.select(
+            output_cols, filters=kwargs,
+            level_range=(level_min, level_max),
+            iv_range=(iv_min, iv_max),
+            order_by=order_by, limit=limit,
+            dup_count=dup_count, after=after
+        )
+        # A dedicated cursor so that other calls can't exhaust the stream.
+        cursor = self.conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for poke in rows:
+                    yield dict(zip(output_cols, poke))
+        finally:
+            cursor.close()
+
+    def iter_chunks(
+        self, table: str = "caught_pokemons",
+        output_cols: list = None,
+        chunk_size: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """
+        Stream a whole table in insertion order, chunk_size rows at a time.
+        """
+        tables = {
+            "caught_pokemons": CAUGHT_COLUMNS,
+            "spawns": SPAWN_COLUMNS
+        }
+        if table not in tables:
+            raise ValueError(f"Unknown table: {table}")
+        output_cols = list(output_cols or tables[table])
+        unknown = [col for col in output_cols if col not in tables[table]]
+        if unknown:
+            raise ValueError(
+                f"Unknown column(s) for {table}: {', '.join(unknown)}"
+            )
+        cursor = self.conn.execute(
+            f'''
+            SELECT {', '.join(f'"{col}"' for col in output_cols)}
+            FROM {table}
+            ORDER BY rowid;
+            '''
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield [dict(zip(output_cols, row)) for row in rows]
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _range_filters(
+        start: Optional[str] = None, end: Optional[str] = None,
+        channel_id: Optional[int] = None
+    ) -> Tuple[str, list]:
+        conditions = []
+        params = []
+        if channel_id is not None:
+            conditions.append("channel_id = ?")
+            params.append(int(channel_id))
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(str(start))
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(str(end))
+        if not conditions:
+            return "", params
+        return "WHERE " + "\nAND ".join(conditions), params
+
+    def iter_spawns(
+        self, start: Optional[str] = None,
+        end: Optional[str] = None,
+        channel_id: Optional[int] = None,
+        chunk_size: int = 500
+    ) -> Iterator[Dict]:
+        """
+        Stream the spawn history between start (inclusive) and end (exclusive).
+        Timestamps are in the "YYYY-MM-DD HH:MM:SS" format.
+        """
+        where, params = self._range_filters(start, end, channel_id)
+        cursor = self.conn.execute(
+            f'''
+            SELECT {', '.join(SPAWN_COLUMNS)} FROM spawns
+            {where}
+            ORDER BY ts;
+            ''',
+            params
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for spawn in rows:
+                    yield dict(zip(SPAWN_COLUMNS, spawn))
+        finally:
+            cursor.close()
+
+    def get_spawn_summary(
+        self, start: Optional[str] = None,
+        end: Optional[str] = None,
+        channel_id: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Get the number of spawns, the average confidence
+        and the average stage latencies for every outcome.
+        """
+        cols = [
+            "outcome", "count", "confidence",
+            "download_ms", "predict_ms", "catch_ms"
+        ]
+        where, params = self._range_filters(start, end, channel_id)
+        self.cursor.execute(
+            f'''
+            SELECT
+                outcome, COUNT(*), AVG(confidence),
+                AVG(download_ms), AVG(predict_ms), AVG(catch_ms)
+            FROM spawns
+            {where}
+            GROUP BY outcome
+            ORDER BY COUNT(*) DESC;
+            ''',
+            params
+        )
+        return [
+            dict(zip(cols, row))
+            for row in self.cursor.fetchall()
+        ]
+
+    # region Stats
+
+    def insert_stats_checkpoint(
+        self, duration: float, spawns: int,
+        catches: int, misses: int,
+        ts: Optional[str] = None
+    ):
+        """
+        Persist the stats collected since the previous checkpoint.
+        """
+        ts = ts or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.cursor.execute(
+            '''
+            INSERT INTO stats_checkpoints
+            (ts, tier, duration, spawns, catches, misses)
+            VALUES
+            (?, "raw", ?, ?, ?, ?);
+            ''',
+            (ts, duration, spawns, catches, misses)
+        )
+        self.conn.commit()
+
+    def downsample_stats(self, now: Optional[datetime] = None) -> int:
+        """
+        Merges the raw checkpoints older than 24 hrs into hourly rows
+        and the hourly rows older than 30 days into daily rows.
+        The cutoffs are aligned to the bucket boundaries,
+        so every bucket gets merged exactly once.
+        Returns the number of merged rows.
+        """
+        now = now or datetime.now()
+        tiers = [
+            (
+                "raw", "hour", "%Y-%m-%d %H:00:00",
+                (now - timedelta(days=1)).replace(
+                    minute=0, second=0, microsecond=0
+                )
+            ),
+            (
+                "hour", "day", "%Y-%m-%d 00:00:00",
+                (now - timedelta(days=30)).replace(
+                    hour=0, minute=0, second=0, microsecond=0
+                )
+            )
+        ]
+        merged = 0
+        for source, target, bucket, cutoff in tiers:
+            cutoff = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+            self.cursor.execute(
+                '''
+                INSERT INTO stats_checkpoints
+                (ts, tier, duration, spawns, catches, misses)
+                SELECT
+                    strftime(?, ts), ?,
+                    SUM(duration), SUM(spawns), SUM(catches), SUM(misses)
+                FROM stats_checkpoints
+                WHERE tier = ? AND ts < ?
+                GROUP BY strftime(?, ts);
+                ''',
+                (bucket, target, source, cutoff, bucket)
+            )
+            self.cursor.execute(
+                '''
+                DELETE FROM stats_checkpoints
+                WHERE tier = ? AND ts < ?;
+                ''',
+                (source, cutoff)
+            )
+            merged += self.cursor.rowcount
+        self.conn.commit()
+        return merged
+
+    def get_stats_totals(self) -> Dict:
+        """
+        Get the total duration, spawns, catches and misses of all checkpoints.
+        """
+        cols = ["duration", "spawns", "catches", "misses"]
+        self.cursor.execute(
+            f'''
+            SELECT {', '.join(f'COALESCE(SUM({col}), 0)' for col in cols)}
+            FROM stats_checkpoints;
+            '''
+        )
+        return dict(zip(cols, self.cursor.fetchone()))
+
+    def get_stats_history(
+        self, start: Optional[str] = None,
+        end: Optional[str] = None,
+        points: int = 96
+    ) -> List[Dict]:
+        """
+        Get the stats checkpoints within a time range.
+        Rows are merged into at most `points` equal width buckets inside SQLite,
+        so charting a long window never loads the whole history.
+        """
+        cols = ["ts", "duration", "spawns", "catches", "misses"]
+        where, params = self._range_filters(start, end)
+        self.cursor.execute(
+            f'''
+            SELECT
+                CAST(strftime('%s', MIN(ts)) AS INTEGER),
+                CAST(strftime('%s', MAX(ts)) AS INTEGER)
+            FROM stats_checkpoints
+            {where};
+            ''',
+            params
+        )
+        first, last = self.cursor.fetchone()
+        if first is None:
+            return []
+        width = max(1, (last - first) // max(1, points - 1) + 1)
+        self.cursor.execute(
+            f'''
+            SELECT
+                datetime(
+                    ? + (CAST(strftime('%s', ts) AS INTEGER) - ?) / ? * ?,
+                    'unixepoch'
+                ) AS bucket,
+                SUM(duration), SUM(spawns), SUM(catches), SUM(misses)
+            FROM stats_checkpoints
+            {where}
+            GROUP BY bucket
+            ORDER BY bucket;
+            ''',
+            [first, first, width, width, *params]
+        )
+        return [
+            dict(zip(cols, row))
+            for row in self.cursor.fetchall()
+        ]
+
+    def reset_stats(self):
+        """
+        Purges the persisted stats checkpoints.
+        """
+        self.cursor.execute(
+            '''
+            DELETE FROM stats_checkpoints;
+            '''
+        )
+        self.conn.commit()
+
+    # endregion
+
+    # region Jobs
+
+    def insert_job(self, name: str, channel_id: int, plan: str) -> int:
+        """
+        Persists a new queued job and returns its id.
+        """
+        self.cursor.execute(
+            '''
+            INSERT INTO jobs
+            (name, channel_id, plan)
+            VALUES
+            (?, ?, ?);
+            ''',
+            (name, channel_id, plan)
+        )
+        self.conn.commit()
+        return self.cursor.lastrowid
+
+    def update_job(
+        self, job_id: int,
+        status: Optional[str] = None,
+        checkpoint: Optional[str] = None,
+        error: Optional[str] = None,
+        workload: Optional[str] = None
+    ):
+        """
+        Updates the given fields of a persisted job.
+        """
+        fields = {
+            key: val
+            for key, val in (
+                ("status", status),
+                ("checkpoint", checkpoint),
+                ("error", error),
+                ("workload", workload)
+            )
+            if val is not None
+        }
+        self.cursor.execute(
+            f'''
+            UPDATE jobs
+            SET {"".join(f"{key} = ?, " for key in fields)}updated = CURRENT_TIMESTAMP
+            WHERE job_id = ?;
+            ''',
+            (*fields.values(), job_id)
+        )
+        self.conn.commit()
+
+    def get_jobs(self, statuses: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Gets the persisted jobs (with the given statuses) in the order of creation.
+        """
+        cols = [
+            "job_id", "name", "channel_id", "status",
+            "plan", "checkpoint", "workload",
+            "error", "created", "updated"
+        ]
+        where = (
+            f"WHERE status IN ({', '.join('?' * len(statuses))})"
+            if statuses else ""
+        )
+        self.cursor.execute(
+            f'''
+            SELECT {', '.join(cols)} FROM jobs
+            {where}
+            ORDER BY job_id;
+            ''',
+            statuses or []
+        )
+        return [
+            dict(zip(cols, row))
+            for row in self.cursor.fetchall()
+        ]
+
+    def delete_jobs(self, before: datetime) -> int:
+        """
+        Deletes the finished jobs which were last updated before the given UTC time.
+        """
+        self.cursor.execute(
+            '''
+            DELETE FROM jobs
+            WHERE status NOT IN ("queued", "running")
+            AND updated < ?;
+            ''',
+            (before.strftime("%Y-%m-%d %H:%M:%S"),)
+        )
+        self.conn.commit()
+        return self.cursor.rowcount
+
+    # endregion
+
     def fetch_query(
         self, output_cols: list = None, level_min: int = 0,
         level_max: int = 100, iv_min: int = 0,
@@ -241,47 +1124,45 @@ class DBConnector:
         """
         Fetch ouput for a custom query based on the kwargs.
         """
-        if not output_cols:
-            output_cols = [
-                "caught_on", "name", "pokeid", "level",
-                "iv", "category", "nickname"
-            ]
-        output_cols_str = ', '.join(f'"{col}"' for col in output_cols)
-        base = f"SELECT {output_cols_str} FROM caught_pokemons"
-        for idx, (key, val) in enumerate(kwargs.items()):
-            startword = 'WHERE' if idx == 0 else 'AND'
-            if isinstance(val, list):
-                if isinstance(val[0], str):
-                    val_str = ','.join(f'"{v}"' for v in val)
-                else:
-                    val_str = ','.join(val)
-                base += f"\n{startword} {key} IN ({val_str})"
-            else:
-                val_str = f'"{val}"' if isinstance(val, str) else val
-                base += f"\n{startword} {key} IS {val_str}"
-        startword = 'WHERE' if len(kwargs.items()) == 0 else 'AND'
-        iv_str = f"\n{startword} iv BETWEEN {iv_min} AND {iv_max}"
-        level_str = f"\nAND level BETWEEN {level_min} AND {level_max}"
-        subquery = f'''
-        SELECT DISTINCT name FROM caught_pokemons
-        GROUP BY name
-        HAVING COUNT(name) >= {dup_count}
-        '''
-        dup_str = f"\nAND name IN ({subquery})"
-        if order_by.startswith('-'):
-            order_by = f"{order_by[1:]} DESC"
-        end = f"\nORDER BY {order_by}\nLIMIT {limit};"
-        query = base + iv_str + level_str + dup_str + end
-        self.cursor.execute(query)
-        res = self.cursor.fetchall()
-        res = [
-            {
-                col: poke[idx]
-                for idx, col in enumerate(output_cols)
-            }
-            for poke in res
+        return list(
+            self.iter_query(
+                output_cols=output_cols, level_min=level_min,
+                level_max=level_max, iv_min=iv_min, iv_max=iv_max,
+                order_by=order_by, limit=limit, dup_count=dup_count,
+                **kwargs
+            )
+        )
+
+    def fetch_page(
+        self, page_size: int = 20,
+        after: Optional[Tuple] = None,
+        order_by: str = "pokeid",
+        output_cols: list = None,
+        **kwargs
+    ) -> Tuple[List[Dict], Optional[Tuple]]:
+        """
+        Fetch a single page of a custom query using keyset pagination.
+        Returns the rows along with the cursor for the next page,
+        which is None if this was the last page.
+        """
+        output_cols = list(output_cols or CAUGHT_COLUMNS)
+        order_col, _ = self.builder.parse_order(order_by)
+        cols = output_cols + [
+            col
+            for col in (order_col, "pokeid")
+            if col not in output_cols
         ]
-        return res
+        rows = list(
+            self.iter_query(
+                output_cols=cols, order_by=order_by,
+                limit=page_size + 1, after=after,
+                **kwargs
+            )
+        )
+        if len(rows) <= page_size:
+            return rows, None
+        rows = rows[:page_size]
+        return rows, (rows[-1][order_col], rows[-1]["pokeid"])
 
     def get_duplicates(
         self, count: int = 1,
@@ -300,9 +1181,8 @@ class DBConnector:
             '''
             SELECT * FROM caught_pokemons
             WHERE name IN (
-                SELECT DISTINCT name FROM caught_pokemons
-                GROUP BY name
-                HAVING COUNT(name) >= ?
+                SELECT name FROM species_summary
+                WHERE count >= ?
             )
             ''',
             (count,)
@@ -317,6 +1197,39 @@ class DBConnector:
         ]
         return res
 
+    def count_duplicate_names(self, count: int = 1) -> int:
+        """
+        Get the number of species with at least `count` pokemons.
+        """
+        self.cursor.execute(
+            '''
+            SELECT COUNT(name) FROM species_summary
+            WHERE count >= ?
+            ''',
+            (count,)
+        )
+        return self.cursor.fetchone()[0]
+
+    def get_duplicate_names(
+        self, count: int = 1,
+        after: Optional[str] = None,
+        limit: int = -1
+    ) -> List[str]:
+        """
+        Get the names of the species with at least `count` pokemons, by name.
+        Only the names after the given one are returned, for keyset pagination.
+        """
+        self.cursor.execute(
+            '''
+            SELECT name FROM species_summary
+            WHERE count >= ? AND name > ?
+            ORDER BY name
+            LIMIT ?
+            ''',
+            (count, after or "", limit)
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
     def get_trash(
         self, name: Optional[str] = None,
         iv_threshold: float = 100.0,
@@ -332,31 +1245,25 @@ class DBConnector:
                 "caught_on", "name", "pokeid", "level",
                 "iv", "category", "nickname"
             ]
+        output_cols = self.builder.check_columns(output_cols)
         output_cols_str = ', '.join(f'"{col}"' for col in output_cols)
+        avoid = avoid or []
         if name:
-            if avoid and name in avoid:
+            if name in avoid:
                 return []
             name = name.title()
-            if self.get_total(name=name) > 1:
-                subquery = f'("{name}")'
-            else:
+            if self.get_total(name=name) <= 1:
                 return []
+            name_filter = "name IS ?"
+            name_params = (name,)
         else:
-            self.cursor.execute(
-                f'''
-                SELECT DISTINCT name FROM caught_pokemons
-                GROUP BY name
-                HAVING COUNT(name) > {1 if max_dupes and max_dupes > 0 else 0}
-                '''
-            )
-            subquery = self.cursor.fetchall()
-            subquery = tuple(
-                elem[0]
-                for elem in subquery
-                if elem[0] not in avoid
-            )
-        if len(subquery) == 0:
-            return []
+            name_filter = f'''name IN (
+                        SELECT name FROM species_summary
+                        WHERE count > ?
+                    )
+                AND
+                    name NOT IN ({', '.join('?' * len(avoid))})'''
+            name_params = (1 if max_dupes and max_dupes > 0 else 0, *avoid)
         if max_dupes is None:
             max_dupes = 0
         self.cursor.execute(
@@ -377,14 +1284,14 @@ class DBConnector:
                 AND
                     pokeid <> 1
                 AND
-                    name in {subquery}
+                    {name_filter}
                 ORDER BY iv DESC
                 LIMIT -1
                 OFFSET MAX(0, ?)
             )
             ORDER BY T1.pokeid DESC;
             ''',
-            (iv_threshold, max_dupes)
+            (iv_threshold, *name_params, max_dupes)
         )
         res = self.cursor.fetchall()
         res = [
@@ -396,6 +1303,105 @@ class DBConnector:
         ]
         return res
 
+    # region Maintenance
+
+    def get_db_stats(self, row_counts: bool = True) -> Dict:
+        """
+        Get the file sizes, page usage and row counts of the DB.
+        The row counts scan every table, so they can be left out.
+        """
+        stats = {}
+        for suffix in ["", "-wal"]:
+            path = f"{self.db_path}{suffix}"
+            stats[f"{suffix.lstrip('-') or 'db'}_size"] = (
+                os.path.getsize(path)
+                if os.path.exists(path)
+                else 0
+            )
+        for pragma in [
+            "page_size", "page_count",
+            "freelist_count", "journal_mode"
+        ]:
+            stats[pragma] = self.cursor.execute(
+                f"PRAGMA {pragma};"
+            ).fetchone()[0]
+        stats["free_ratio"] = (
+            stats["freelist_count"] / stats["page_count"]
+            if stats["page_count"]
+            else 0.0
+        )
+        if not row_counts:
+            return stats
+        tables = [
+            row[0]
+            for row in self.cursor.execute(
+                '''
+                SELECT name FROM sqlite_master
+                WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+                ORDER BY name
+                '''
+            ).fetchall()
+        ]
+        stats["rows"] = {
+            table: self.cursor.execute(
+                f'SELECT COUNT(*) FROM "{table}"'
+            ).fetchone()[0]
+            for table in tables
+        }
+        return stats
+
+    def analyze(self):
+        """
+        Refresh the statistics used by the query planner.
+        """
+        self.conn.commit()
+        self.cursor.execute("ANALYZE;")
+        self.conn.commit()
+
+    def integrity_check(self, quick: bool = False) -> List[str]:
+        """
+        Run SQLite's integrity check.
+        Returns an empty list if the DB is healthy.
+        """
+        pragma = "quick_check" if quick else "integrity_check"
+        problems = [
+            row[0]
+            for row in self.cursor.execute(f"PRAGMA {pragma};").fetchall()
+        ]
+        return [] if problems == ["ok"] else problems
+
+    def wal_checkpoint(self, mode: str = "PASSIVE") -> Tuple[int, int, int]:
+        """
+        Move the WAL contents into the DB file.
+        Returns (busy, wal_pages, checkpointed_pages).
+        """
+        mode = mode.upper()
+        if mode not in ["PASSIVE", "FULL", "RESTART", "TRUNCATE"]:
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        self.conn.commit()
+        return tuple(
+            self.cursor.execute(f"PRAGMA wal_checkpoint({mode});").fetchone()
+        )
+
+    def vacuum(self):
+        """
+        Rebuild the DB file to drop the free pages left by deletions.
+        """
+        self.conn.commit()
+        self.cursor.execute("VACUUM;")
+
+    def compact(self):
+        """
+        Rebuild the indexes and the summary, then vacuum and truncate the WAL.
+        """
+        self.rebuild_summary()
+        self.cursor.execute("REINDEX;")
+        self.vacuum()
+        self.analyze()
+        self.wal_checkpoint("TRUNCATE")
+
+    # endregion
+
 
 if __name__ == "__main__":
     dbconn = DBConnector(db_path='data/pokeball.db')
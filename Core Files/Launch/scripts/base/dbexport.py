@@ -0,0 +1,253 @@
+"""
+Streaming Export/Import of the Pokeball Database.
+
+Rows are moved in fixed size chunks through a cursor,
+so the memory usage stays flat regardless of the collection size.
+Supports CSV and JSONL, optionally gzip compressed (*.gz).
+Run it from the Launch folder:
+    python -m scripts.base.dbexport export --output backup.csv.gz
+    python -m scripts.base.dbexport import --input backup.csv.gz
+"""
+
+# pylint: disable=too-many-arguments
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+from .dbconn import DBConnector
+from .querybuilder import CAUGHT_COLUMNS, SPAWN_COLUMNS
+
+EXPORTABLE = {
+    "caught_pokemons": CAUGHT_COLUMNS,
+    "spawns": SPAWN_COLUMNS
+}
+
+# CSV has no types, so these are used to restore them on import.
+CONVERTERS = {
+    "pokeid": int,
+    "level": int,
+    "iv": float,
+    "guild_id": int,
+    "channel_id": int,
+    "confidence": float,
+    "download_ms": float,
+    "predict_ms": float,
+    "catch_ms": float
+}
+
+
+def get_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Infers the file format (csv/jsonl) from the path if not provided.
+    """
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        fmt = path[:-3] if path.endswith(".gz") else path
+        fmt = os.path.splitext(fmt)[1].lstrip('.').lower()
+        fmt = "jsonl" if fmt in ["json", "jsonl", "ndjson"] else fmt
+    if fmt not in ["csv", "jsonl"]:
+        raise ValueError(f"Unsupported format: {fmt}. Use csv or jsonl.")
+    return fmt
+
+
+def open_file(path: str, mode: str = "r") -> TextIO:
+    """
+    Opens a text file, transparently handling gzip compression.
+    """
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(
+            gzip.open(path, f"{mode}b"),
+            encoding="utf-8", newline=""
+        )
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _convert(row: Dict) -> Dict:
+    converted = {}
+    for col, val in row.items():
+        if val in ("", None):
+            val = None
+        elif col in CONVERTERS:
+            val = CONVERTERS[col](val)
+        converted[col] = val
+    return converted
+
+
+def iter_export(
+    database: DBConnector, path: str,
+    table: str = "caught_pokemons",
+    fmt: Optional[str] = None,
+    chunk_size: int = 1000
+) -> Iterator[int]:
+    """
+    Streams a table into a file, chunk by chunk.
+    Yields the total number of rows written so far after every chunk.
+    """
+    if table not in EXPORTABLE:
+        raise ValueError(f"Cannot export {table}.")
+    fmt = get_format(path, fmt)
+    cols = list(EXPORTABLE[table])
+    total = 0
+    with open_file(path, "w") as out_file:
+        if fmt == "csv":
+            writer = csv.DictWriter(out_file, fieldnames=cols)
+            writer.writeheader()
+            write = writer.writerows
+        else:
+            def write(rows: List[Dict]):
+                out_file.writelines(
+                    json.dumps(row, ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+        for rows in database.iter_chunks(table, cols, chunk_size=chunk_size):
+            write(rows)
+            total += len(rows)
+            yield total
+
+
+def iter_import(
+    database: DBConnector, path: str,
+    table: str = "caught_pokemons",
+    fmt: Optional[str] = None,
+    chunk_size: int = 1000
+) -> Iterator[int]:
+    """
+    Streams a file into a table, chunk by chunk.
+    Pokemons are upserted by pokeid, while spawns are appended.
+    Yields the total number of rows read so far after every chunk.
+    """
+    if table not in EXPORTABLE:
+        raise ValueError(f"Cannot import into {table}.")
+    fmt = get_format(path, fmt)
+    writer = (
+        database.upsert_bulk
+        if table == "caught_pokemons"
+        else database.insert_spawns
+    )
+    total = 0
+    with open_file(path, "r") as in_file:
+        if fmt == "csv":
+            reader = csv.DictReader(in_file)
+        else:
+            reader = (
+                json.loads(line)
+                for line in in_file
+                if line.strip()
+            )
+        batch = []
+        for row in reader:
+            batch.append(_convert(row))
+            if len(batch) >= chunk_size:
+                writer(batch)
+                total += len(batch)
+                batch = []
+                yield total
+        if batch:
+            writer(batch)
+            total += len(batch)
+            yield total
+
+
+def export_table(
+    database: DBConnector, path: str,
+    table: str = "caught_pokemons",
+    fmt: Optional[str] = None,
+    chunk_size: int = 1000,
+    progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Exports a table to a file and returns the number of rows written.
+    The progress callback receives the running total after every chunk.
+    """
+    total = 0
+    for total in iter_export(database, path, table, fmt, chunk_size):
+        if progress:
+            progress(total)
+    return total
+
+
+def import_table(
+    database: DBConnector, path: str,
+    table: str = "caught_pokemons",
+    fmt: Optional[str] = None,
+    chunk_size: int = 1000,
+    progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Imports a file into a table and returns the number of rows read.
+    The progress callback receives the running total after every chunk.
+    """
+    total = 0
+    for total in iter_import(database, path, table, fmt, chunk_size):
+        if progress:
+            progress(total)
+    return total
+
+
+def transfer(action: str, db_path: str, path: str, **kwargs) -> int:
+    """
+    Runs export_table or import_table on a connection of its own,
+    so that it can run in an executor thread while the bot keeps going.
+    """
+    func = export_table if action == "export" else import_table
+    database = DBConnector(db_path)
+    try:
+        return func(database, path, **kwargs)
+    finally:
+        database.conn.close()
+
+
+def main():
+    """
+    Command line entrypoint for exporting/importing the database.
+    """
+    parser = argparse.ArgumentParser(
+        description="Stream the Pokeball database to/from CSV or JSONL."
+    )
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("--db_path", default="data/pokeball.db")
+    parser.add_argument(
+        "--table", default="caught_pokemons",
+        choices=list(EXPORTABLE)
+    )
+    parser.add_argument(
+        "--output",
+        help="File to export to. Add .gz to compress it."
+    )
+    parser.add_argument("--input", help="File to import from.")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--chunk_size", type=int, default=1000)
+    parsed = parser.parse_args()
+    database = DBConnector(parsed.db_path)
+    database.create_caught_table()
+    database.create_summary_table()
+    database.create_spawns_table()
+
+    def progress(total: int):
+        print(f"\r{parsed.action.title()}ed {total:,} rows...", end="")
+
+    if parsed.action == "export":
+        path = parsed.output or f"{parsed.table}.csv.gz"
+        total = export_table(
+            database, path, parsed.table, parsed.format,
+            parsed.chunk_size, progress
+        )
+    else:
+        if not parsed.input:
+            parser.error("--input is required for importing.")
+        path = parsed.input
+        total = import_table(
+            database, path, parsed.table, parsed.format,
+            parsed.chunk_size, progress
+        )
+    print(f"\r{parsed.action.title()}ed {total:,} rows ({path}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Offline Maintenance Tool for the Pokeball Database.
+
+Works without starting the Discord client.
+Run it from the Launch folder:
+    python -m scripts.base.dbtool stats
+    python -m scripts.base.dbtool analyze wal-checkpoint
+    python -m scripts.base.dbtool compact --db_path data/pokeball.db
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Sequence
+
+from .dbconn import DBConnector
+
+# The cheap steps are safe to run from inside the bot during idle periods.
+CHEAP_STEPS = ["analyze", "wal-checkpoint"]
+STEPS = [
+    "stats", "integrity-check", "analyze",
+    "wal-checkpoint", "vacuum", "compact"
+]
+
+
+def run_step(database: DBConnector, step: str) -> Dict:
+    """
+    Runs a single maintenance step and returns its result along with the timing.
+    """
+    actions = {
+        "stats": database.get_db_stats,
+        "integrity-check": database.integrity_check,
+        "analyze": database.analyze,
+        "wal-checkpoint": lambda: database.wal_checkpoint("TRUNCATE"),
+        "vacuum": database.vacuum,
+        "compact": database.compact
+    }
+    if step not in actions:
+        raise ValueError(f"Unknown maintenance step: {step}")
+    tstart = time.perf_counter()
+    result = actions[step]()
+    return {
+        "step": step,
+        "seconds": round(time.perf_counter() - tstart, 4),
+        "result": list(result) if isinstance(result, tuple) else result
+    }
+
+
+def run_maintenance(
+    database: DBConnector, steps: Sequence[str],
+    row_counts: bool = True
+) -> Dict:
+    """
+    Runs the given steps in order and reports the DB stats before and after.
+    """
+    before = database.get_db_stats(row_counts)
+    results = [
+        run_step(database, step)
+        for step in steps
+        if step != "stats"
+    ]
+    after = database.get_db_stats(row_counts)
+    return {
+        "before": before,
+        "after": after,
+        "steps": results,
+        "saved_bytes": (
+            before["db_size"] + before["wal_size"]
+            - after["db_size"] - after["wal_size"]
+        )
+    }
+
+
+def run_idle_maintenance(db_path: str, allow_vacuum: bool = False) -> Dict:
+    """
+    Runs the cheap steps (and a vacuum if allowed and the DB is fragmented)
+    on a connection of its own, so that it can run in an executor thread.
+    The row counts are skipped, the page counts are enough for the report.
+    """
+    database = DBConnector(db_path)
+    try:
+        steps = list(CHEAP_STEPS)
+        if allow_vacuum and database.get_db_stats(False)["free_ratio"] > 0.25:
+            steps.append("vacuum")
+        return run_maintenance(database, steps, row_counts=False)
+    finally:
+        database.conn.close()
+
+
+def format_report(report: Dict) -> List[str]:
+    """
+    Converts a maintenance report into human readable lines.
+    """
+    before, after = report["before"], report["after"]
+    lines = [
+        f"Size: {before['db_size'] / 1024:,.1f} KiB "
+        f"(+{before['wal_size'] / 1024:,.1f} KiB WAL) -> "
+        f"{after['db_size'] / 1024:,.1f} KiB "
+        f"(+{after['wal_size'] / 1024:,.1f} KiB WAL)",
+        f"Free pages: {before['freelist_count']:,} -> {after['freelist_count']:,}"
+    ]
+    for step in report["steps"]:
+        line = f"{step['step']}: {step['seconds'] * 1000:,.1f} ms"
+        if step["step"] == "integrity-check":
+            line += f" ({'ok' if not step['result'] else step['result']})"
+        lines.append(line)
+    return lines
+
+
+def main():
+    """
+    Command line entrypoint for the maintenance tool.
+    """
+    parser = argparse.ArgumentParser(
+        description="Maintain the Pokeball database without starting the bot."
+    )
+    parser.add_argument("steps", nargs="+", choices=STEPS)
+    parser.add_argument("--db_path", default="data/pokeball.db")
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Print the raw report as JSON."
+    )
+    parsed = parser.parse_args()
+    if not os.path.isfile(parsed.db_path):
+        # sqlite3 would create an empty DB at a mistyped path.
+        print(f"No database found at {parsed.db_path}.", file=sys.stderr)
+        sys.exit(1)
+    database = DBConnector(parsed.db_path)
+    report = run_maintenance(database, parsed.steps)
+    if parsed.json:
+        print(json.dumps(report, indent=3))
+        return
+    if "stats" in parsed.steps:
+        for key, val in report["before"].items():
+            print(f"{key:<16}{val}")
+    if report["steps"]:
+        print("\n".join(format_report(report)))
+
+
+if __name__ == "__main__":
+    main()
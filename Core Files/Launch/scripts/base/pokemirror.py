@@ -0,0 +1,314 @@
+"""
+Columnar In-Memory Mirror of the caught_pokemons table.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .dbconn import DBConnector
+
+
+class CollectionMirror:
+    """A NumPy based columnar copy of the logged pokemons for fast analytics.
+
+    Every column lives in its own preallocated array which grows geometrically.
+    Species names are interned into integer codes, so that group-bys
+    become simple bincounts and sorts over integer arrays.
+    Deleted rows are only masked out and get compacted away lazily.
+
+    Attributes
+    ----------
+    pokeid : np.ndarray
+        the pokemon ids (int64).
+    level : np.ndarray
+        the levels (int16).
+    iv : np.ndarray
+        the total IV percentages (float32).
+    species : np.ndarray
+        the interned species codes (int32).
+    names : list
+        the species name for every species code.
+
+    Methods
+    -------
+    from_db(database, chunk_size)
+        Builds a mirror from the current contents of the database.
+
+    from_path(db_path, chunk_size)
+        Builds a mirror on a connection of its own (for executor threads).
+
+    add(rows)
+        Mirrors a batch of inserted rows, ignoring the existing pokeids.
+
+    remove(pokeids)
+        Mirrors a deletion of the given pokeids.
+
+    clear()
+        Mirrors a reset of the table.
+
+    columns(name)
+        Returns the compacted arrays, optionally for a single species.
+
+    histogram(column, bins, name)
+        Histogram of the IVs or the levels.
+
+    top_species(top)
+        Species with the most duplicates.
+
+    best_of_species(top)
+        The highest IV pokemon of every species.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.dead = 0
+        self.sorted = True
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self._allocate(capacity)
+
+    def __len__(self):
+        return self.size - self.dead
+
+    @classmethod
+    def from_db(
+        cls, database: DBConnector,
+        chunk_size: int = 50000
+    ) -> CollectionMirror:
+        """
+        Builds a mirror from the current contents of the database.
+        """
+        mirror = cls(capacity=max(1024, database.get_total()))
+        batch = []
+        for row in database.iter_query(
+            output_cols=["pokeid", "name", "level", "iv"],
+            order_by="pokeid", chunk_size=chunk_size
+        ):
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                mirror.add(batch)
+                batch = []
+        if batch:
+            mirror.add(batch)
+        return mirror
+
+    @classmethod
+    def from_path(
+        cls, db_path: str,
+        chunk_size: int = 50000
+    ) -> CollectionMirror:
+        """
+        Builds a mirror using a connection of its own, since the bot's
+        connection can't be used from an executor thread.
+        """
+        database = DBConnector(db_path)
+        try:
+            return cls.from_db(database, chunk_size=chunk_size)
+        finally:
+            database.conn.close()
+
+    def intern(self, name: str) -> int:
+        """
+        Returns the integer code for a species name.
+        """
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def add(self, rows: Iterable[Dict]):
+        """
+        Mirrors a batch of inserted rows.
+        Rows with an already mirrored pokeid are ignored like INSERT OR IGNORE.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        pokeids = np.fromiter(
+            (row["pokeid"] for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+        pokeids, first = np.unique(pokeids, return_index=True)
+        keep = ~self._contains(pokeids)
+        first = first[keep]
+        if first.size == 0:
+            return
+        first.sort()
+        rows = [rows[idx] for idx in first]
+        count = len(rows)
+        self._reserve(self.size + count)
+        new = slice(self.size, self.size + count)
+        self.pokeid[new] = [row["pokeid"] for row in rows]
+        self.level[new] = [row["level"] or 0 for row in rows]
+        self.iv[new] = [row["iv"] or 0.0 for row in rows]
+        self.species[new] = [
+            self.intern(row["name"].title())
+            for row in rows
+        ]
+        self.alive[new] = True
+        if self.sorted:
+            block = self.pokeid[new]
+            self.sorted = bool(
+                np.all(block[1:] > block[:-1])
+                and (self.size == 0 or block[0] > self.pokeid[self.size - 1])
+            )
+        self.size += count
+
+    def remove(self, pokeids: Iterable[int]):
+        """
+        Mirrors a deletion of the given pokeids.
+        """
+        pokeids = np.asarray(list(pokeids), dtype=np.int64)
+        if pokeids.size == 0 or self.size == 0:
+            return
+        if self.sorted:
+            ids = self.pokeid[:self.size]
+            idx = np.searchsorted(ids, pokeids)
+            idx = idx[idx < self.size]
+            idx = idx[np.isin(ids[idx], pokeids)]
+        else:
+            idx = np.flatnonzero(np.isin(self.pokeid[:self.size], pokeids))
+        idx = idx[self.alive[idx]]
+        self.alive[idx] = False
+        self.dead += idx.size
+        if self.dead > max(1024, self.size // 4):
+            self.compact()
+
+    def clear(self):
+        """
+        Mirrors a reset of the table.
+        """
+        self.size = 0
+        self.dead = 0
+        self.sorted = True
+        self.alive[:] = False
+
+    def compact(self):
+        """
+        Drops the deleted rows and restores the pokeid ordering.
+        """
+        mask = self.alive[:self.size]
+        order = np.flatnonzero(mask)
+        order = order[np.argsort(self.pokeid[order], kind="stable")]
+        count = order.size
+        for column in ("pokeid", "level", "iv", "species"):
+            arr = getattr(self, column)
+            arr[:count] = arr[order]
+        self.alive[:count] = True
+        self.alive[count:self.size] = False
+        self.size = count
+        self.dead = 0
+        self.sorted = True
+
+    def columns(
+        self, name: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the (pokeid, level, iv, species) arrays of the live rows.
+        A species name can be provided to filter the rows.
+        """
+        mask = self.alive[:self.size].copy()
+        if name:
+            code = self.codes.get(name.title(), -1)
+            mask &= self.species[:self.size] == code
+        return (
+            self.pokeid[:self.size][mask],
+            self.level[:self.size][mask],
+            self.iv[:self.size][mask],
+            self.species[:self.size][mask]
+        )
+
+    def histogram(
+        self, column: str = "iv",
+        bins: int = 10, name: Optional[str] = None
+    ) -> List[Tuple[float, float, int]]:
+        """
+        Returns (lower_edge, upper_edge, count) for every bin of a column.
+        """
+        _, level, total_iv, _ = self.columns(name)
+        values, value_range = (
+            (total_iv, (0, 100)) if column == "iv"
+            else (level, (1, 100))
+        )
+        counts, edges = np.histogram(values, bins=bins, range=value_range)
+        return [
+            (float(edges[idx]), float(edges[idx + 1]), int(count))
+            for idx, count in enumerate(counts)
+        ]
+
+    def top_species(self, top: int = 10) -> List[Tuple[str, int, float]]:
+        """
+        Returns (name, count, mean_iv) for the species with most duplicates.
+        """
+        _, _, total_iv, species = self.columns()
+        counts = np.bincount(species, minlength=len(self.names))
+        iv_sums = np.bincount(
+            species, weights=total_iv,
+            minlength=len(self.names)
+        )
+        top = min(top, int(np.count_nonzero(counts)))
+        if top <= 0:
+            return []
+        best = np.argpartition(-counts, top - 1)[:top]
+        best = best[np.argsort(-counts[best], kind="stable")]
+        return [
+            (self.names[code], int(counts[code]), float(iv_sums[code] / counts[code]))
+            for code in best
+        ]
+
+    def best_of_species(
+        self, top: Optional[int] = None
+    ) -> List[Tuple[str, int, float, int]]:
+        """
+        Returns (name, pokeid, iv, level) of the highest IV pokemon per species,
+        sorted by descending IV.
+        """
+        pokeid, level, total_iv, species = self.columns()
+        if species.size == 0:
+            return []
+        order = np.lexsort((pokeid, -total_iv, species))
+        grouped = species[order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], grouped[1:] != grouped[:-1]))
+        )
+        best = order[starts]
+        best = best[np.argsort(-total_iv[best], kind="stable")][:top]
+        return [
+            (
+                self.names[species[idx]], int(pokeid[idx]),
+                float(total_iv[idx]), int(level[idx])
+            )
+            for idx in best
+        ]
+
+    def _allocate(self, capacity: int):
+        self.pokeid = np.zeros(capacity, dtype=np.int64)
+        self.level = np.zeros(capacity, dtype=np.int16)
+        self.iv = np.zeros(capacity, dtype=np.float32)
+        self.species = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def _reserve(self, required: int):
+        capacity = self.pokeid.size
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        for column in ("pokeid", "level", "iv", "species", "alive"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, column, new)
+
+    def _contains(self, pokeids: np.ndarray) -> np.ndarray:
+        if self.size == 0:
+            return np.zeros(pokeids.size, dtype=bool)
+        ids = self.pokeid[:self.size]
+        if self.sorted:
+            idx = np.minimum(np.searchsorted(ids, pokeids), self.size - 1)
+            return (ids[idx] == pokeids) & self.alive[idx]
+        return np.isin(pokeids, ids[self.alive[:self.size]])
@@ -0,0 +1,183 @@
+"""
+Parameterized Query Builder for the DBConnector.
+"""
+
+# pylint: disable=too-many-arguments
+
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+CAUGHT_COLUMNS = (
+    "caught_on", "name", "pokeid", "level",
+    "iv", "category", "nickname"
+)
+
+# Nullable columns are not allowed in ORDER BY since
+# keyset comparisons against NULL never evaluate to True.
+CAUGHT_ORDERINGS = (
+    "caught_on", "name", "pokeid",
+    "level", "iv", "category"
+)
+
+SPAWN_COLUMNS = (
+    "ts", "guild_id", "channel_id", "name", "confidence",
+    "download_ms", "predict_ms", "catch_ms", "image_url", "outcome"
+)
+
+SPAWN_OUTCOMES = ("caught", "wrong", "skipped", "sniped", "failed")
+
+
+class QueryBuilder:
+    """Builds parameterized SELECT statements for a single table.
+
+    Every identifier is checked against a whitelist and every value is bound,
+    so the generated SQL only depends on the *shape* of a query.
+    The shapes are cached in an LRU, which keeps the SQL text stable
+    and lets SQLite reuse its prepared statements.
+
+    Attributes
+    ----------
+    table : str
+        the table being queried.
+    columns : tuple
+        the whitelist of selectable/filterable columns.
+    orderings : tuple
+        the whitelist of columns which can be used for ordering.
+    dup_subquery : str
+        the subquery which selects the names having at least `?` duplicates.
+
+    Methods
+    -------
+    select(
+        output_cols, filters, level_range, iv_range,
+        order_by, limit, dup_count, after
+    )
+        Returns the SQL and the bound parameters for a SELECT.
+    """
+    def __init__(
+        self, table: str = "caught_pokemons",
+        columns: Sequence[str] = CAUGHT_COLUMNS,
+        orderings: Sequence[str] = CAUGHT_ORDERINGS,
+        cache_size: int = 64,
+        dup_subquery: Optional[str] = None
+    ):
+        self.table = table
+        self.columns = tuple(columns)
+        self.orderings = tuple(orderings)
+        self.dup_subquery = dup_subquery or f'''
+            SELECT name FROM {table}
+            GROUP BY name
+            HAVING COUNT(name) >= ?
+        '''
+        self._build = lru_cache(maxsize=cache_size)(self._build_shape)
+
+    def cache_info(self):
+        """
+        Returns the hit/miss statistics for the statement shape cache.
+        """
+        return self._build.cache_info()
+
+    def check_columns(self, cols: Sequence[str]) -> Tuple[str, ...]:
+        """
+        Validates a list of columns against the whitelist.
+        """
+        cols = tuple(cols)
+        unknown = [col for col in cols if col not in self.columns]
+        if unknown:
+            raise ValueError(
+                f"Unknown column(s) for {self.table}: {', '.join(unknown)}"
+            )
+        return cols
+
+    def parse_order(self, order_by: str) -> Tuple[str, bool]:
+        """
+        Converts an ordering like "-iv" into ("iv", True).
+        """
+        desc = order_by.startswith('-')
+        col = order_by.lstrip('-').strip()
+        if col not in self.orderings:
+            raise ValueError(f"Cannot order {self.table} by {col}.")
+        return col, desc
+
+    def select(
+        self, output_cols: Sequence[str],
+        filters: Optional[Dict] = None,
+        level_range: Optional[Tuple[int, int]] = None,
+        iv_range: Optional[Tuple[float, float]] = None,
+        order_by: str = "pokeid", limit: int = -1,
+        dup_count: int = 0, after: Optional[Tuple] = None
+    ) -> Tuple[str, tuple]:
+        """
+        Returns the SQL and the bound parameters for a SELECT.
+        If `after` is given, it is treated as a keyset cursor of the form
+        (last_order_value, last_pokeid) and only the rows after it are selected.
+        """
+        output_cols = self.check_columns(output_cols)
+        filters = filters or {}
+        self.check_columns(filters.keys())
+        order_col, desc = self.parse_order(order_by)
+        filter_shape = []
+        params = []
+        for key, val in filters.items():
+            if isinstance(val, (list, tuple, set)):
+                val = list(val)
+                filter_shape.append((key, len(val)))
+                params.extend(val)
+            else:
+                filter_shape.append((key, None))
+                params.append(val)
+        if iv_range is not None:
+            params.extend(iv_range)
+        if level_range is not None:
+            params.extend(level_range)
+        if dup_count > 0:
+            params.append(dup_count)
+        if after is not None:
+            if order_col == "pokeid":
+                params.append(after[-1])
+            else:
+                params.extend(after)
+        params.append(limit)
+        query = self._build(
+            output_cols, tuple(filter_shape),
+            iv_range is not None, level_range is not None,
+            dup_count > 0, order_col, desc, after is not None
+        )
+        return query, tuple(params)
+
+    def _build_shape(
+        self, output_cols: Tuple[str, ...],
+        filter_shape: Tuple[Tuple[str, Optional[int]], ...],
+        has_iv: bool, has_level: bool, has_dups: bool,
+        order_col: str, desc: bool, has_cursor: bool
+    ) -> str:
+        output_cols_str = ', '.join(f'"{col}"' for col in output_cols)
+        conditions = []
+        for key, size in filter_shape:
+            if size is None:
+                conditions.append(f"{key} IS ?")
+            elif size == 0:
+                conditions.append("0")
+            else:
+                conditions.append(f"{key} IN ({', '.join('?' * size)})")
+        if has_iv:
+            conditions.append("iv BETWEEN ? AND ?")
+        if has_level:
+            conditions.append("level BETWEEN ? AND ?")
+        if has_dups:
+            conditions.append(f"name IN ({self.dup_subquery})")
+        direction = "DESC" if desc else "ASC"
+        operator = "<" if desc else ">"
+        if has_cursor:
+            if order_col == "pokeid":
+                conditions.append(f"pokeid {operator} ?")
+            else:
+                conditions.append(f"({order_col}, pokeid) {operator} (?, ?)")
+        query = f"SELECT {output_cols_str} FROM {self.table}"
+        if conditions:
+            query += "\nWHERE " + "\nAND ".join(conditions)
+        order_str = f"{order_col} {direction}"
+        if order_col != "pokeid":
+            order_str += f", pokeid {direction}"
+        query += f"\nORDER BY {order_str}\nLIMIT ?;"
+        return query
@@ -9,6 +9,8 @@ from abc import ABC
 from functools import wraps
 from typing import Callable, Optional, TYPE_CHECKING
 
+from ..helpers.jobs import TRANSIENT_KWARGS
+
 if TYPE_CHECKING:
     from pokeball import PokeBall
 
@@ -115,6 +117,46 @@ def get_chan(func: Callable):
     return wrapped
 
 
+def queued(timeout: Optional[float] = None, resumable: bool = False):
+    '''
+    Runs a multi-step workflow as a job in the queue of its channel,
+    so that its wait_for checks never pick up the replies meant for another one.
+    Resumable jobs persist their arguments, so they can be restarted
+    after a crash, and save their progress using ctx.jobs.save().
+    Has to be placed below get_chan, which provides the channel.
+    '''
+    def decorator(func: Callable):
+        name = func.__name__.split("__")[-1].replace("cmd_", "")
+
+        @wraps(func)
+        def wrapped(self, message, *args, **kwargs):
+            row_id = kwargs.pop("resume_job", None)
+            chan = kwargs.get("chan", message.channel)
+            jobs = self.ctx.jobs
+            current = jobs.current()
+            if current is not None and current.channel_id == chan.id:
+                # A job calling another one already holds the channel.
+                return func(self, *args, message=message, **kwargs)
+            if resumable and row_id is None:
+                row_id = jobs.persist(name, chan.id, {
+                    "module": type(self).__name__.replace("Commands", "").lower(),
+                    "command": func.__name__,
+                    "origin_id": message.channel.id,
+                    "args": kwargs.get("args") or [],
+                    "kwargs": {
+                        key: val
+                        for key, val in kwargs.items()
+                        if key not in TRANSIENT_KWARGS
+                        and isinstance(val, (str, int, float, bool, list))
+                    }
+                })
+            coro = func(self, *args, message=message, **kwargs)
+            job = jobs.submit(name, chan.id, coro, timeout, row_id=row_id)
+            return jobs.wait(job)
+        return wrapped
+    return decorator
+
+
 def maintenance(text: Optional[str] = None):
     '''
     Disable a broken/wip function to prevent it from affecting rest of the selfbot.
@@ -148,7 +190,31 @@ class Commands(ABC):
         self.ctx = ctx
         self.database = self.ctx.database
         self.logger = self.ctx.logger
-        self.enabled = kwargs.get('enabled', True)
+        self._enabled = kwargs.get('enabled', True)
+
+    def carry_over(self, old: Commands):
+        '''
+        Takes over the runtime state of the instance replaced by a reload,
+        like the enabled flag and the caches which both the versions define.
+        '''
+        for key, val in vars(old).items():
+            if key in vars(self) and key not in ("ctx", "database", "logger"):
+                setattr(self, key, val)
+
+    @property
+    def enabled(self) -> bool:
+        '''
+        Whether the commands of this module can be used.
+        Toggling it rebuilds the command registry.
+        '''
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        self._enabled = value
+        registry = getattr(self.ctx, "registry", None)
+        if registry is not None:
+            registry.rebuild()
 
     @property
     def enable(self):
@@ -4,12 +4,17 @@ Control Commands Module
 
 # pylint: disable=unused-argument
 
+import asyncio
 import os
 import subprocess
+import time
+from datetime import datetime
 from typing import List, Optional
 
 from discord import Message
 
+from ..helpers.metrics import get_rss
+from ..helpers.profiler import format_bytes, memory_breakdown
 from ..helpers.utils import (
     get_embed, get_enum_embed, send_embed
 )
@@ -22,7 +27,7 @@ class ControlCommands(Commands):
     provide selfbot specific functionality.
     Examples:
         Togglers, Help, Command Lister,
-        Setup_server, Restart, Channel
+        Setup_server, Restart, Channel, Profile, Memory, Jobs
     '''
 
     @maintenance
@@ -178,11 +183,7 @@ class ControlCommands(Commands):
                 title="Possible toggle states"
             )
             await send_embed(message.channel, embed=embed)
-        possible_modules = [
-            cmd.replace("commands", "")
-            for cmd in dir(self.ctx)
-            if cmd.endswith("commands") and cmd != "load_commands"
-        ] + ["config"]
+        possible_modules = list(self.ctx.registry.modules) + ["config"]
         if module not in possible_modules:
             embed = get_enum_embed(
                 possible_modules,
@@ -233,11 +234,7 @@ class ControlCommands(Commands):
         if not args:
             return
         module = args[0].lower()
-        possible_modules = [
-            cmd.replace("commands", "")
-            for cmd in dir(self.ctx)
-            if cmd.endswith("commands") and cmd != "load_commands"
-        ] + ["config"]
+        possible_modules = list(self.ctx.registry.modules) + ["config"]
         if module not in possible_modules:
             embed = get_enum_embed(
                 possible_modules,
@@ -246,7 +243,15 @@ class ControlCommands(Commands):
             await send_embed(message.channel, embed=embed)
         else:
             if module == "config":
-                self.ctx.update_configs()
+                if not self.ctx.hot_reloader.reload_config():
+                    await send_embed(
+                        message.channel,
+                        embed=get_embed(
+                            "The configs are invalid, check the console for details.",
+                            embed_type="error"
+                        )
+                    )
+                    return
             elif module == "advanced":
                 try:
                     self.ctx.load_commands(module, reload_module=True)
@@ -339,3 +344,257 @@ class ControlCommands(Commands):
                     timestamp=True,
                     color="green"
                 )
+
+    async def cmd_profile(
+        self, message: Message,
+        args: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Profile the CPU usage of the running bot.
+        $```scss
+        {command_prefix}profile [seconds]
+        {command_prefix}profile stop
+        ```$
+
+        @Samples the stacks of all the threads for the given seconds (default 30)
+        and writes them to data/profiles in the collapsed stack format,
+        which can be opened with speedscope or flamegraph.pl.
+        The functions which were running the most are also displayed.@
+
+        ~To profile the bot for a minute:
+            ```
+            {command_prefix}profile 60
+            ```
+        To stop the profiler early:
+            ```
+            {command_prefix}profile stop
+            ```~
+        """
+        profiler = self.ctx.profiler
+        if args and args[0].lower() == "stop":
+            if profiler.started is None:
+                await send_embed(
+                    message.channel,
+                    embed=get_embed(
+                        "The profiler isn't running.",
+                        embed_type="warning"
+                    )
+                )
+                return
+            await self.__finish_profile(message)
+            return
+        if profiler.started is not None:
+            await send_embed(
+                message.channel,
+                embed=get_embed(
+                    "The profiler is already running.",
+                    embed_type="warning"
+                )
+            )
+            return
+        seconds = 30
+        if args and args[0].isdigit():
+            seconds = min(max(int(args[0]), 1), 600)
+        session = profiler.start(seconds)
+        await send_embed(
+            message.channel,
+            embed=get_embed(f"Profiling the CPU for {seconds} seconds...")
+        )
+        await asyncio.sleep(seconds)
+        # Unless it was stopped early (or restarted) in the meantime.
+        if profiler.session == session and profiler.started is not None:
+            await self.__finish_profile(message)
+
+    async def __finish_profile(self, message: Message):
+        profiler = self.ctx.profiler
+        elapsed = time.perf_counter() - profiler.started
+        path = profiler.stop(
+            os.path.join(
+                "data", "profiles",
+                f"cpu_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+            )
+        )
+        embed = get_embed(
+            f"Took {profiler.samples:,} samples in {elapsed:.1f} seconds.\n"
+            f"Collapsed stacks saved to `{path}`.",
+            title="CPU Profile"
+        )
+        for leaf, share in profiler.hottest(5):
+            embed.add_field(
+                name=f"{share * 100:.1f}% of the samples",
+                value=leaf[:1024],
+                inline=False
+            )
+        await send_embed(message.channel, embed=embed)
+
+    async def cmd_memory(
+        self, message: Message,
+        args: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Inspect the memory usage of the running bot.
+        $```scss
+        {command_prefix}memory
+        {command_prefix}memory start [frames]
+        {command_prefix}memory snapshot
+        {command_prefix}memory stop
+        ```$
+
+        @Without any arguments, estimates the size of the detector model,
+        the caches, the StatsMonitor and the discord message/member caches.
+        Use start to begin tracing the allocations with tracemalloc,
+        then take snapshots over time to see which lines allocated the most
+        since the previous snapshot. Tracing slows the bot down, so stop it
+        once done.@
+
+        ~To get the memory breakdown:
+            ```
+            {command_prefix}memory
+            ```
+        To find what grows between two points in time:
+            ```
+            {command_prefix}memory start
+            {command_prefix}memory snapshot
+            {command_prefix}memory snapshot
+            {command_prefix}memory stop
+            ```~
+        """
+        tracker = self.ctx.mem_tracker
+        action = args[0].lower() if args else None
+        if action == "start":
+            frames = int(args[1]) if len(args) > 1 and args[1].isdigit() else 1
+            tracker.start(frames)
+            embed = get_embed("Started tracing the memory allocations.")
+        elif action == "stop":
+            tracker.stop()
+            embed = get_embed("Stopped tracing the memory allocations.")
+        elif action == "snapshot":
+            if not tracker.tracing():
+                embed = get_embed(
+                    f"Start the tracing first using `{self.ctx.prefix}memory start`.",
+                    embed_type="warning"
+                )
+            else:
+                snap = await self.ctx.loop.run_in_executor(
+                    None, tracker.snapshot, 10
+                )
+                since = (
+                    f"since {snap['since'].strftime('%H:%M:%S')}"
+                    if snap["since"] else "(first snapshot)"
+                )
+                embed = get_embed(
+                    f"Traced: {format_bytes(snap['current'])} "
+                    f"(peak {format_bytes(snap['peak'])})",
+                    title=f"Top Allocations {since}"
+                )
+                for location, size, diff in snap["top"]:
+                    embed.add_field(
+                        name=location[-256:],
+                        value=f"{format_bytes(size)} ({'+' if diff >= 0 else '-'}"
+                        f"{format_bytes(abs(diff))})",
+                        inline=False
+                    )
+        else:
+            sizes = memory_breakdown(self.ctx)
+            rss = get_rss()
+            embed = get_embed(
+                f"Resident memory: {format_bytes(rss) if rss else 'Unknown'}"
+                + (" | Tracing allocations" if tracker.tracing() else ""),
+                title="Memory Breakdown (estimated)"
+            )
+            for name, size in sorted(
+                sizes.items(), key=lambda item: item[1], reverse=True
+            ):
+                embed.add_field(name=name, value=format_bytes(size))
+        await send_embed(message.channel, embed=embed)
+
+    async def cmd_jobs(
+        self, message: Message,
+        args: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Check or cancel the queued Poketwo workflows.
+        $```scss
+        {command_prefix}jobs
+        {command_prefix}jobs cancel job_id
+        {command_prefix}jobs resume saved_id
+        ```$
+
+        @Multi-step commands like pokelog, trade and mass_release run as jobs,
+        one at a time per channel and in parallel across channels.
+        Lists the queued and running jobs with their progress,
+        along with the recently finished ones.
+        A queued or running job can be cancelled using its id.
+        Jobs like pokelog and mass_release save their progress and resume
+        by themselves after a restart. If one of them failed, timed out or
+        was cancelled, it can be resumed using its saved id.@
+
+        ~To check the jobs:
+            ```
+            {command_prefix}jobs
+            ```
+        To cancel the job #3:
+            ```
+            {command_prefix}jobs cancel 3
+            ```
+        To resume the pokelog saved as 12:
+            ```
+            {command_prefix}jobs resume 12
+            ```~
+        """
+        jobs = self.ctx.jobs
+        if args and args[0].lower() == "cancel":
+            if len(args) > 1 and args[1].lstrip("#").isdigit():
+                cancelled = jobs.cancel(int(args[1].lstrip("#")))
+            else:
+                cancelled = False
+            embed = (
+                get_embed(f"Cancelled the job {args[1]}.")
+                if cancelled
+                else get_embed(
+                    "There's no queued or running job with that id.",
+                    embed_type="warning"
+                )
+            )
+            await send_embed(message.channel, embed=embed)
+            return
+        if args and args[0].lower() == "resume":
+            saved_id = args[1].lstrip("#") if len(args) > 1 else ""
+            rows = [
+                row for row in self.database.get_jobs(
+                    ["failed", "timeout", "cancelled"]
+                )
+                if str(row["job_id"]) == saved_id
+            ]
+            if rows and jobs.resume_row(rows[0]):
+                embed = get_embed(f"Resumed the {rows[0]['name']} saved as {saved_id}.")
+            else:
+                embed = get_embed(
+                    "There's no resumable job saved with that id.",
+                    embed_type="warning"
+                )
+            await send_embed(message.channel, embed=embed)
+            return
+        active = jobs.active()
+        embed = get_embed(
+            f"{len(active)} active job(s), "
+            f"up to {jobs.max_parallel} at once across the channels.",
+            title="Jobs"
+        )
+        for job in active + jobs.recent(5):
+            details = [
+                f"<#{job.channel_id}>",
+                f"{job.status} for {job.elapsed:.0f}s"
+            ]
+            if job.row_id is not None:
+                details.append(f"saved as {job.row_id}")
+            if job.progress:
+                details.append(job.progress)
+            if job.error:
+                details.append(job.error[:200])
+            embed.add_field(
+                name=f"#{job.job_id} {job.name}",
+                value="\n".join(details),
+                inline=False
+            )
+        await send_embed(message.channel, embed=embed)
@@ -20,25 +20,21 @@ from typing import Callable, Dict, List, Optional
 
 import discord
 from discord import Message, TextChannel
-from matplotlib import pyplot as plt
-from matplotlib.ticker import MaxNLocator
 
 from ..helpers.checks import (
     poketwo_embed_cmd, poketwo_reply_cmd,
     user_check
 )
+from ..helpers.listing_parser import iter_market
 from ..helpers.utils import (
-    get_embed, get_enum_embed, send_embed,
-    wait_for
+    get_embed, get_enum_embed, log_skipped,
+    send_embed, wait_for
 )
 from .pokecommands import PokeCommands
 from .basecommand import (
-    get_chan, get_prefix, maintenance
+    get_chan, get_prefix, maintenance, queued
 )
 
-COLORS = plt.rcParams["axes.prop_cycle"]()
-plt.rcParams.update({'font.size': 14})
-
 
 def get_modded_name(func: Callable):
     '''
@@ -470,6 +466,7 @@ class MarketCommands(PokeCommands):
 
     @get_chan
     @get_prefix
+    @queued(timeout=60)
     async def __buy(self, message: Message, **kwargs) -> bool:
         pref = kwargs["pref"]
         chan = kwargs["chan"]
@@ -634,23 +631,9 @@ class MarketCommands(PokeCommands):
                 timestamp=True
             )
             return (None, False)
-        listing = reply.embeds[0].description.splitlines()
-        mkt_data = []
-        bad_chars = [r'\\xa0+', r'\*+', r'•+',
-                     r'<+.+>+\s', r'\s\s+', '♂', '♀️']
-        mkt_patt = r"`(?P<Mktid>.+)`.+Level\s(?P<Level>\d+)\s" + \
-            r"(?P<Name>.+)\s(?P<IV>.+)\%\s(?P<Credits>.+)pc"
-        for poke in listing:
-            cleaned = poke
-            for char in bad_chars:
-                cleaned = re.sub(char, " ", cleaned)
-            data = re.search(mkt_patt, cleaned).groupdict()
-            data["Mktid"] = data["Mktid"].strip()
-            data["Level"] = int(data["Level"])
-            data["IV"] = float(data["IV"])
-            data["Credits"] = int(data["Credits"].strip().replace(',', ''))
-            data["Shiny"] = "✨" in cleaned
-            mkt_data.append(data)
+        skipped = []
+        mkt_data = list(iter_market(reply.embeds[0].description, skipped))
+        log_skipped(self.ctx, skipped)
         return mkt_data, wait_failed
 
     async def __get_mkt_list(
@@ -787,6 +770,7 @@ class MarketCommands(PokeCommands):
 
     @get_chan
     @get_prefix
+    @queued(timeout=60)
     async def __sell(self, message: Message, **kwargs) -> bool:
         pref = kwargs["pref"]
         chan = kwargs["chan"]
@@ -924,32 +908,14 @@ class MarketCommands(PokeCommands):
         } if kwargs.get(
             "modded_name", None
         ) else {**self.tracked}
-        plt.figure(figsize=(10, 8))
-        fig = plt.figure(figsize=(10, 8))
-        num_subplots = len(tracked)
-        for idx, (poke, data) in enumerate(tracked.items()):
-            subp = fig.add_subplot(num_subplots, 1, idx + 1)
-            subp.plot(
-                range(len(data["price"])),
-                data["price"],
-                'o-', label=poke,
-                color=next(COLORS)["color"]
-            )
-            for idx, price in enumerate(data["price"]):
-                subp.annotate(
-                    text=f'{price} pc',
-                    xy=(idx, price),
-                    horizontalalignment='center',
-                    verticalalignment='center'
-                )
-            subp.yaxis.set_major_locator(MaxNLocator(integer=True))
-            subp.legend()
-            subp.set_ylabel("Pokecredits", fontsize=20)
-            subp.axes.get_xaxis().set_visible(False)
-        plt.tight_layout()
-        byio = BytesIO()
-        fig.savefig(byio)
-        byio.seek(0)
+        png = await self.ctx.charts.render(
+            "stocks",
+            prices={
+                poke: list(data["price"])
+                for poke, data in tracked.items()
+            }
+        )
+        byio = BytesIO(png)
         graph = discord.File(byio, "PokeTwo Stocks.png")
         await delme.delete()
         await message.channel.send(file=graph)
@@ -6,9 +6,11 @@ Normal Commands Module
 # pylint: disable=unused-argument, too-many-locals
 
 import asyncio
+import functools
 import os
 import random
-import re
+import time
+from datetime import datetime
 from itertools import groupby
 from math import ceil
 from typing import List, Optional
@@ -20,15 +22,16 @@ from discord import (
     TextChannel, CategoryChannel
 )
 
+from ..base.dbexport import transfer
+from ..base.pokemirror import CollectionMirror
 from ..helpers.checks import (
     poketwo_embed_cmd,
     user_check
 )
 from ..helpers.paginator import Paginator
 from ..helpers.utils import (
-    get_embed, get_message,
-    get_modules, wait_for,
-    send_embed, edit_embed
+    get_embed, get_enum_embed, get_message,
+    wait_for, send_embed, edit_embed
 )
 from .basecommand import (
     Commands, check_db, get_chan,
@@ -43,60 +46,43 @@ class NormalCommands(Commands):
     Examples: Spam, Total, Duplicates, Legendaries, Echo.
     '''
 
-    def __generate_help_embed(self, cmd: str, keep_footer: bool = False):
-        got_doc = False
-        meta = {}
-        if cmd.__doc__:
-            if getattr(cmd, "disabled", False):
-                cmd_name = cmd.__name__.replace('cmd_', '').title()
-                emb = get_embed(
-                    f"**{cmd_name}** is under maintainence.\n"
-                    "Details unavailable, so wait for updates.",
-                    embed_type="warning",
-                    title="Command under Maintainence."
-                )
-                return emb
-            got_doc = True
-            doc_str = cmd.__doc__.replace(
-                "{command_prefix}",
-                self.ctx.prefix
-            )
-            patt = r"\$(?P<Syntax>[^\$]+)\$\s+" + \
-                r"\@(?P<Description>[^\@]+)" + \
-                r"\@(?:\s+\~(?P<Example>[^\~]+)\~)?"
-            meta = re.search(patt, doc_str).groupdict()
-            emb = get_embed(
-                title=cmd.__name__.replace("cmd_", "").title(),
-                content='\u200B',
-                color=11068923
+    def __generate_help_embed(self, entry, keep_footer: bool = False):
+        # Rendered from the docstring metadata parsed by the registry on load.
+        if entry.meta and entry.disabled:
+            return get_embed(
+                f"**{entry.name.title()}** is under maintainence.\n"
+                "Details unavailable, so wait for updates.",
+                embed_type="warning",
+                title="Command under Maintainence."
             )
-        else:
-            emb = get_embed(
+        if not entry.meta:
+            return get_embed(
                 "No help message exists for this command.",
                 embed_type="warning",
                 title="No documentation found."
             )
-        for key, val in meta.items():
+        emb = get_embed(
+            title=entry.name.title(),
+            content='\u200B',
+            color=11068923
+        )
+        for key, val in entry.meta.items():
             if val:
-                val = val.replace("  ", " ")
-                val = '\n'.join(
-                    m.lstrip()
-                    for m in val.split('\n')
+                emb.add_field(
+                    name=f"**{key}**",
+                    value=val.replace("{command_prefix}", self.ctx.prefix),
+                    inline=False
                 )
-                emb.add_field(name=f"**{key}**", value=val, inline=False)
-        if all([
-            got_doc,
-            "alias" in dir(cmd)
-        ]):
-            alt_names = getattr(cmd, "alias")[:]
-            if cmd.__name__.replace("cmd_", "") not in alt_names:
-                alt_names.append(cmd.__name__.replace("cmd_", ""))
+        if entry.aliases:
+            alt_names = entry.aliases[:]
+            if entry.name not in alt_names:
+                alt_names.append(entry.name)
             alias_str = ', '.join(sorted(alt_names, key=len))
             emb.add_field(
                 name="**Alias**",
                 value=f"```\n{alias_str}\n```"
             )
-        if keep_footer and got_doc:
+        if keep_footer:
             emb.set_footer(
                 text="This command helped? You can help me too "
                 "by donating at https://www.paypal.me/hyperclaw79.",
@@ -105,6 +91,43 @@ class NormalCommands(Commands):
             )
         return emb
 
+    def __generate_commands_embed(self):
+        registry = self.ctx.registry
+        modules = sorted(
+            registry.modules.items(),
+            key=lambda item: item[1].__class__.__name__,
+            reverse=True
+        )
+        command_dict = {
+            module.__class__.__name__.replace(
+                "Commands", " Commands"
+            ): '\n'.join(
+                sorted(
+                    [
+                        f"{self.ctx.prefix}{entry.name}"
+                        for entry in registry.catalog.get(mtype, [])
+                        if not entry.disabled and entry.doc
+                    ],
+                    key=len
+                )
+            )
+            for mtype, module in modules
+        }
+        embed = get_embed(
+            f"Use `{self.ctx.prefix}help [command name]` for details",
+            title="Pokeball Selfbot Commands List"
+        )
+        for key, val in command_dict.items():
+            if val:
+                embed.add_field(name=key, value=f"**```\n{val}\n```**")
+        embed.set_footer(
+            text="This command helped? You can help me too by "
+            "donating at https://www.paypal.me/hyperclaw79.",
+            icon_url="https://emojipedia-us.s3.dualstack.us-west-1.amazonaws.com/"
+            "thumbs/160/facebook/105/money-bag_1f4b0.png"
+        )
+        return embed
+
     async def __get_poketwo(self, message: Message):
         try:
             poketwo = await message.guild.query_members(
@@ -399,37 +422,12 @@ class NormalCommands(Commands):
             {command_prefix}help
             ```~
         """
-        modules = get_modules(self.ctx)
-        commands = unfiltered_commands = list(
-            {
-                getattr(module, attr)
-                for module in modules
-                for attr in dir(module)
-                if all(
-                    [
-                        module.enabled,
-                        attr.startswith("cmd_"),
-                        attr.__doc__ is not None
-                    ]
-                )
-            }
-        )
-        modules = sorted(
-            modules,
-            key=lambda x: "Custom" in x.__class__.__name__,
-            reverse=True
-        )
+        registry = self.ctx.registry
+        entries = list(registry.iter_commands())
         if args:
-            commands = []
-            for cmd in unfiltered_commands:
-                if any([
-                    cmd.__name__ == f"cmd_{args[0].lower()}",
-                    args[0].lower() in getattr(cmd, "alias", [])
-                ]) and cmd.__name__ not in (
-                    cm.__name__ for cm in commands
-                ):
-                    commands.append(cmd)
-            if not commands:
+            entry = registry.get(args[0])
+            entries = [entry] if entry else []
+            if not entries:
                 await send_embed(
                     message.channel,
                     embed=get_embed(
@@ -440,12 +438,16 @@ class NormalCommands(Commands):
                 )
                 return
         embeds = []
-        for i, cmd in enumerate(commands):
-            if len(args) > 0:
-                emb = self.__generate_help_embed(cmd, keep_footer=True)
-            else:
-                emb = self.__generate_help_embed(cmd)
-                emb.set_footer(text=f"{i+1}/{len(commands)}")
+        for i, entry in enumerate(entries):
+            keep_footer = bool(args)
+            emb = registry.get_embed(
+                ("help", self.ctx.prefix, entry.module_type, entry.name, keep_footer),
+                lambda entry=entry, keep_footer=keep_footer: self.__generate_help_embed(
+                    entry, keep_footer=keep_footer
+                )
+            )
+            if not keep_footer:
+                emb.set_footer(text=f"{i+1}/{len(entries)}")
             embeds.append(emb)
         base = await send_embed(
             message.channel,
@@ -502,50 +504,9 @@ class NormalCommands(Commands):
             {command_prefix}commands --module profile
             ```~
         """
-        modules = [
-            getattr(self.ctx, comtype)
-            for comtype in dir(self.ctx)
-            if all([
-                comtype.endswith('commands'),
-                comtype != "load_commands"
-            ])
-        ]
-        modules = sorted(
-            modules,
-            key=lambda x: x.__class__.__name__,
-            reverse=True
-        )
-        command_dict = {
-            module.__class__.__name__.replace(
-                "Commands", " Commands"
-            ): '\n'.join(
-                sorted(
-                    [
-                        cmd.replace("cmd_", self.ctx.prefix)
-                        for cmd in dir(module)
-                        if all([
-                            cmd.startswith("cmd_"),
-                            "disabled" not in dir(getattr(module, cmd)),
-                            getattr(module, cmd).__doc__
-                        ])
-                    ],
-                    key=len
-                )
-            )
-            for module in modules
-        }
-        embed = get_embed(
-            f"Use `{self.ctx.prefix}help [command name]` for details",
-            title="Pokeball Selfbot Commands List"
-        )
-        for key, val in command_dict.items():
-            if val:
-                embed.add_field(name=key, value=f"**```\n{val}\n```**")
-        embed.set_footer(
-            text="This command helped? You can help me too by "
-            "donating at https://www.paypal.me/hyperclaw79.",
-            icon_url="https://emojipedia-us.s3.dualstack.us-west-1.amazonaws.com/"
-            "thumbs/160/facebook/105/money-bag_1f4b0.png"
+        embed = self.ctx.registry.get_embed(
+            ("commands", self.ctx.prefix),
+            self.__generate_commands_embed
         )
         await send_embed(message.channel, embed=embed)
 
@@ -565,6 +526,15 @@ class NormalCommands(Commands):
             for poketype in ["legendary", "mythical", "ultrabeast"]
             for poke in self.ctx.pokeranks[poketype]
         ]
+        owned = {
+            row["name"]: []
+            for row in self.database.get_summary(names=names)
+        }
+        for row in self.database.iter_query(
+            output_cols=["name", "pokeid"],
+            order_by="pokeid", name=list(owned)
+        ):
+            owned[row["name"]].append(row["pokeid"])
         for i in range(0, len(names), 5):
             embed = get_embed(
                 title="Legendaries",
@@ -572,7 +542,7 @@ class NormalCommands(Commands):
                 color=15728640
             )
             for legend in names[i:i+5]:
-                ids = self.database.get_ids(name=legend)
+                ids = owned.get(legend.title(), [])
                 if len(ids) > 0:
                     val = '\n'.join(
                         ','.join(str(_id) for _id in ids[i:i + 5])
@@ -623,25 +593,33 @@ class NormalCommands(Commands):
             ```~
         """
         limit = int(args[0]) if args else 2
-        dups = self.database.fetch_query(dup_count=limit, order_by='name')
-        if len(dups) == 0:
-            await message.channel.send(
-                "There is no pokemon with so many duplicates.\n"
-                "Try a smaller number."
+        # Pages hold whole species, 5 at a time.
+        total_pages = ceil(self.database.count_duplicate_names(limit) / 5)
+        # Keyset cursor of the last displayed species.
+        cursor = None
+        pages = 0
+
+        async def load_page():
+            nonlocal cursor, pages
+            if pages >= total_pages:
+                return None
+            names = self.database.get_duplicate_names(
+                limit, after=cursor, limit=5
             )
-            return
-        dups = {
-            name: list(matches)
-            for name, matches in groupby(dups, key=lambda x: x['name'])
-        }
-        embeds = []
-        for i in range(0, len(dups), 5):
+            if not names:
+                return None
+            cursor = names[-1]
+            dups = self.database.fetch_query(
+                output_cols=["name", "pokeid", "level", "iv"],
+                order_by="name", name=names
+            )
+            pages += 1
             embed = get_embed(
                 title="Duplicates",
                 content="\u200B",
                 color=15728640
             )
-            for name, matches in list(dups.items())[i:i+5]:
+            for name, matches in groupby(dups, key=lambda x: x['name']):
                 data = [
                     f"**ID**: {match['pokeid']}\t"
                     f"**LEVEL**: {match['level']}\t"
@@ -654,15 +632,27 @@ class NormalCommands(Commands):
                     value='\n'.join(data),
                     inline=False
                 )
-            embed.set_footer(text=f"{(i//5)+1}/{ceil(len(dups)/5)}")
-            embeds.append(embed)
+            embed.set_footer(text=f"{pages}/{total_pages}")
+            return embed
+
+        first_page = await load_page()
+        if not first_page:
+            await message.channel.send(
+                "There is no pokemon with so many duplicates.\n"
+                "Try a smaller number."
+            )
+            return
+        embeds = [first_page]
         try:
             base = await send_embed(
                 message.channel,
                 content=None,
                 embed=embeds[0]
             )
-            pager = Paginator(message, base, embeds, self.ctx)
+            pager = Paginator(
+                message, base, embeds, self.ctx,
+                loader=load_page if total_pages > 1 else None
+            )
             await pager.run()
         except discord.errors.HTTPException:
             emb = get_embed(
@@ -691,6 +681,221 @@ class NormalCommands(Commands):
         )
         await send_embed(message.channel, embed=emb)
 
+    @check_db
+    async def cmd_analyze(
+        self, message: Message,
+        args: Optional[List[str]] = None,
+        **kwargs
+    ):
+        """Analyze your whole pokemon collection.
+        $```scss
+        {command_prefix}analyze [iv/level/dupes/best] [--name Name] [--top N]
+        ```$
+
+        @Quick analytics over all the logged pokemons.
+        Uses an in-memory mirror of the database, which is built on first use
+        (or at startup if collection_mirror is enabled in the configs).
+        There are 4 options to choose from:
+        ```md
+        1. IV - Distribution of the IVs (default).
+        2. Level - Distribution of the levels.
+        3. Dupes - Species with the most duplicates.
+        4. Best - The highest IV pokemon of every species.
+        ```
+        IV and Level can be limited to a single pokemon with `--name`.@
+
+        ~To see the IV distribution of all your pokemons:
+            ```
+            {command_prefix}analyze
+            ```
+        To see the level distribution of your Eevees:
+            ```
+            {command_prefix}analyze level --name Eevee
+            ```
+        To see your top 20 most duplicated pokemons:
+            ```
+            {command_prefix}analyze dupes --top 20
+            ```~
+        """
+        options = ["iv", "level", "dupes", "best"]
+        mode = args[0].lower() if args else "iv"
+        if mode not in options:
+            await send_embed(
+                message.channel,
+                embed=get_enum_embed(
+                    options,
+                    title="List of Possible Options"
+                )
+            )
+            return
+        top = min(25, int(kwargs.get("top", 10)))
+        name = kwargs.get("name", None)
+        mirror = await self.__get_mirror()
+        tstart = time.perf_counter()
+        if mode in ["iv", "level"]:
+            bins = mirror.histogram(mode, name=name)
+            peak = max(count for *_, count in bins) or 1
+            lines = [
+                f"{low:5.1f} - {high:5.1f} | "
+                f"{'█' * round(20 * count / peak)} {count}"
+                for low, high, count in bins
+            ]
+            title = f"{mode.upper() if mode == 'iv' else 'Level'} Distribution"
+            if name:
+                title += f" of {name.title()}"
+        elif mode == "dupes":
+            lines = [
+                f"{idx + 1}. {poke} - {count} caught (Avg. IV {avg_iv:.2f}%)"
+                for idx, (poke, count, avg_iv) in enumerate(
+                    mirror.top_species(top)
+                )
+            ]
+            title = "Most Duplicated Pokemons"
+        else:
+            lines = [
+                f"{idx + 1}. {poke} ({pokeid}) - {total_iv:.2f}% IV, Lvl. {level}"
+                for idx, (poke, pokeid, total_iv, level) in enumerate(
+                    mirror.best_of_species(top)
+                )
+            ]
+            title = "Best Pokemon of each Species"
+        elapsed = (time.perf_counter() - tstart) * 1000
+        content = '\n'.join(lines) or "Nothing to analyze."
+        embed = get_embed(f"```md\n{content}\n```", title=title)
+        embed.set_footer(
+            text=f"Analyzed {len(mirror):,} pokemons in {elapsed:.2f} ms."
+        )
+        await send_embed(message.channel, embed=embed)
+
+    async def __get_mirror(self) -> CollectionMirror:
+        # The table scan runs in an executor, writes made meanwhile
+        # show up as a count mismatch and the mirror is built again.
+        for _ in range(3):
+            if self.database.mirror is not None:
+                return self.database.mirror
+            mirror = await self.ctx.loop.run_in_executor(
+                None, CollectionMirror.from_path, self.database.db_path
+            )
+            if len(mirror) == self.database.get_total():
+                self.database.attach_mirror(mirror)
+        if self.database.mirror is None:
+            self.database.attach_mirror(
+                CollectionMirror.from_db(self.database)
+            )
+        return self.database.mirror
+
+    async def cmd_export(self, message: Message, **kwargs):
+        """Export the database to a file.
+        $```scss
+        {command_prefix}export [--table caught_pokemons/spawns]
+            [--format csv/jsonl] [--output path]
+        ```$
+
+        @Streams a table of the database into a CSV or JSONL file.
+        The file is gzip compressed if the path ends with `.gz`.
+        Defaults to a compressed CSV of caught_pokemons under `data/exports`.@
+
+        ~To backup all your logged pokemons:
+            ```
+            {command_prefix}export
+            ```
+        To export the spawn history as JSON lines:
+            ```
+            {command_prefix}export --table spawns --format jsonl
+            ```~
+        """
+        table = kwargs.get("table", "caught_pokemons")
+        fmt = kwargs.get("format", "csv")
+        path = kwargs.get("output", None)
+        if not path:
+            os.makedirs(os.path.join("data", "exports"), exist_ok=True)
+            path = os.path.join(
+                "data", "exports",
+                f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}.gz"
+            )
+        await self.__stream(
+            message, "export", path,
+            table=table, fmt=fmt
+        )
+
+    async def cmd_import(self, message: Message, **kwargs):
+        """Import a file into the database.
+        $```scss
+        {command_prefix}import --input path
+            [--table caught_pokemons/spawns] [--format csv/jsonl]
+        ```$
+
+        @Streams a CSV or JSONL file (optionally gzip compressed) into the database.
+        Pokemons which are already logged get updated, new ones get inserted.
+        Spawns are always appended to the history.@
+
+        ~To restore a backup of your pokemons:
+            ```
+            {command_prefix}import --input data/exports/backup.csv.gz
+            ```~
+        """
+        path = kwargs.get("input", None)
+        if not path or not os.path.isfile(path):
+            self.logger.pprint(
+                "You need to provide a valid file path using --input.",
+                timestamp=True,
+                color="yellow"
+            )
+            return
+        await self.__stream(
+            message, "import", path,
+            table=kwargs.get("table", "caught_pokemons"),
+            fmt=kwargs.get("format", None)
+        )
+
+    async def __stream(
+        self, message: Message, action: str,
+        path: str, table: str = "caught_pokemons",
+        fmt: Optional[str] = None,
+        report_every: int = 10000
+    ):
+        reported = 0
+
+        def progress(total: int):
+            # Called from the executor thread after every chunk.
+            nonlocal reported
+            if total - reported >= report_every:
+                reported = total
+                self.ctx.loop.call_soon_threadsafe(
+                    functools.partial(
+                        self.logger.pprint,
+                        f"{action.title()}ed {total:,} rows so far.",
+                        timestamp=True,
+                        color="blue"
+                    )
+                )
+
+        # The file and the DB chunks are handled in an executor,
+        # using a connection of its own.
+        try:
+            total = await self.ctx.loop.run_in_executor(
+                None, functools.partial(
+                    transfer, action, self.database.db_path, path,
+                    table=table, fmt=fmt, progress=progress
+                )
+            )
+        except (ValueError, OSError) as excp:
+            self.logger.pprint(
+                f"Unable to {action} {path}.\n{excp}",
+                timestamp=True,
+                color="red"
+            )
+            return
+        if action == "import" and table == "caught_pokemons":
+            # The mirror missed the rows written by the other connection,
+            # cmd_analyze builds it again when needed.
+            self.database.attach_mirror(None)
+        emb = get_embed(
+            f"{action.title()}ed **{total:,}** rows.\n`{path}`",
+            title=f"{action.title()} Complete"
+        )
+        await send_embed(message.channel, embed=emb)
+
     async def cmd_verified(self, message: Message, **kwargs):
         """Captcha Lock Bypass.
         $```scss
@@ -8,7 +8,7 @@ Poketwo Commands Module
 import asyncio
 import random
 import re
-from math import floor, sqrt
+from math import ceil, floor, sqrt
 from typing import Dict, List, Optional
 
 from discord import Message, Member, TextChannel
@@ -18,15 +18,18 @@ from ..helpers.checks import (
     user_check
 )
 from ..helpers.utils import (
-    get_embed, log_formatter, send_embed,
+    get_embed, log_formatter_bulk, send_embed,
     wait_for
 )
 from .basecommand import (
     Commands, check_db,
-    get_chan, get_prefix
+    get_chan, get_prefix, queued
 )
 
 
+PAGE_PATT = re.compile(r'entries \d+\–(\d+) out of (\d+)')
+
+
 class PokeCommands(Commands):
     '''
     Commands which directly interact with the pokebots.
@@ -74,6 +77,7 @@ class PokeCommands(Commands):
 
     @get_prefix
     @get_chan
+    @queued(resumable=True)
     async def cmd_pokelog(
         self, message: Message,
         args: Optional[List[str]] = None,
@@ -82,19 +86,32 @@ class PokeCommands(Commands):
     ):
         """Log your pokemons to local DB.
         $```scss
-        {command_prefix}pokelog [page_number]
+        {command_prefix}pokelog [page_number] [--full]
         ```$
 
         @Log all your pokemon with their ids and levels into the local database.
         This can be used for other commands like `{command_prefix}duplicates`,
         `{command_prefix}legendaries` and such.
+        Once something is logged, only the pokemons caught since the last log
+        are read. If the count or the latest number doesn't match Poketwo's
+        afterwards (say, you released some manually), everything is relogged.
+        Use --full to always relog everything.
+        Set pokelog_check_interval (in seconds) in the configs to run this
+        check periodically in the active channel. A mismatch found
+        by the periodic check is only reported.
         The current version of the command is automatic till Poketwo goes offline.
-        In such rare cases, you can use the page number to resume logging.@
+        In such rare cases, you can use the page number to resume logging.
+        If the bot crashes or restarts midway, logging resumes automatically
+        from the last logged page.@
 
         ~To log normally:
             ```
             {command_prefix}pokelog
             ```
+        To wipe the logs and relog everything:
+            ```
+            {command_prefix}pokelog --full
+            ```
         If poketwo broke down at the 5th page and got restarted, \
             you'd wanna continue from page 6.
         In that case, use:
@@ -107,6 +124,37 @@ class PokeCommands(Commands):
         page = 1
         pokelist = []
         self.ctx.priority_only = True
+        logged = self.ctx.jobs.checkpoint().get("page")
+        if logged:
+            # Resumed job, the pages till the checkpoint are already in the DB.
+            fresh = False
+            args = [str(logged + 1)]
+        elif all([
+            fresh, not args,
+            not kwargs.get("full", False),
+            self.database.get_total() > 0
+        ]):
+            synced = await self.__sync_pokelog(message, pref, chan)
+            if synced is None:
+                # Poketwo stopped responding, the logs are kept as they are.
+                self.logger.pprint(
+                    "Poketwo seems to be unresponsive right now, try again later.",
+                    timestamp=True,
+                    color="red"
+                )
+                self.ctx.priority_only = False
+                return
+            if synced:
+                await self.ctx.normalcommands.cmd_total(
+                    message=message
+                )
+                self.ctx.priority_only = False
+                return
+            self.logger.pprint(
+                "Relogging everything.",
+                timestamp=True,
+                color="yellow"
+            )
         if fresh:
             self.database.reset_caught()
             await self.reindex_pk2(message, pref, chan)
@@ -131,12 +179,8 @@ class PokeCommands(Commands):
                 title_contains="Your pokémon"
             )
         )
-        pokemons = reply.embeds[0].description.splitlines()
-        pokelist = [
-            log_formatter(self.ctx, pokemon)
-            for pokemon in pokemons
-        ]
-        if pokelist[0]["iv"] == 0.0:
+        pokelist = log_formatter_bulk(self.ctx, reply.embeds[0].description)
+        if pokelist and pokelist[0]["iv"] == 0.0:
             self.logger.pprint(
                 "Warning! IVs ar disabled. They will be set as 0 in the logs.\n"
                 f"Use {pref}!detailed to enable them before logging.",
@@ -144,6 +188,7 @@ class PokeCommands(Commands):
                 color="yellow"
             )
         self.database.insert_bulk(pokelist)
+        self.ctx.jobs.save(page=page)
         pokelist = []
         await asyncio.sleep(random.uniform(1.0, 2.0))
         while True:
@@ -169,19 +214,16 @@ class PokeCommands(Commands):
             if not reply:
                 await chan.send(f"Logged up to page {page}.")
                 break
-            pokemons = reply.embeds[0].description.splitlines()
             await delme.delete()
             page += 1
-            pokelist = [
-                log_formatter(self.ctx, pokemon)
-                for pokemon in pokemons
-            ]
+            self.ctx.jobs.report(f"Page {page}")
+            pokelist = log_formatter_bulk(self.ctx, reply.embeds[0].description)
             self.database.insert_bulk(pokelist)
-            page_patt = r'entries \d+\–(\d+) out of (\d+)'
-            page_match = re.search(page_patt, reply.embeds[0].footer.text)
+            self.ctx.jobs.save(page=page)
+            page_match = PAGE_PATT.search(reply.embeds[0].footer.text)
             if any([
                 page_match.group(1) == page_match.group(2),
-                len(pokemons) < 20
+                len(reply.embeds[0].description.splitlines()) < 20
             ]):
                 break
             await asyncio.sleep(random.uniform(1.0, 2.0))
@@ -199,6 +241,7 @@ class PokeCommands(Commands):
     @check_db
     @get_prefix
     @get_chan
+    @queued()
     async def cmd_trade(
         self, message: Message,
         mentions: List[Member],
@@ -300,6 +343,7 @@ class PokeCommands(Commands):
 
     @get_prefix
     @get_chan
+    @queued()
     async def cmd_gift(
         self, message: Message,
         mentions: List[Member],
@@ -376,6 +420,7 @@ class PokeCommands(Commands):
     @check_db
     @get_prefix
     @get_chan
+    @queued(resumable=True)
     async def cmd_mass_sell(
         self, message: Message,
         args: Optional[List[str]] = None,
@@ -413,7 +458,11 @@ class PokeCommands(Commands):
         pref = kwargs["pref"]
         chan = kwargs["chan"]
         args = args or ["dupes"]
-        listing = self.__get_listing(args, ids_only=False)
+        listing = self.ctx.jobs.workload()
+        if listing is None:
+            listing = self.__get_listing(args, ids_only=False)
+            listing = sorted(listing, key=lambda x: x["pokeid"], reverse=True)
+            self.ctx.jobs.save_workload(listing)
         if len(listing) == 0:
             self.logger.pprint(
                 "Did not find any pokemons matching the trash conditions.",
@@ -421,8 +470,10 @@ class PokeCommands(Commands):
                 color="yellow"
             )
             return
-        listing = sorted(listing, key=lambda x: x["pokeid"], reverse=True)
-        status = await self.__lister(message, pref, chan, listing)
+        status = await self.__lister(
+            message, pref, chan, listing,
+            start=self.ctx.jobs.checkpoint().get("done", 0)
+        )
         if status != -1:
             self.logger.pprint(
                 "Successfully listed all the specified pokemons.\n",
@@ -433,6 +484,7 @@ class PokeCommands(Commands):
     @check_db
     @get_prefix
     @get_chan
+    @queued(resumable=True)
     async def cmd_mass_release(
         self, message: Message,
         args: Optional[List[str]] = None,
@@ -469,14 +521,22 @@ class PokeCommands(Commands):
         pref = kwargs["pref"]
         chan = kwargs["chan"]
         args = args or ["dupes"]
-        numbers = self.__get_listing(args, ids_only=True)
-        numbers = sorted(numbers, key=int, reverse=True)
-        numlist = [
-            numbers[i:i+25]
-            for i in range(0, len(numbers), 25)
-        ]
-        released = []
-        for numbers in numlist:
+        checkpoint = self.ctx.jobs.checkpoint()
+        numlist = self.ctx.jobs.workload()
+        if numlist is None:
+            numbers = self.__get_listing(args, ids_only=True)
+            numbers = sorted(numbers, key=int, reverse=True)
+            numlist = [
+                numbers[i:i+25]
+                for i in range(0, len(numbers), 25)
+            ]
+            self.ctx.jobs.save_workload(numlist)
+        released = checkpoint.get("released", 0)
+        for idx in range(checkpoint.get("done", 0), len(numlist)):
+            numbers = numlist[idx]
+            self.ctx.jobs.report(f"Batch {idx + 1}/{len(numlist)}")
+            # Saved before releasing, a batch interrupted midway isn't retried.
+            self.ctx.jobs.save(done=idx + 1)
             num_str = ' '.join(numbers)
             rls_msg = await chan.send(f"{pref}release {num_str}")
             desc_msg = await wait_for(
@@ -523,7 +583,8 @@ class PokeCommands(Commands):
                     int(number)
                     for number in numbers
                 ])
-                released.extend(numbers)
+                released += len(numbers)
+                self.ctx.jobs.save(released=released)
             await asyncio.sleep(random.uniform(2.5, 3.0))
         if released:
             self.logger.pprint(
@@ -541,6 +602,7 @@ class PokeCommands(Commands):
     @check_db
     @get_prefix
     @get_chan
+    @queued()
     async def cmd_autofav(
         self, message: Message,
         args: Optional[List[str]] = None,
@@ -635,6 +697,7 @@ class PokeCommands(Commands):
 
     @get_prefix
     @get_chan
+    @queued()
     async def cmd_autocandy(
         self, message: Message,
         args: Optional[List[str]] = None,
@@ -796,16 +859,12 @@ class PokeCommands(Commands):
                 color="red"
             )
             return []
-        pokemons = reply.embeds[0].description.splitlines()
+        pokemons = log_formatter_bulk(self.ctx, reply.embeds[0].description)
         numlist = [
-            log_formatter(
-                self.ctx, pokemon
-            )["pokeid"] if ids_only
-            else log_formatter(self.ctx, pokemon)
+            pokemon["pokeid"] if ids_only else pokemon
             for pokemon in pokemons
         ]
-        page_patt = r'entries \d+\–(\d+) out of (\d+)'
-        page_match = re.search(page_patt, reply.embeds[0].footer.text)
+        page_match = PAGE_PATT.search(reply.embeds[0].footer.text)
         while page_match.group(1) != page_match.group(2):
             delme = await chan.send(f"{pref}n")
             reply = await wait_for(
@@ -824,22 +883,152 @@ class PokeCommands(Commands):
                     timestamp=True
                 )
                 return numlist
-            page_patt = r'entries \d+\–(\d+) out of (\d+)'
-            page_match = re.search(page_patt, reply.embeds[0].footer.text)
-            pokemons = reply.embeds[0].description.splitlines()
+            page_match = PAGE_PATT.search(reply.embeds[0].footer.text)
+            pokemons = log_formatter_bulk(self.ctx, reply.embeds[0].description)
             await delme.delete()
             numlist += [
-                log_formatter(
-                    self.ctx, pokemon
-                )["pokeid"] if ids_only
-                else log_formatter(self.ctx, pokemon)
+                pokemon["pokeid"] if ids_only else pokemon
                 for pokemon in pokemons
             ]
-            if len(pokemons) < 20:
+            if len(reply.embeds[0].description.splitlines()) < 20:
                 break
             await asyncio.sleep(random.uniform(1.0, 2.0))
         return numlist
 
+    async def __get_pokemon_page(
+        self, message: Message,
+        pref: str, chan: TextChannel,
+        page: int
+    ) -> Optional[Message]:
+        await asyncio.sleep(random.uniform(1.0, 2.0))
+        pk_msg = await chan.send(f"{pref}pokemon {page}")
+        return await wait_for(
+            chan, self.ctx, init_msg=pk_msg,
+            check=lambda msg: poketwo_embed_cmd(
+                msg, self.ctx, message, chan=chan,
+                title_contains="Your pokémon"
+            )
+        )
+
+    async def __sync_pokelog(
+        self, message: Message,
+        pref: str, chan: TextChannel,
+        quiet: bool = False
+    ) -> Optional[bool]:
+        """
+        Logs only the pokemons caught since the last pokelog, by reading the
+        listing from the highest number down till the highest logged pokeid.
+        If the listing is ordered by number (either way), it's read as it is,
+        so that the user's ordering is left alone. Otherwise it gets ordered
+        by number like a full pokelog does, unless quiet.
+        Returns False if the logs don't match Poketwo's count and
+        highest number afterwards, in which case a full pokelog is needed.
+        Returns None if the sync was aborted midway.
+        """
+        last_id = self.database.get_max_pokeid()
+        reply = await self.__get_pokemon_page(message, pref, chan, 1)
+        if not reply:
+            return None
+        first_rows = log_formatter_bulk(self.ctx, reply.embeds[0].description)
+        ids = [row["pokeid"] for row in first_rows]
+        if ids not in (sorted(ids), sorted(ids, reverse=True)):
+            if quiet:
+                self.logger.pprint(
+                    "Skipping the pokelog check, since the pokemons "
+                    "aren't ordered by number.",
+                    timestamp=True,
+                    color="yellow"
+                )
+                return None
+            order_msg = await chan.send(f"{pref}order number")
+            await wait_for(
+                chan, self.ctx, init_msg=order_msg,
+                check=lambda msg: poketwo_reply_cmd(
+                    msg, self.ctx, message, chan=chan,
+                    contains="Now ordering"
+                )
+            )
+            reply = await self.__get_pokemon_page(message, pref, chan, 1)
+            if not reply:
+                return None
+            first_rows = log_formatter_bulk(self.ctx, reply.embeds[0].description)
+            ids = [row["pokeid"] for row in first_rows]
+        descending = len(ids) > 1 and ids[0] > ids[-1]
+        total = int(PAGE_PATT.search(reply.embeds[0].footer.text).group(2))
+        # Poketwo lists 20 pokemons per page.
+        last_page = max(1, ceil(total / 20))
+        pages = (
+            range(1, last_page + 1)
+            if descending
+            else range(last_page, 0, -1)
+        )
+        top_id = None
+        new_rows = []
+        read = 0
+        for page in pages:
+            if page == 1:
+                rows = first_rows
+            else:
+                reply = await self.__get_pokemon_page(message, pref, chan, page)
+                if not reply:
+                    return None
+                rows = log_formatter_bulk(self.ctx, reply.embeds[0].description)
+            rows = sorted(rows, key=lambda row: row["pokeid"], reverse=True)
+            if top_id is None:
+                top_id = rows[0]["pokeid"] if rows else 0
+            read += 1
+            unseen = [
+                row for row in rows
+                if row["pokeid"] > last_id
+            ]
+            new_rows.extend(unseen)
+            self.ctx.jobs.report(f"Page {page}, {len(new_rows)} new")
+            if len(unseen) < len(rows) or not rows:
+                break
+        self.database.upsert_bulk(new_rows)
+        # Cheap consistency check, anything released or traded away
+        # without the selfbot knowing shows up as a mismatch.
+        logged = (self.database.get_total(), self.database.get_max_pokeid())
+        if logged != (total, top_id):
+            self.logger.pprint(
+                f"The logs ({logged[0]:,} pokemons, latest #{logged[1]}) "
+                f"don't match Poketwo ({total:,} pokemons, latest #{top_id}).",
+                timestamp=True,
+                color="yellow"
+            )
+            return False
+        self.logger.pprint(
+            f"Logged {len(new_rows)} new pokemon(s) in {read} page(s).",
+            timestamp=True,
+            color="green"
+        )
+        return True
+
+    @get_prefix
+    @get_chan
+    @queued()
+    async def check_pokelog(self, message: Message, **kwargs):
+        """
+        Syncs the new pokemons and checks the logs against Poketwo,
+        without ever relogging everything. Used by the periodic pokelog check.
+        """
+        if self.database.get_total() == 0:
+            return
+        priority_only = self.ctx.priority_only
+        self.ctx.priority_only = True
+        try:
+            synced = await self.__sync_pokelog(
+                message, kwargs["pref"], kwargs["chan"], quiet=True
+            )
+        finally:
+            self.ctx.priority_only = priority_only
+        if synced is False:
+            self.logger.pprint(
+                f"Use {self.ctx.prefix}pokelog --full to relog everything.",
+                timestamp=True,
+                color="yellow"
+            )
+
     async def reindex_pk2(
         self, message: Message,
         pref: str, chan: TextChannel
@@ -1059,7 +1248,7 @@ class PokeCommands(Commands):
     async def __lister(
         self, message: Message,
         pref: str, chan: TextChannel,
-        listing: List[Dict]
+        listing: List[Dict], start: int = 0
     ):
         def get_price(lvl: int, _iv: float):
             price = sqrt(
@@ -1068,7 +1257,11 @@ class PokeCommands(Commands):
             return f"{round(price)}"
 
         # pylint: disable=cell-var-from-loop
-        for poke in listing:
+        for idx in range(start, len(listing)):
+            poke = listing[idx]
+            self.ctx.jobs.report(f"Listing {idx + 1}/{len(listing)}")
+            # Saved before listing, so a resumed job never lists a pokemon twice.
+            self.ctx.jobs.save(done=idx + 1)
             price = get_price(poke['level'], poke['iv'])
             mkt_msg = await chan.send(
                 f"{pref}market list {poke['pokeid']} {price}"
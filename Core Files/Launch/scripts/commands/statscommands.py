@@ -4,18 +4,27 @@ Commands based on Statistics Module for Autocatcher.
 
 # pylint: disable=too-many-locals, unused-argument
 
+from datetime import datetime, timedelta
 from io import BytesIO
 from typing import List, Optional
 
 import discord
 from discord import Message
-from matplotlib import pyplot as plt
 
 from ..helpers.stats_monitor import StatsMonitor
-from ..helpers.utils import get_embed, send_embed
+from ..helpers.utils import get_embed, get_enum_embed, send_embed
 from .basecommand import Commands
 
 
+CHART_WINDOWS = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(days=1),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "all": None
+}
+
+
 class StatsCommands(Commands):
     '''
     Commands which use the StatsMonitor.
@@ -28,16 +37,33 @@ class StatsCommands(Commands):
     async def cmd_stats(self, message: Message, **kwargs):
         """Get the autocatcher statistics.
         $```scss
-        {command_prefix}stats
+        {command_prefix}stats [--window 1h/24h/7d/30d/all]
         ```$
 
-        @Display the statistics of the autocatcher like Catches/min, Accuracy.@
+        @Display the statistics of the autocatcher like Catches/min, Accuracy.
+        Recent rates are shown for the last 5 minutes, 1 hour and 24 hours.
+        Stats are persisted, so they carry over across restarts.
+        The chart covers the last 24 hours unless a window is provided.@
 
         ~To get the current stats:
             ```
             {command_prefix}stats
+            ```
+        To chart the stats of the last week:
+            ```
+            {command_prefix}stats --window 7d
             ```~
         """
+        window = kwargs.get("window", "24h")
+        if window not in CHART_WINDOWS:
+            await send_embed(
+                message.channel,
+                embed=get_enum_embed(
+                    list(CHART_WINDOWS),
+                    title="List of Possible Windows"
+                )
+            )
+            return
         elapsed = self.stats.elapsed()
         acc = self.stats.accuracy()
         total_spawned = self.stats.total_spawns()
@@ -46,12 +72,23 @@ class StatsCommands(Commands):
         catch_rate = self.stats.catches_rate(unit="min")
         most_spawned = self.stats.most_spawns()
         most_caught = self.stats.most_catches()
+        recent = {
+            iterable: " | ".join(
+                f"{window}: {rate.split()[0]}"
+                for window, rate in self.stats.window_rates(
+                    iterable, unit="min"
+                ).items()
+            )
+            for iterable in ["spawns", "catches"]
+        }
         stats_dict = {
             "Total spawned pokemons": total_spawned,
             "Spawn Rate": spawn_rate,
+            "Recent Spawns/min": recent["spawns"],
             "Most Spawned": most_spawned,
             "Total caught pokemons": total_caught,
             "Catch Rate": catch_rate,
+            "Recent Catches/min": recent["catches"],
             "Most Caught": most_caught,
             "Current Accuracy": acc
         }
@@ -62,24 +99,27 @@ class StatsCommands(Commands):
         for key, val in stats_dict.items():
             embed.add_field(name=key, value=val)
         embed.set_footer(text=elapsed)
-        if len(set(self.stats.checkpoints["spawns"])) > 1:
-            plt.clf()
-            plt.figure(figsize=(10, 5))
-            checkpoints = {**self.stats.checkpoints}
-            duration = checkpoints.pop("duration")
-            colors = ["tab:blue", "tab:green", "tab:red"]
-            for metric, color in zip(checkpoints.values(), colors):
-                plt.plot(duration, metric, color=color)
-                plt.fill_between(duration, metric, color=color, alpha=0.8)
-            plt.legend(list(checkpoints.keys()))
-            plt.xlabel("Time(secs)->", fontsize=16)
-            plt.ylabel("Count->", fontsize=16)
-            plt.title("Stat Trends", fontsize=18)
-            byio = BytesIO()
-            plt.savefig(byio)
-            byio.seek(0)
-            stats_fl = discord.File(byio, "stats.jpg")
-            embed.set_image(url="attachment://stats.jpg")
+        span = CHART_WINDOWS[window]
+        history = self.ctx.database.get_stats_history(
+            start=(
+                (datetime.now() - span).strftime("%Y-%m-%d %H:%M:%S")
+                if span else None
+            ),
+            points=96
+        )
+        if len(history) > 1:
+            png = await self.ctx.charts.render(
+                "trends",
+                times=[row["ts"] for row in history],
+                series={
+                    metric: [row[metric] for row in history]
+                    for metric in ["spawns", "catches", "misses"]
+                },
+                title=f"Stat Trends ({window})"
+            )
+            byio = BytesIO(png)
+            stats_fl = discord.File(byio, "stats.png")
+            embed.set_image(url="attachment://stats.png")
             await send_embed(message.channel, embed=embed, file=stats_fl)
         else:
             await send_embed(message.channel, embed=embed)
@@ -95,7 +135,9 @@ class StatsCommands(Commands):
         ```$
 
         @Display the image urls which were mispredicted.
-        Results are sorted in descending order of number of links.
+        Results are sorted in descending order of number of misses.
+        Only a random sample of the links is kept for every pokemon
+        (configurable using `misses_sample_size`).
         You can get the links of a specific pokemon as well.@
 
         ~To get the top 25 misses:
@@ -107,16 +149,13 @@ class StatsCommands(Commands):
             {command_prefix}misses Mewtwo
             ```~
         """
-        names = []
         if args:
-            name = args[0]
-            names.append(name)
+            names = [args[0].title()]
         else:
-            names = sorted(
-                list(self.stats.misses_map.keys()),
-                key=lambda x: len(self.stats.misses_map[x]),
-                reverse=True
-            )[:25]
+            names = [
+                name
+                for name, _ in self.stats.missed_urls.top(25)
+            ]
         embed = get_embed(
             "\u200B",
             embed_type="warning",
@@ -127,8 +166,9 @@ class StatsCommands(Commands):
             urls = self.stats.get_misses_urls(name)
             if urls:
                 misses += 1
+                count = self.stats.missed_urls.counts[name]
                 embed.add_field(
-                    name=name,
+                    name=f"{name} ({count} misses)",
                     value="\n".join(urls),
                     inline=False
                 )
@@ -147,8 +187,10 @@ class StatsCommands(Commands):
         ```$
 
         @Display the confidence levels of the bottom 25 caught pokemons.
-        Results are sorted in ascending order of confidence.
-        You can get the confidence of a specific pokemon as well.@
+        Results are sorted in ascending order of the mean confidence.
+        Along with the mean, the 10th percentile and the median are shown,
+        which are better suited for tuning the confidence threshold.
+        You can get the detailed confidence of a specific pokemon as well.@
 
         ~To get the bottom 25 confidence levels:
             ```
@@ -159,28 +201,37 @@ class StatsCommands(Commands):
             {command_prefix}confidence Arceus
             ```~
         """
-        names = []
         if args:
-            name = args[0]
-            names.append(name)
+            names = [args[0]]
         else:
-            names = sorted(
-                list(self.stats.confidence_map.keys()),
-                key=lambda x: float(self.stats.confidence_map[x])
-            )[:25]
+            names = [
+                name
+                for name, _ in self.stats.confidence.lowest(25)
+            ]
         embed = get_embed(
             "\u200B",
             title="Confidence Levels"
         )
         confs = 0
         for name in names:
-            conf = self.stats.get_confidence(name)
-            conf = conf * 100
+            conf = self.stats.confidence.get(name)
             if conf:
                 confs += 1
+                value = (
+                    f"{conf['mean'] * 100:2.2f}% "
+                    f"(p10 {conf['p10'] * 100:2.0f}%, "
+                    f"p50 {conf['p50'] * 100:2.0f}%, "
+                    f"n={conf['count']})"
+                )
+                if args:
+                    value += (
+                        f"\nStd. Dev. {conf['std'] * 100:2.2f}% | "
+                        f"Range {conf['min'] * 100:2.2f}% - "
+                        f"{conf['max'] * 100:2.2f}%"
+                    )
                 embed.add_field(
-                    name=name,
-                    value=f"{conf:2.2f}%"
+                    name=name.title(),
+                    value=value
                 )
         if not confs:
             embed.description = "Yet to catch some pokemons."
@@ -192,20 +243,86 @@ class StatsCommands(Commands):
     ):
         """Reset the autocatcher statistics.
         $```scss
-        {command_prefix}reset_stats
+        {command_prefix}reset_stats [--purge]
         ```$
 
-        @Resets the statistics of the autocatcher like Catches/min, Accuracy.@
+        @Resets the statistics of the autocatcher like Catches/min, Accuracy.
+        The persisted history is kept for the charts unless `--purge` is used.@
 
         ~To reset the current stats:
             ```
             {command_prefix}reset_stats
+            ```
+        To also delete the whole stats history:
+            ```
+            {command_prefix}reset_stats --purge
             ```~
         """
-        self.stats = self.ctx.stats = StatsMonitor(self.ctx)
+        if kwargs.get("purge", False):
+            self.ctx.database.reset_stats()
+        self.stats = self.ctx.stats = StatsMonitor(self.ctx, rehydrate=False)
         self.ctx.loop.create_task(self.stats.checkpointer())
         self.logger.pprint(
             "Succesfully reset the stats to a fresh start.",
             color="green",
             timestamp=True
         )
+
+    async def cmd_loopstats(
+        self, message: Message,
+        **kwargs
+    ):
+        """Check how badly the event loop is being blocked.
+        $```scss
+        {command_prefix}loopstats [--reset]
+        ```$
+
+        @Displays the recent event loop lag along with the code locations
+        which blocked the loop for longer than the configured threshold.
+        The stack of the worst stall is shown for the top offender.@
+
+        ~To check the loop stats:
+            ```
+            {command_prefix}loopstats
+            ```
+        To forget the recorded stalls:
+            ```
+            {command_prefix}loopstats --reset
+            ```~
+        """
+        monitor = self.ctx.loop_monitor
+        if kwargs.get("reset", False):
+            monitor.reset()
+        if not monitor.enabled:
+            await send_embed(
+                message.channel,
+                embed=get_embed(
+                    "The loop monitor is disabled (loop_lag_threshold_ms is 0).",
+                    embed_type="warning"
+                )
+            )
+            return
+        lines = monitor.summary(k=0)
+        embed = get_embed(
+            "\n".join(lines),
+            title="Event Loop Stats"
+        )
+        top = monitor.top(10)
+        for location, offender in top:
+            embed.add_field(
+                name=location[:256],
+                value=(
+                    f"{offender['count']} stalls | "
+                    f"{offender['total']:.2f}s total | "
+                    f"{offender['max'] * 1000:.0f} ms max"
+                ),
+                inline=False
+            )
+        if top and top[0][1]["stack"]:
+            stack = "".join(top[0][1]["stack"])[-1000:]
+            embed.add_field(
+                name="Worst Stack",
+                value=f"```py\n{stack}\n```",
+                inline=False
+            )
+        await send_embed(message.channel, embed=embed)
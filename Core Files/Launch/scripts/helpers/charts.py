@@ -0,0 +1,180 @@
+"""
+Chart Rendering Service
+
+Charts are drawn in a separate worker process using the Agg backend
+and matplotlib's object oriented Figure API, so that the event loop
+never gets blocked and no global pyplot state is shared.
+"""
+
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from io import BytesIO
+from typing import Dict, List, Optional
+
+
+def _init_worker():
+    # pylint: disable=import-outside-toplevel
+    import matplotlib
+    matplotlib.use("Agg")
+    matplotlib.rcParams.update({'font.size': 14})
+
+
+def _new_figure(figsize):
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def _to_png(fig) -> bytes:
+    byio = BytesIO()
+    fig.savefig(byio, format="png")
+    return byio.getvalue()
+
+
+def _draw_trends(
+    times: List[str], series: Dict[str, List[float]],
+    title: str = "Stat Trends", colors: Optional[List[str]] = None
+) -> bytes:
+    fig = _new_figure((10, 5))
+    axes = fig.add_subplot(1, 1, 1)
+    xvals = [datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") for ts in times]
+    colors = colors or ["tab:blue", "tab:green", "tab:red"]
+    for (label, counts), color in zip(series.items(), colors):
+        axes.plot(xvals, counts, color=color, label=label)
+        axes.fill_between(xvals, counts, color=color, alpha=0.8)
+    axes.legend()
+    axes.set_xlabel("Time->", fontsize=16)
+    axes.set_ylabel("Count->", fontsize=16)
+    axes.set_title(title, fontsize=18)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+def _draw_stocks(prices: Dict[str, List[int]]) -> bytes:
+    # pylint: disable=import-outside-toplevel
+    import matplotlib
+    from matplotlib.ticker import MaxNLocator
+    colors = matplotlib.rcParams["axes.prop_cycle"].by_key()["color"]
+    fig = _new_figure((10, 8))
+    for idx, (poke, data) in enumerate(prices.items()):
+        subp = fig.add_subplot(len(prices), 1, idx + 1)
+        subp.plot(
+            range(len(data)), data,
+            'o-', label=poke,
+            color=colors[idx % len(colors)]
+        )
+        for pos, price in enumerate(data):
+            subp.annotate(
+                text=f'{price} pc',
+                xy=(pos, price),
+                horizontalalignment='center',
+                verticalalignment='center'
+            )
+        subp.yaxis.set_major_locator(MaxNLocator(integer=True))
+        subp.legend()
+        subp.set_ylabel("Pokecredits", fontsize=20)
+        subp.axes.get_xaxis().set_visible(False)
+    fig.tight_layout()
+    return _to_png(fig)
+
+
+CHARTS = {
+    "trends": _draw_trends,
+    "stocks": _draw_stocks
+}
+
+
+def render(kind: str, payload: Dict) -> bytes:
+    """
+    Renders a chart synchronously and returns the PNG bytes.
+    This is what runs inside the worker process.
+    """
+    return CHARTS[kind](**payload)
+
+
+class ChartRenderer:
+    """Renders charts in a worker process and caches the PNGs.
+
+    The input data is hashed, so a chart whose data hasn't changed
+    is served from an LRU cache without touching the worker.
+
+    Attributes
+    ----------
+    max_workers : int
+        number of worker processes.
+    cache_size : int
+        number of rendered PNGs to keep.
+
+    Methods
+    -------
+    [async] render(kind, **payload)
+        Returns the PNG bytes for a chart.
+
+    shutdown()
+        Stops the worker process.
+    """
+    def __init__(self, max_workers: int = 1, cache_size: int = 32):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.cache: OrderedDict = OrderedDict()
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def get_key(kind: str, payload: Dict) -> str:
+        """
+        Hashes the chart type along with its data.
+        """
+        raw = json.dumps([kind, payload], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker
+            )
+        return self.executor
+
+    async def render(self, kind: str, **payload) -> bytes:
+        """
+        Returns the PNG bytes for a chart, rendering it in the worker if needed.
+        """
+        if kind not in CHARTS:
+            raise ValueError(f"Unknown chart type: {kind}")
+        key = self.get_key(kind, payload)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        loop = asyncio.get_event_loop()
+        try:
+            png = await loop.run_in_executor(
+                self._get_executor(), render, kind, payload
+            )
+        except BrokenProcessPool:
+            # The worker died (killed/OOM), so start a fresh one and retry once.
+            self.executor = None
+            png = await loop.run_in_executor(
+                self._get_executor(), render, kind, payload
+            )
+        self.cache[key] = png
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return png
+
+    def shutdown(self):
+        """
+        Stops the worker process.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
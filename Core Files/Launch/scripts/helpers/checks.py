@@ -59,10 +59,7 @@ def is_ranked(name: str, ctx: PokeBall):
 
 def is_priority(name: str, ctx: PokeBall):
     """ Check if pokemon is in priority list. """
-    if name.title() in [
-        poke.title()
-        for poke in ctx.configs['priority']
-    ]:
+    if name.title() in ctx.priority_names:
         return True
 
 
@@ -97,10 +94,7 @@ def catch_checks(name: str, ctx: PokeBall):
     catch_subchecks = [
         random.randint(1, 100) <= ctx.configs['catch_rate'],
         not ctx.sleep,
-        name.lower() not in [
-            poke.lower()
-            for poke in ctx.configs['avoid']
-        ],
+        name.lower() not in ctx.avoid_names,
         not ctx.priority_only
     ]
     if all(catch_subchecks):
@@ -0,0 +1,151 @@
+"""
+Command Parser Module
+
+A single pass tokenizer for the selfbot commands, which understands
+quotes, escapes, repeated flags and --key=value pairs.
+A repeated flag keeps its last value, typed parsing collects them all.
+    {prefix}command arg1 "arg 2" --flag --key value words --key=other
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+Token = Tuple[str, bool]
+
+# A quote only opens a quoted section at the start of a token, so
+# apostrophes inside words (Farfetch'd) are kept as they are and an
+# unterminated quote falls through to the plain word as a literal.
+TOKEN_PATT = re.compile(
+    r"""
+    "(?P<dq>[^"]*)"
+    | '(?P<sq>[^']*)'
+    | “(?P<cdq>[^”]*)”
+    | ‘(?P<csq>[^’]*)’
+    | (?P<word>(?:\\.|\S)+)
+    """,
+    re.VERBOSE | re.DOTALL
+)
+ESCAPE_PATT = re.compile(r"\\(.)", re.DOTALL)
+SPECIAL_CHARS = ('"', "'", "“", "‘", "\\")
+
+
+def tokenize(text: str) -> List[Token]:
+    """
+    Splits the text on whitespace into (token, quoted) pairs in a single pass.
+    Quoted sections and words with a backslash escaped character
+    are flagged, so that they are never mistaken for a --flag.
+    """
+    if not any(char in text for char in SPECIAL_CHARS):
+        # Most commands have nothing to unquote, so a plain split does.
+        return [(word, False) for word in text.split()]
+    tokens = []
+    for match in TOKEN_PATT.finditer(text):
+        word = match.group("word")
+        if word is None:
+            tokens.append((next(grp for grp in match.groups() if grp is not None), True))
+        elif "\\" in word:
+            tokens.append((ESCAPE_PATT.sub(r"\1", word), True))
+        else:
+            tokens.append((word, False))
+    return tokens
+
+
+def coerce(value: Union[str, bool]) -> Union[str, bool, int, float]:
+    """
+    Converts a string value into a bool, int or float if it looks like one.
+    """
+    if not isinstance(value, str):
+        return value
+    lowered = value.lower()
+    if lowered in ("true", "yes", "on"):
+        return True
+    if lowered in ("false", "no", "off"):
+        return False
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            continue
+    return value
+
+
+def _add_kwarg(kwargs: Dict, key: str, value, collect: bool = False):
+    # Repeated flags collect their values in order, if asked to.
+    if key not in kwargs or not collect:
+        kwargs[key] = value
+    elif isinstance(kwargs[key], list):
+        kwargs[key].append(value)
+    else:
+        kwargs[key] = [kwargs[key], value]
+
+
+@lru_cache(maxsize=512)
+def _parse(prefix: str, msg: str, typed: bool) -> Tuple:
+    start = msg.find(prefix)
+    if start == -1:
+        return None, (), ()
+    tokens = tokenize(msg[start + len(prefix):])
+    if not tokens:
+        return None, (), ()
+    command = tokens[0][0]
+    args = []
+    kwargs = {}
+    key = None
+    words: List[str] = []
+    options_ended = False
+
+    def close_kwarg():
+        if key is not None:
+            value = " ".join(words) if words else True
+            if typed:
+                _add_kwarg(kwargs, key, coerce(value), collect=True)
+            else:
+                _add_kwarg(kwargs, key, value)
+
+    for token, quoted in tokens[1:]:
+        is_flag = (
+            not quoted and not options_ended
+            and token.startswith("--")
+        )
+        if is_flag and token == "--":
+            # A bare -- ends the options, the rest are positional args.
+            close_kwarg()
+            key, words, options_ended = None, [], True
+        elif is_flag:
+            close_kwarg()
+            key, _, value = token[2:].partition("=")
+            words = [value] if value else []
+        elif key is not None:
+            words.append(token)
+        else:
+            args.append(coerce(token) if typed else token)
+    close_kwarg()
+    return command, tuple(args), tuple(kwargs.items())
+
+
+def parse_command(prefix: str, msg: str, typed: bool = False) -> Dict:
+    """Parses a message to obtain the command, args and kwargs.
+
+    The words following a --key make up its value, or True if there are none.
+    A repeated --key keeps its last value, like the commands expect.
+    If typed=True, the values are converted into bools/ints/floats when possible,
+    and the values of a repeated --key are collected into a list.
+    Repeated invocations are served from an LRU cache.
+    """
+    command, args, kwargs = _parse(prefix, msg, typed)
+    return {
+        'Args': list(args),
+        'Kwargs': {
+            key: list(val) if isinstance(val, list) else val
+            for key, val in kwargs
+        },
+        'Command': command
+    }
+
+
+def cache_info() -> Optional[Tuple]:
+    """
+    Returns the hit/miss statistics of the parser cache.
+    """
+    return _parse.cache_info()
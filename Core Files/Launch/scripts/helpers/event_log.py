@@ -0,0 +1,282 @@
+"""
+Structured Event Log
+
+Events are written as one JSON object per line into daily segments
+(data/events/events-YYYY-MM-DD.jsonl) by the logger's background thread.
+Segments are rotated daily or once they exceed max_bytes, the rotated
+ones are gzip compressed and deleted after retention_days.
+
+Every event has "ts" (ISO time) and "event", along with:
+    prediction: guild_id, channel_id, name, confidence, download_ms, predict_ms
+    spawn: guild_id, channel_id, name, confidence, outcome, skip_reason,
+           download_ms, predict_ms, catch_ms, image_url
+    command: phase (start/end), command, channel_id, ms and ok (on end)
+    db: method, ms
+The spawn outcome (caught/wrong/skipped/sniped/failed) tells the catches,
+misses and skips apart.
+
+Summarize a day from the Launch folder:
+    python -m scripts.helpers.event_log 2021-06-01
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import shutil
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+LATENCIES = ("download_ms", "predict_ms", "catch_ms")
+
+
+class EventSink:
+    """Writes the events into rotated, compressed JSONL segments.
+
+    Attributes
+    ----------
+    directory : str
+        folder holding the segments.
+    max_bytes : int
+        size after which the current segment is rotated.
+    retention_days : int
+        number of days for which the segments are kept.
+
+    Methods
+    -------
+    write(events)
+        Appends a batch of events to the current segment.
+
+    close()
+        Closes the current segment.
+    """
+    def __init__(
+        self, directory: str = "data/events",
+        max_bytes: int = 16 * 1024 * 1024,
+        retention_days: int = 14
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self._file = None
+        self._day: Optional[date] = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, day: date) -> str:
+        """
+        Returns the path of the live segment of a day.
+        """
+        return os.path.join(self.directory, f"events-{day.isoformat()}.jsonl")
+
+    def _compress(self, path: str):
+        # Rotated segments of a day are numbered in order: .1.jsonl.gz, .2...
+        stem = path[:-len(".jsonl")]
+        idx = len(glob.glob(f"{glob.escape(stem)}.*.jsonl.gz")) + 1
+        with open(path, "rb") as src, gzip.open(f"{stem}.{idx}.jsonl.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+
+    def _prune(self, today: date):
+        cutoff = (today - timedelta(days=self.retention_days)).isoformat()
+        for path in glob.glob(os.path.join(self.directory, "events-*.jsonl*")):
+            day = os.path.basename(path)[len("events-"):][:10]
+            if day < cutoff:
+                os.remove(path)
+
+    def _rotate(self, today: date):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        # Compress every live segment left over from previous days/runs.
+        for path in glob.glob(os.path.join(self.directory, "events-*.jsonl")):
+            if path != self.get_path(today):
+                self._compress(path)
+        self._prune(today)
+
+    def write(self, events: List[Dict]):
+        """
+        Appends a batch of events to the current segment, rotating if needed.
+        """
+        today = date.today()
+        if self._day != today:
+            self._rotate(today)
+            self._day = today
+        path = self.get_path(today)
+        if self._file is not None and self._file.tell() >= self.max_bytes:
+            self._file.close()
+            self._file = None
+            self._compress(path)
+        if self._file is None:
+            # pylint: disable=consider-using-with
+            self._file = open(path, "a", encoding="utf-8")
+        self._file.writelines(
+            json.dumps(event, ensure_ascii=False, default=str) + "\n"
+            for event in events
+        )
+        self._file.flush()
+
+    def close(self):
+        """
+        Closes the current segment.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def iter_events(directory: str, day: date) -> Iterator[Dict]:
+    """
+    Yields the events of a day in order, from the compressed segments
+    followed by the live one.
+    """
+    stem = os.path.join(directory, f"events-{day.isoformat()}")
+    segments = sorted(
+        glob.glob(f"{glob.escape(stem)}.*.jsonl.gz"),
+        key=lambda path: int(path[len(stem) + 1:].split(".")[0])
+    )
+    if os.path.exists(f"{stem}.jsonl"):
+        segments.append(f"{stem}.jsonl")
+    for path in segments:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as seg:
+            for line in seg:
+                # The last line might be partial if the bot was killed.
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _percentiles(values: List[float]) -> Dict:
+    values = sorted(values)
+
+    def pick(quant: float) -> float:
+        return values[min(int(len(values) * quant), len(values) - 1)]
+
+    return {
+        "n": len(values),
+        "p50": pick(0.5),
+        "p90": pick(0.9),
+        "p99": pick(0.99),
+        "max": values[-1]
+    }
+
+
+def summarize(events: Iterator[Dict]) -> Dict:
+    """
+    Aggregates the events into throughput and latency summaries.
+    """
+    counts = Counter()
+    outcomes = Counter()
+    skips = Counter()
+    hourly = Counter()
+    latencies = defaultdict(list)
+    commands = defaultdict(list)
+    db_ops = defaultdict(list)
+    for event in events:
+        kind = event.get("event")
+        counts[kind] += 1
+        if kind == "spawn":
+            outcomes[event.get("outcome")] += 1
+            if event.get("skip_reason"):
+                skips[event["skip_reason"]] += 1
+            hourly[event["ts"][11:13]] += 1
+            for key in LATENCIES:
+                if event.get(key) is not None:
+                    latencies[key[:-3]].append(event[key])
+        elif kind == "command" and event.get("phase") == "end":
+            commands[event.get("command")].append(event.get("ms", 0))
+        elif kind == "db":
+            db_ops[event.get("method")].append(event.get("ms", 0))
+    return {
+        "events": dict(counts),
+        "outcomes": dict(outcomes),
+        "skip_reasons": dict(skips),
+        "spawns_per_hour": dict(sorted(hourly.items())),
+        "latency_ms": {
+            stage: _percentiles(vals)
+            for stage, vals in latencies.items()
+        },
+        "commands_ms": {
+            cmd: _percentiles(vals)
+            for cmd, vals in commands.items()
+        },
+        "db_ms": {
+            method: _percentiles(vals)
+            for method, vals in db_ops.items()
+        }
+    }
+
+
+def format_summary(summary: Dict) -> List[str]:
+    """
+    Converts a summary into human readable lines.
+    """
+    spawns = sum(summary["outcomes"].values())
+    lines = [
+        f"Events: {', '.join(f'{k} {v:,}' for k, v in summary['events'].items())}",
+        f"Spawns: {spawns:,} ("
+        + ", ".join(f"{k} {v:,}" for k, v in summary["outcomes"].items()) + ")"
+    ]
+    if summary["skip_reasons"]:
+        lines.append(
+            "Skipped: "
+            + ", ".join(f"{k} {v:,}" for k, v in summary["skip_reasons"].items())
+        )
+    if summary["spawns_per_hour"]:
+        lines.append(
+            "Spawns/hour: "
+            + " ".join(f"{hr}h:{cnt}" for hr, cnt in summary["spawns_per_hour"].items())
+        )
+    for title, key in [
+        ("Stage latency", "latency_ms"),
+        ("Commands", "commands_ms"),
+        ("DB", "db_ms")
+    ]:
+        if not summary[key]:
+            continue
+        lines.append(
+            f"\n{title + ' (ms)':<16}{'n':>7}"
+            + "".join(f"{q:>9}" for q in ["p50", "p90", "p99", "max"])
+        )
+        for name, pct in sorted(
+            summary[key].items(), key=lambda item: -item[1]["n"]
+        ):
+            lines.append(
+                f"{str(name)[:16]:<16}{pct['n']:>7,}"
+                + "".join(f"{pct[q]:>9.1f}" for q in ["p50", "p90", "p99", "max"])
+            )
+    return lines
+
+
+def main():
+    """
+    Command line entrypoint for summarizing a day of events.
+    """
+    parser = argparse.ArgumentParser(
+        description="Summarize the structured event log of a day."
+    )
+    parser.add_argument(
+        "day", nargs="?", default=date.today().isoformat(),
+        help="Day to summarize as YYYY-MM-DD (defaults to today)."
+    )
+    parser.add_argument("--dir", default="data/events")
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Print the raw summary as JSON."
+    )
+    parsed = parser.parse_args()
+    day = datetime.strptime(parsed.day, "%Y-%m-%d").date()
+    summary = summarize(iter_events(parsed.dir, day))
+    if parsed.json:
+        print(json.dumps(summary, indent=3))
+        return
+    print("\n".join(format_summary(summary)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Hot Reload Watcher
+
+Polls the modification times of the config file and the loaded command
+modules, and reloads them once they stop changing (editors tend to write
+in several steps). New configs are validated and diffed against the running
+ones, so that only the state derived from the changed keys is recomputed.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+from __future__ import annotations
+import asyncio
+import json
+import os
+import time
+import traceback
+from numbers import Number
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from pokeball import PokeBall
+
+# Keys which the bot can't run without.
+REQUIRED_KEYS = (
+    "command_prefix", "owner_id", "clone_id",
+    "autocatcher", "autolog", "priority_only",
+    "default_guildmode", "default_channelmode",
+    "priority", "avoid", "catch_rate", "delay", "log_level",
+    "blacklist_channels", "whitelist_channels",
+    "blacklist_guilds", "whitelist_guilds"
+)
+# Keys which are only read while starting up.
+RESTART_KEYS = (
+    "token", "metrics_port", "event_log", "event_log_retention_days",
+    "collection_mirror", "asyncio_debug", "slow_callback_ms"
+)
+MODES = ("blacklist", "whitelist")
+
+
+def diff_configs(old: Dict, new: Dict) -> Set[str]:
+    """
+    Returns the keys which were added, removed or modified.
+    """
+    return {
+        key for key in old.keys() | new.keys()
+        if key not in old or key not in new or old[key] != new[key]
+    }
+
+
+def validate_configs(old: Dict, new: Dict) -> List[str]:
+    """
+    Returns the problems which prevent the new configs from being applied.
+    A value has to keep the type of the value it replaces.
+    """
+    if not isinstance(new, dict):
+        return ["The configs should be a JSON object."]
+    errors = [
+        f"Missing the required key {key}."
+        for key in REQUIRED_KEYS
+        if key not in new
+    ]
+    for key, val in new.items():
+        if key not in old or old[key] is None or val is None:
+            continue
+        prev = old[key]
+        if isinstance(prev, bool) or isinstance(val, bool):
+            same_type = isinstance(prev, bool) and isinstance(val, bool)
+        elif isinstance(prev, Number):
+            same_type = isinstance(val, Number)
+        else:
+            same_type = isinstance(val, type(prev))
+        if not same_type:
+            errors.append(
+                f"{key} should be {type(prev).__name__}, "
+                f"got {type(val).__name__}."
+            )
+    for key in ("default_guildmode", "default_channelmode"):
+        if new.get(key, MODES[0]) not in MODES:
+            errors.append(f"{key} should be one of {', '.join(MODES)}.")
+    if not new.get("command_prefix", "?"):
+        errors.append("command_prefix can't be empty.")
+    return errors
+
+
+class HotReloader:
+    """Reloads the configs and the command modules when their files change.
+
+    Attributes
+    ----------
+    ctx : PokeBall
+        the root class for the Selfbot.
+    enabled : bool
+        whether the watcher should run (hot_reload in the configs).
+    interval : float
+        seconds between the polls.
+    debounce : float
+        seconds for which a file should stay unchanged before reloading.
+
+    Methods
+    -------
+    get_paths()
+        Returns the watched files mapped to their module type.
+
+    poll(now)
+        Returns the files which changed and settled since the last poll.
+
+    reload_config()
+        Validates and applies the configs from the disk.
+
+    reload_module(module_type)
+        Reloads a command module, keeping the old one on failure.
+
+    [async] watcher()
+        Polls the files every interval and reloads the settled ones.
+    """
+    def __init__(self, ctx: PokeBall):
+        self.ctx = ctx
+        self.logger = self.ctx.logger
+        configs = self.ctx.configs
+        self.enabled = configs.get("hot_reload", False)
+        self.interval = configs.get("hot_reload_interval", 2)
+        self.debounce = configs.get("hot_reload_debounce", 1.0)
+        self._mtimes: Dict[str, float] = {}
+        self._pending: Dict[str, Tuple[float, float]] = {}
+
+    def get_paths(self) -> Dict[str, Optional[str]]:
+        """
+        Returns the watched files mapped to their module type (None for the configs).
+        """
+        paths = {self.ctx.config_path: None}
+        for module_type in self.ctx.registry.modules:
+            path = os.path.join("scripts", "commands", f"{module_type}commands.py")
+            paths[path] = module_type
+        return paths
+
+    def poll(self, now: float) -> List[str]:
+        """
+        Returns the files whose new mtime has held for the debounce period.
+        Files seen for the first time are only remembered.
+        """
+        ready = []
+        for path in self.get_paths():
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                # Removed or being replaced, look again on the next poll.
+                continue
+            if path not in self._mtimes:
+                self._mtimes[path] = mtime
+                continue
+            if mtime == self._mtimes[path]:
+                self._pending.pop(path, None)
+                continue
+            seen_mtime, seen_at = self._pending.get(path, (None, now))
+            if seen_mtime != mtime:
+                self._pending[path] = (mtime, now)
+            elif now - seen_at >= self.debounce:
+                self._pending.pop(path)
+                self._mtimes[path] = mtime
+                ready.append(path)
+        return ready
+
+    def reload_config(self) -> bool:
+        """
+        Validates the configs on the disk and applies them if they are fine.
+        The running configs are kept otherwise.
+        """
+        try:
+            with open(self.ctx.config_path, encoding='utf-8') as cfg_file:
+                configs = json.load(cfg_file)
+        except (OSError, ValueError) as excp:
+            self.logger.pprint(
+                f"Could not read the configs, keeping the old ones.\n{excp}",
+                timestamp=True,
+                color="yellow"
+            )
+            return False
+        errors = validate_configs(self.ctx.configs, configs)
+        if errors:
+            self.logger.pprint(
+                "Invalid configs, keeping the old ones:\n\t" + "\n\t".join(errors),
+                timestamp=True,
+                color="yellow"
+            )
+            return False
+        changed = self.ctx.apply_configs(configs)
+        if not changed:
+            return True
+        self.logger.pprint(
+            f"Reloaded the configs, changed: {', '.join(changed)}.",
+            timestamp=True,
+            color="green"
+        )
+        restart = [key for key in changed if key in RESTART_KEYS]
+        if restart:
+            self.logger.pprint(
+                f"Restart the bot to apply: {', '.join(restart)}.",
+                timestamp=True,
+                color="yellow"
+            )
+        return True
+
+    def reload_module(self, module_type: str) -> bool:
+        """
+        Reloads a command module, the running commands finish on the old one.
+        If the new code fails to import, the old module stays registered.
+        """
+        try:
+            self.ctx.load_commands(module_type, reload_module=True)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.pprint(
+                f"Could not reload {module_type}commands, keeping the old one.\n"
+                f"{traceback.format_exc(limit=-3)}",
+                timestamp=True,
+                color="red"
+            )
+            return False
+        self.logger.pprint(
+            f"Reloaded {module_type}commands.",
+            timestamp=True,
+            color="green"
+        )
+        return True
+
+    async def watcher(self):
+        """
+        Polls the files every interval and reloads the ones which settled.
+        """
+        self.poll(time.monotonic())
+        while self.enabled:
+            await asyncio.sleep(self.interval)
+            paths = self.get_paths()
+            for path in self.poll(time.monotonic()):
+                if paths[path] is None:
+                    self.reload_config()
+                else:
+                    self.reload_module(paths[path])
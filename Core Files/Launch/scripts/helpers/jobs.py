@@ -0,0 +1,444 @@
+"""
+Per-channel Job Queue
+
+Multi-step workflows (pokelog, trade, mass_release, etc.) send a message
+and then wait_for the reply in the same channel. Two of them running in a
+channel at once would match each other's replies, so every workflow runs
+as a job which is serialized per channel and parallel across channels.
+
+Resumable jobs persist their plan (the command and its arguments) and
+their checkpoints into the jobs table. The ones left unfinished by a crash
+or a restart are started again on_ready, and pick up from the checkpoint.
+Long item lists are saved once as the job's workload, so that the
+checkpoints stay a small cursor into them.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+from __future__ import annotations
+import asyncio
+import contextvars
+import itertools
+import json
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Coroutine, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from pokeball import PokeBall
+
+# The job whose coroutine is running in the current task.
+CURRENT_JOB: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+FINISHED = ("done", "failed", "cancelled", "timeout")
+UNFINISHED = ["queued", "running"]
+# Arguments which are recreated when a job is resumed.
+TRANSIENT_KWARGS = ("message", "chan", "pref", "mentions", "args")
+
+
+class ResumedMessage:
+    """Stands in for the (deleted) command message of a resumed job.
+
+    Attributes
+    ----------
+    channel : TextChannel
+        the channel in which the command was originally used.
+    author : User
+        the selfbot account.
+    """
+    def __init__(self, channel, author):
+        self.id = 0
+        self.channel = channel
+        self.guild = getattr(channel, "guild", None)
+        self.author = author
+        self.content = ""
+        self.mentions = []
+        self.embeds = []
+
+
+class Job:
+    """A queued workflow.
+
+    Attributes
+    ----------
+    job_id : int
+        the sequential id of the job.
+    name : str
+        the command which started the job.
+    channel_id : int
+        the channel in which the job talks to Poketwo.
+    status : str
+        one of queued, running, done, failed, cancelled and timeout.
+    progress : str
+        the latest progress reported by the job.
+    error : str
+        the exception which failed the job, if any.
+    row_id : int
+        the id in the jobs table, if the job is resumable.
+    checkpoint : dict
+        the progress saved by a resumable job.
+    workload : list
+        the items saved once by a resumable job, if any.
+    """
+    def __init__(
+        self, job_id: int, name: str,
+        channel_id: int, timeout: Optional[float],
+        row_id: Optional[int] = None,
+        checkpoint: Optional[Dict] = None,
+        workload: Optional[List] = None
+    ):
+        self.job_id = job_id
+        self.name = name
+        self.channel_id = channel_id
+        self.timeout = timeout
+        self.row_id = row_id
+        self.checkpoint = checkpoint or {}
+        self.workload = workload
+        self.status = "queued"
+        self.progress = ""
+        self.error: Optional[str] = None
+        self.cancel_requested = False
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Seconds spent running (or waiting, if still queued).
+        """
+        start = self.started or self.created
+        return (self.finished or time.time()) - start
+
+    def __repr__(self):
+        return f"<Job #{self.job_id} {self.name} [{self.status}]>"
+
+
+class JobQueue:
+    """Runs the jobs serialized per channel and in parallel across channels.
+
+    Attributes
+    ----------
+    ctx : PokeBall
+        the root class for the Selfbot.
+    channel_concurrency : int
+        number of jobs which can run in a channel at once.
+    max_parallel : int
+        number of jobs which can run across all the channels at once.
+    timeout : float
+        default number of seconds after which a job is cancelled (None for no limit).
+        Resumable jobs only time out if their command asks for it.
+    jobs : OrderedDict
+        the active jobs and the recently finished ones, by id.
+
+    Methods
+    -------
+    submit(name, channel_id, coro, timeout, row_id)
+        Queues a coroutine as a job and returns it.
+
+    cancel(job_id)
+        Cancels a queued or running job.
+
+    report(progress)
+        Updates the progress of the job running in the current task.
+
+    persist(name, channel_id, plan)
+        Saves the plan of a resumable job and returns its row id.
+
+    checkpoint()
+        Returns the saved progress of the job running in the current task.
+
+    save(**fields)
+        Updates and persists the progress of the job running in the current task.
+
+    workload(), save_workload(items)
+        Returns or persists the items of the job running in the current task.
+
+    resume_row(row)
+        Starts a persisted job again from its checkpoint.
+
+    [async] resume()
+        Resumes all the jobs left unfinished by the previous run.
+
+    active(), recent(k)
+        Returns the queued/running jobs and the last k finished ones.
+
+    [async] wait(job)
+        Waits for a job and returns the result of its coroutine.
+    """
+    def __init__(self, ctx: PokeBall, history: int = 20):
+        self.ctx = ctx
+        self.logger = self.ctx.logger
+        configs = self.ctx.configs
+        self.channel_concurrency = max(1, configs.get("job_channel_concurrency", 1))
+        self.max_parallel = max(1, configs.get("job_max_parallel", 4))
+        self.timeout = configs.get("job_timeout", 0) or None
+        self.history = history
+        self.jobs: Dict[int, Job] = OrderedDict()
+        self._ids = itertools.count(1)
+        self.retention_days = configs.get("job_retention_days", 7)
+        self.resumed = False
+        self._channels: Dict[int, asyncio.Semaphore] = {}
+        self._parallel: Optional[asyncio.Semaphore] = None
+        self._checkpoints: Dict[int, Dict] = {}
+        self._workloads: Dict[int, List] = {}
+
+    def _get_channel_sem(self, channel_id: int) -> asyncio.Semaphore:
+        if channel_id not in self._channels:
+            self._channels[channel_id] = asyncio.Semaphore(self.channel_concurrency)
+        return self._channels[channel_id]
+
+    def submit(
+        self, name: str, channel_id: int,
+        coro: Coroutine, timeout: Optional[float] = None,
+        row_id: Optional[int] = None
+    ) -> Job:
+        """
+        Queues the coroutine as a job in the channel and returns the job.
+        Jobs with a row_id keep their status and checkpoints in the DB.
+        """
+        if self._parallel is None:
+            self._parallel = asyncio.Semaphore(self.max_parallel)
+        if not timeout and row_id is None:
+            # A timed out job isn't resumed, so long resumable ones are exempt.
+            timeout = self.timeout
+        job = Job(
+            next(self._ids), name, channel_id, timeout,
+            row_id=row_id, checkpoint=self._checkpoints.pop(row_id, None),
+            workload=self._workloads.pop(row_id, None)
+        )
+        self.jobs[job.job_id] = job
+        job.task = asyncio.ensure_future(self._run(job, coro))
+        return job
+
+    async def _run(self, job: Job, coro: Coroutine) -> Any:
+        try:
+            async with self._get_channel_sem(job.channel_id), self._parallel:
+                job.status = "running"
+                job.started = time.time()
+                self._persist_status(job)
+                CURRENT_JOB.set(job)
+                result = await asyncio.wait_for(coro, job.timeout)
+                job.status = "done"
+                return result
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            if not job.cancel_requested:
+                # Shutting down, so the persisted job stays resumable.
+                job.row_id = None
+            raise
+        except asyncio.TimeoutError:
+            job.status = "timeout"
+            self.logger.pprint(
+                f"Job #{job.job_id} ({job.name}) timed out after {job.timeout}s.",
+                timestamp=True,
+                color="yellow"
+            )
+            return None
+        except Exception as excp:  # pylint: disable=broad-except
+            job.status = "failed"
+            job.error = f"{type(excp).__name__}: {excp}"
+            raise
+        finally:
+            # A job cancelled while still queued never started its coroutine.
+            coro.close()
+            job.finished = time.time()
+            self._persist_status(job)
+            self._trim()
+
+    def _persist_status(self, job: Job):
+        if job.row_id is not None:
+            self.ctx.database.update_job(
+                job.row_id, status=job.status, error=job.error
+            )
+
+    def _trim(self):
+        finished = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status in FINISHED
+        ]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    async def wait(self, job: Job) -> Any:
+        """
+        Waits for the job without getting cancelled along with it.
+        Failures are re-raised, cancellations and timeouts return None.
+        """
+        await asyncio.wait([job.task])
+        if job.task.cancelled():
+            return None
+        return job.task.result()
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancels a queued or running job, returns False if there's no such job.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        job.cancel_requested = True
+        job.task.cancel()
+        return True
+
+    @staticmethod
+    def current() -> Optional[Job]:
+        """
+        Returns the job running in the current task, if any.
+        """
+        return CURRENT_JOB.get()
+
+    def report(self, progress: str):
+        """
+        Updates the progress of the job running in the current task.
+        Does nothing outside of a job.
+        """
+        job = CURRENT_JOB.get()
+        if job is not None:
+            job.progress = progress
+
+    def persist(self, name: str, channel_id: int, plan: Dict) -> int:
+        """
+        Saves the plan of a resumable job and returns its row id.
+        The plan has the module type, the command, the args/kwargs
+        and the id of the channel where the command was used.
+        """
+        return self.ctx.database.insert_job(
+            name, channel_id, json.dumps(plan, default=str)
+        )
+
+    def checkpoint(self) -> Dict:
+        """
+        Returns the saved progress of the job running in the current task.
+        It's empty for a fresh job (or outside of a job).
+        """
+        job = CURRENT_JOB.get()
+        return job.checkpoint if job is not None else {}
+
+    def save(self, **fields):
+        """
+        Updates the progress of the job running in the current task,
+        and persists it if the job is resumable.
+        """
+        job = CURRENT_JOB.get()
+        if job is None:
+            return
+        job.checkpoint.update(fields)
+        if job.row_id is not None:
+            self.ctx.database.update_job(
+                job.row_id,
+                checkpoint=json.dumps(job.checkpoint, default=str)
+            )
+
+    def workload(self) -> Optional[List]:
+        """
+        Returns the items saved by the job running in the current task.
+        It's None for a fresh job (or outside of a job).
+        """
+        job = CURRENT_JOB.get()
+        return job.workload if job is not None else None
+
+    def save_workload(self, items: List):
+        """
+        Keeps the items to be processed by the job running in the current task,
+        and persists them once if the job is resumable.
+        The checkpoints then only need to track a position in them.
+        """
+        job = CURRENT_JOB.get()
+        if job is None:
+            return
+        job.workload = items
+        if job.row_id is not None:
+            self.ctx.database.update_job(
+                job.row_id,
+                workload=json.dumps(items, default=str)
+            )
+
+    def resume_row(self, row: Dict) -> bool:
+        """
+        Starts a persisted job again, with its saved checkpoint.
+        Returns False if its module or channel is no longer available.
+        """
+        plan = json.loads(row["plan"])
+        module = getattr(self.ctx, f"{plan.get('module')}commands", None)
+        method = getattr(module, plan.get("command", ""), None)
+        channel = self.ctx.get_channel(row["channel_id"])
+        if method is None or channel is None:
+            self.ctx.database.update_job(
+                row["job_id"], status="failed",
+                error="The command or the channel is not available anymore."
+            )
+            return False
+        origin = self.ctx.get_channel(plan.get("origin_id")) or channel
+        self._checkpoints[row["job_id"]] = json.loads(row["checkpoint"] or "{}")
+        if row.get("workload"):
+            self._workloads[row["job_id"]] = json.loads(row["workload"])
+        coro = method(
+            message=ResumedMessage(origin, self.ctx.user),
+            args=list(plan.get("args") or []),
+            chan=channel,
+            resume_job=row["job_id"],
+            **plan.get("kwargs", {})
+        )
+        if coro is None:
+            # Turned down by one of the command's checks.
+            self._checkpoints.pop(row["job_id"], None)
+            self._workloads.pop(row["job_id"], None)
+            self.ctx.database.update_job(
+                row["job_id"], status="failed",
+                error="The command refused to run."
+            )
+            return False
+        asyncio.ensure_future(self._wait_resumed(coro))
+        self.logger.pprint(
+            f"Resuming the job {row['name']} (saved as {row['job_id']}).",
+            timestamp=True,
+            color="blue"
+        )
+        return True
+
+    async def _wait_resumed(self, coro: Coroutine):
+        try:
+            await coro
+        except Exception:  # pylint: disable=broad-except
+            self.logger.pprint(
+                traceback.format_exc(),
+                timestamp=True,
+                color="red"
+            )
+
+    async def resume(self):
+        """
+        Resumes the jobs left unfinished by the previous run,
+        after deleting the old finished ones.
+        """
+        if self.resumed:
+            return
+        self.resumed = True
+        database = self.ctx.database
+        database.delete_jobs(
+            datetime.utcnow() - timedelta(days=self.retention_days)
+        )
+        for row in database.get_jobs(UNFINISHED):
+            self.resume_row(row)
+
+    def active(self) -> List[Job]:
+        """
+        Returns the queued and the running jobs.
+        """
+        return [
+            job for job in self.jobs.values()
+            if job.status not in FINISHED
+        ]
+
+    def recent(self, k: int = 5) -> List[Job]:
+        """
+        Returns the last k finished jobs.
+        """
+        return [
+            job for job in self.jobs.values()
+            if job.status in FINISHED
+        ][-k:]
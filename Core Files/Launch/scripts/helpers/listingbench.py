@@ -0,0 +1,210 @@
+"""
+Fixture Check and Benchmark for the Listing Parser.
+
+Parses recorded Poketwo embed lines with the compiled listing parser,
+checks the rows against the expected ones and against the former per-line
+re.sub based parsers, then times both.
+Run it from the Launch folder:
+    python -m scripts.helpers.listingbench --lines 20000
+"""
+
+import argparse
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+from .listing_parser import iter_market, iter_pokemons
+
+BAD_CHARS = [r'\\xa0+', r'\*+', r'•+', r'<+.+>+\s', r'\s\s+', '♂', '♀️']
+
+# Recorded lines of p!pokemon along with the rows they should parse into.
+POKEMON_FIXTURES = [
+    (
+        "`1`　**Pikachu**<:male:749658521534398546>　•　Lvl. 23　•　79.57%",
+        {"pokeid": 1, "name": "Pikachu", "level": 23, "iv": 79.57,
+         "shiny": False, "nickname": None}
+    ),
+    (
+        "`  42`　**✨ Eevee**<:female:749658521534398546>　•　Lvl. 5　•　10.75%",
+        {"pokeid": 42, "name": "Eevee", "level": 5, "iv": 10.75,
+         "shiny": True, "nickname": None}
+    ),
+    (
+        "`1337`　**Mr. Mime** \"Mimey\"<:male:749658521534398546>　•　Lvl. 100　•　100.00%",
+        {"pokeid": 1337, "name": "Mr. Mime", "level": 100, "iv": 100.0,
+         "shiny": False, "nickname": "Mimey"}
+    ),
+    (
+        "`7`　**Farfetch'd**<:unknown:749658521534398546>　•　Lvl. 12　•　45.16%",
+        {"pokeid": 7, "name": "Farfetch'D", "level": 12, "iv": 45.16,
+         "shiny": False, "nickname": None}
+    ),
+    (
+        "`83`　**Sirfetch’d**<:male:749658521534398546>　•　Lvl. 40　•　51.61%",
+        {"pokeid": 83, "name": "Sirfetch’D", "level": 40, "iv": 51.61,
+         "shiny": False, "nickname": None}
+    ),
+    (
+        "`12`　**Type: Null**<:unknown:749658521534398546>　•　Lvl. 60　•　88.17%",
+        {"pokeid": 12, "name": "Type: Null", "level": 60, "iv": 88.17,
+         "shiny": False, "nickname": None}
+    ),
+    (
+        "`99`　**Nidoran♀️**　•　Lvl. 31　•　62.37% :heart:",
+        {"pokeid": 99, "name": "Nidoran", "level": 31, "iv": 62.37,
+         "shiny": False, "nickname": None}
+    ),
+    (
+        "`8`　**Porygon-Z**<:male:749658521534398546>　•　Lvl. 64　•　0.00%",
+        {"pokeid": 8, "name": "Porygon-Z", "level": 64, "iv": 0.0,
+         "shiny": False, "nickname": None}
+    ),
+]
+# Recorded lines of p!market search.
+MARKET_FIXTURES = [
+    (
+        "`3457012`　**Level 23 Pikachu**<:male:749658521534398546>　•　79.57%　•　1,000 pc",
+        {"Mktid": "3457012", "Level": 23, "Name": "Pikachu", "IV": 79.57,
+         "Credits": 1000, "Shiny": False}
+    ),
+    (
+        "`3457013`　**Level 5 ✨ Eevee**<:female:749658521534398546>　•　10.75%　•　25,000 pc",
+        {"Mktid": "3457013", "Level": 5, "Name": "✨ Eevee", "IV": 10.75,
+         "Credits": 25000, "Shiny": True}
+    ),
+    (
+        "`98`　**Level 100 Mr. Mime**<:male:749658521534398546>　•　100.00%　•　12 pc",
+        {"Mktid": "98", "Level": 100, "Name": "Mr. Mime", "IV": 100.0,
+         "Credits": 12, "Shiny": False}
+    ),
+]
+
+
+def legacy_parse_pokemon(line: str) -> Dict:
+    """The former log_formatter parsing, kept for the comparisons."""
+    pokeline = line.replace(':heart:', '')
+    for char in BAD_CHARS:
+        pokeline = re.sub(char, " ", pokeline)
+    patt = r"`?\s?(\d+)`?\s(?:(✨)\s)?([\w\s\'\.\-:%]+)(?:\"(.+)\")?" + \
+        r"(?:\s.+)?\sLvl\.\s(\d+)\s(\d+\.?\d+)%"
+    searched = re.search(patt, pokeline)
+    return {
+        "pokeid": int(searched.group(1)),
+        "name": searched.group(3).title().strip(),
+        "level": int(searched.group(5)),
+        "iv": float(searched.group(6)) or 0.0,
+        "shiny": bool(searched.group(2)),
+        "nickname": searched.group(4) or None
+    }
+
+
+def legacy_parse_market(line: str) -> Dict:
+    """The former market listing parsing (plus the stripped name), kept for the comparisons."""
+    mkt_patt = r"`(?P<Mktid>.+)`.+Level\s(?P<Level>\d+)\s" + \
+        r"(?P<Name>.+)\s(?P<IV>.+)\%\s(?P<Credits>.+)pc"
+    cleaned = line
+    for char in BAD_CHARS:
+        cleaned = re.sub(char, " ", cleaned)
+    data = re.search(mkt_patt, cleaned).groupdict()
+    data["Mktid"] = data["Mktid"].strip()
+    data["Level"] = int(data["Level"])
+    data["Name"] = data["Name"].strip()
+    data["IV"] = float(data["IV"])
+    data["Credits"] = int(data["Credits"].strip().replace(',', ''))
+    data["Shiny"] = "✨" in cleaned
+    return data
+
+
+def check(
+    fixtures: List, parser: Callable, legacy: Callable
+) -> List[str]:
+    """
+    Returns the problems found with the fixtures of a parser.
+    The legacy parser is only compared on the lines it could read.
+    """
+    problems = []
+    skipped = []
+    rows = list(parser("\n".join(line for line, _ in fixtures), skipped))
+    if skipped:
+        problems.append(f"Skipped {len(skipped)} lines: {skipped}")
+    for (line, expected), row in zip(fixtures, rows):
+        if row != expected:
+            problems.append(f"{line!r}\n\tgot {row}\n\texpected {expected}")
+        if legacy_parses(legacy, line) and legacy(line) != expected:
+            problems.append(f"{line!r}\n\tlegacy parser disagrees: {legacy(line)}")
+    return problems
+
+
+def legacy_parses(legacy: Callable, line: str) -> bool:
+    """
+    Whether the legacy parser can read the line at all (it crashed on some names).
+    """
+    try:
+        legacy(line)
+    except AttributeError:
+        return False
+    return True
+
+
+def time_parser(
+    func: Callable, description: str,
+    lines: int, repeats: int = 5
+) -> float:
+    """
+    Returns the best throughput (in lines per second) over a few repeats.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        tstart = time.perf_counter()
+        func(description)
+        best = min(best, time.perf_counter() - tstart)
+    return lines / best
+
+
+def main(args: Optional[List[str]] = None):
+    """
+    Command line entrypoint for the listing parser check and benchmark.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check and benchmark the Poketwo listing parser."
+    )
+    parser.add_argument("--lines", type=int, default=20000)
+    parsed = parser.parse_args(args)
+    problems = (
+        check(POKEMON_FIXTURES, iter_pokemons, legacy_parse_pokemon)
+        + check(MARKET_FIXTURES, iter_market, legacy_parse_market)
+    )
+    print(
+        f"Checked {len(POKEMON_FIXTURES) + len(MARKET_FIXTURES)} fixtures: "
+        f"{len(problems)} problems."
+    )
+    for problem in problems:
+        print(f"    {problem}")
+    for title, fixtures, compiled, legacy in [
+        ("pokemon", POKEMON_FIXTURES, iter_pokemons, legacy_parse_pokemon),
+        ("market", MARKET_FIXTURES, iter_market, legacy_parse_market)
+    ]:
+        readable = [
+            line for line, _ in fixtures
+            if legacy_parses(legacy, line)
+        ]
+        lines = [
+            readable[idx % len(readable)]
+            for idx in range(parsed.lines)
+        ]
+        description = "\n".join(lines)
+        old = time_parser(
+            lambda desc: [legacy(line) for line in desc.splitlines()],
+            description, len(lines)
+        )
+        new = time_parser(lambda desc: list(compiled(desc)), description, len(lines))
+        print(
+            f"{title:<8}{'legacy':>8} {old:>10,.0f} lines/s"
+            f"{'compiled':>10} {new:>10,.0f} lines/s ({new / old:.1f}x)"
+        )
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
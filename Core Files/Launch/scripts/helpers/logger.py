@@ -2,25 +2,45 @@
 Custom Logger Module.
 """
 
-# pylint: disable=unused-argument
+# pylint: disable=unused-argument, too-many-instance-attributes
 
+import atexit
+import os
+import queue
 import re
 import sys
-from datetime import datetime
-from typing import Optional
+import threading
+import time
+from datetime import date, datetime
+from typing import List, Optional, Tuple
 
 import chalk
 from colorama import init
 
 init()  # Initialize Colorama
 
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+# The colors already tell the severity of every existing message.
+COLOR_LEVELS = {"red": "error", "yellow": "warning"}
+
 
 class CustomLogger:
     '''
     A simple Logger which has the main purpose of colorifying outputs.
     Barebones implementation without importing from the Logging module.
+    pprint only enqueues the message, while the formatting, printing and
+    error logging happen in batches on a background thread.
+    Structured events go through the same thread into the attached sink.
+    The error log is rotated daily or once it exceeds max_bytes,
+    keeping backup_count old files.
     '''
-    def __init__(self, error_log_path: str):
+    def __init__(
+        self, error_log_path: str,
+        level: str = "info",
+        max_bytes: int = 1024 * 1024,
+        backup_count: int = 5,
+        batch_size: int = 256
+    ):
         formats = [
             "white", "green",
             "yellow", "red",
@@ -31,10 +51,26 @@ class CustomLogger:
             for fmt in formats
         }
         self.error_log_path = error_log_path
+        self.level = LEVELS.get(str(level).lower(), LEVELS["info"])
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
         # Pattern to delete the color codes while logging into file.
         self.ansi_escape = re.compile(
             r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])'
         )
+        self.dropped = 0
+        self._queue = queue.SimpleQueue()
+        self._log_file = None
+        self._log_date: Optional[date] = None
+        self.event_sink = None
+        self._thread = threading.Thread(
+            target=self._writer,
+            name="logger",
+            daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
 
     def wrap(
         self, text: str, *args,
@@ -53,6 +89,12 @@ class CustomLogger:
         func = self.color_codings.get(color, chalk.white)
         return func(text)
 
+    def is_enabled(self, level: str) -> bool:
+        '''
+        Checks if messages of a level would get logged.
+        '''
+        return LEVELS.get(level, LEVELS["info"]) >= self.level
+
     def pprint(
         self, text: str, *args,
         timestamp: bool = True,
@@ -61,18 +103,148 @@ class CustomLogger:
         '''
         Wraps the text and prints it to Stdout.
         In case of an error (red), logs it to error.log
+        The level defaults to the one implied by the color.
         '''
-        if kwargs and kwargs.get("color", None) == "red":
-            # pylint: disable=protected-access
-            func_name = sys._getframe(1).f_code.co_name
+        color = kwargs.get("color", None)
+        level = kwargs.get("level", None) or COLOR_LEVELS.get(color, "info")
+        if not self.is_enabled(level):
+            return
+        func_name = None
+        if level == "error":
             func_name = kwargs.get("wrapped_func", None)
-            # pylint: disable=invalid-name
-            with open(self.error_log_path, 'a', encoding='utf-8') as f:
-                f.write(
-                    f"[{datetime.now().strftime('%X %p')}] <{func_name}>"
-                    f" {self.ansi_escape.sub('', text)}\n"
+            if func_name is None:
+                # pylint: disable=protected-access
+                func_name = sys._getframe(1).f_code.co_name
+        self._queue.put(
+            (datetime.now(), text, timestamp, color, func_name)
+        )
+
+    def attach_sink(self, sink):
+        '''
+        Attaches a sink (like EventSink) receiving the structured events.
+        It has to provide write(events) and close().
+        '''
+        self.event_sink = sink
+
+    def event(self, event_type: str, **fields):
+        '''
+        Records a structured event, if a sink is attached.
+        '''
+        if self.event_sink is None:
+            return
+        fields.pop("ts", None)
+        self._queue.put({"ts": time.time(), "event": event_type, **fields})
+
+    def flush(self, timeout: Optional[float] = 5.0):
+        '''
+        Blocks till all the enqueued messages are written.
+        '''
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        '''
+        Writes the pending messages and stops the background thread.
+        '''
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(5.0)
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        if self.event_sink is not None:
+            self.event_sink.close()
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            records = [
+                item for item in batch
+                if isinstance(item, tuple)
+            ]
+            events = [
+                item for item in batch
+                if isinstance(item, dict)
+            ]
+            try:
+                self._write(records)
+            except Exception:  # pylint: disable=broad-except
+                self.dropped += len(records)
+            if events and self.event_sink is not None:
+                try:
+                    self._write_events(events)
+                except Exception:  # pylint: disable=broad-except
+                    self.dropped += len(events)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if stop:
+                return
+
+    def _write(self, records: List[Tuple]):
+        lines = []
+        errors = []
+        for now, text, timestamp, color, func_name in records:
+            stamp = f"[{now.strftime('%X %p')}]"
+            if func_name is not None:
+                errors.append(
+                    f"{stamp} <{func_name}> {self.ansi_escape.sub('', str(text))}\n"
+                )
+            text = f"{stamp} {text}" if timestamp else str(text)
+            lines.append(self.wrap(text, color=color))
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+        if errors:
+            log_file = self._get_log_file()
+            log_file.writelines(errors)
+            log_file.flush()
+
+    def _write_events(self, events: List[dict]):
+        for event in events:
+            event["ts"] = datetime.fromtimestamp(event["ts"]).isoformat(
+                timespec="milliseconds"
+            )
+        self.event_sink.write(events)
+
+    def _get_log_file(self):
+        today = date.today()
+        if self._log_file is None:
+            if os.path.exists(self.error_log_path):
+                self._log_date = date.fromtimestamp(
+                    os.path.getmtime(self.error_log_path)
                 )
-        if timestamp:
-            text = f"[{datetime.now().strftime('%X %p')}] {text}"
-        colored = self.wrap(text, *args, **kwargs)
-        print(colored)
+            else:
+                self._log_date = today
+        if os.path.exists(self.error_log_path) and (
+            self._log_date != today
+            or os.path.getsize(self.error_log_path) >= self.max_bytes
+        ):
+            self._rotate()
+        self._log_date = today
+        if self._log_file is None:
+            # pylint: disable=consider-using-with
+            self._log_file = open(self.error_log_path, 'a', encoding='utf-8')
+        return self._log_file
+
+    def _rotate(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+        if self.backup_count <= 0:
+            os.remove(self.error_log_path)
+            return
+        for idx in range(self.backup_count - 1, 0, -1):
+            src = f"{self.error_log_path}.{idx}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.error_log_path}.{idx + 1}")
+        os.replace(self.error_log_path, f"{self.error_log_path}.1")
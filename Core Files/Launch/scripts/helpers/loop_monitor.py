@@ -0,0 +1,253 @@
+"""
+Event Loop Lag Monitor
+
+A heartbeat task measures how late the loop wakes it up, while a
+watchdog thread notices when the heartbeat is overdue and grabs the
+stack of the loop thread, pointing at the code which is blocking it.
+Stalls are aggregated by that code location.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from pokeball import PokeBall
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+UNATTRIBUTED = "<unattributed>"
+
+
+class LoopMonitor:
+    """Measures the event loop lag and profiles the stalls.
+
+    Attributes
+    ----------
+    ctx : PokeBall
+        the root class for the Selfbot.
+    threshold : float
+        lag (in seconds) above which a stall gets attributed.
+    interval : float
+        heartbeat interval (in seconds).
+    lags : deque
+        the recent lag samples.
+    offenders : dict
+        count, total, max and stack of the stalls by code location.
+
+    Methods
+    -------
+    locate(stack)
+        Returns the innermost frame of the Selfbot in a stack.
+
+    top(k)
+        Returns the k locations which blocked the loop the longest.
+
+    summary(k)
+        Returns the human readable stats of the loop.
+
+    [async] heartbeat()
+        Measures the loop lag and starts the watchdog thread.
+
+    [async] reporter()
+        Periodically logs the summary of the stalls.
+    """
+    def __init__(
+        self, ctx: PokeBall,
+        interval: float = 0.05,
+        history: int = 1200
+    ):
+        self.ctx = ctx
+        self.logger = self.ctx.logger
+        configs = self.ctx.configs
+        self.threshold = configs.get("loop_lag_threshold_ms", 250) / 1000
+        self.report_interval = configs.get("loop_report_interval", 3600)
+        self.interval = interval
+        self.lags = deque(maxlen=history)
+        self.offenders: Dict[str, Dict] = {}
+        self.stalls = 0
+        self.reported = 0
+        self._beat = time.perf_counter()
+        self._capture: Optional[Tuple[float, str, List[str]]] = None
+        self._loop_ident: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """
+        The monitor is disabled by setting the threshold to 0.
+        """
+        return self.threshold > 0
+
+    def configure_debug(self, loop: asyncio.AbstractEventLoop):
+        """
+        Enables asyncio's own slow callback logging, if configured.
+        """
+        if self.ctx.configs.get("asyncio_debug", False):
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.ctx.configs.get(
+                "slow_callback_ms", 100
+            ) / 1000
+
+    @staticmethod
+    def locate(stack: traceback.StackSummary) -> str:
+        """
+        Returns the innermost frame of the Selfbot in a stack,
+        or the innermost frame if the loop is stuck in a library.
+        """
+        frame = next(
+            (
+                frm for frm in reversed(stack)
+                if os.path.abspath(frm.filename).startswith(ROOT)
+            ),
+            stack[-1]
+        )
+        path = os.path.abspath(frame.filename)
+        if path.startswith(ROOT):
+            path = os.path.relpath(path, ROOT)
+        else:
+            path = os.path.basename(path)
+        return f"{path}:{frame.lineno} in {frame.name}"
+
+    def _watch(self):
+        # Poll fast enough to catch the blocking code while it still runs.
+        poll = min(self.interval, self.threshold / 4)
+        while not self._stop.wait(poll):
+            beat = self._beat
+            if time.perf_counter() - beat < self.interval + self.threshold:
+                continue
+            if self._capture and self._capture[0] == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_ident)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            capture = (beat, self.locate(stack), traceback.format_list(stack[-6:]))
+            with self._lock:
+                self._capture = capture
+
+    def _record(self, beat: float, lag: float):
+        with self._lock:
+            capture = self._capture
+        if capture and capture[0] == beat:
+            _, location, stack = capture
+        else:
+            location, stack = UNATTRIBUTED, []
+        self.stalls += 1
+        offender = self.offenders.setdefault(
+            location, {"count": 0, "total": 0.0, "max": 0.0, "stack": stack}
+        )
+        offender["count"] += 1
+        offender["total"] += lag
+        if lag >= offender["max"]:
+            offender["max"] = lag
+            offender["stack"] = stack or offender["stack"]
+
+    def start_watchdog(self):
+        """
+        Starts the watchdog thread for the current (loop) thread.
+        """
+        self._loop_ident = threading.get_ident()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._watch,
+                name="loop-watchdog",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops the watchdog thread.
+        """
+        self._stop.set()
+
+    def reset(self):
+        """
+        Forgets all the recorded stalls.
+        """
+        self.lags.clear()
+        self.offenders = {}
+        self.stalls = 0
+        self.reported = 0
+
+    def top(self, k: int = 10) -> List[Tuple[str, Dict]]:
+        """
+        Returns the k locations which blocked the loop the longest in total.
+        """
+        return sorted(
+            self.offenders.items(),
+            key=lambda item: item[1]["total"],
+            reverse=True
+        )[:k]
+
+    def recent(self) -> Dict:
+        """
+        Returns the mean, 99th percentile and max of the recent lag samples.
+        """
+        lags = sorted(self.lags)
+        if not lags:
+            return {"mean": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "mean": sum(lags) / len(lags),
+            "p99": lags[min(int(len(lags) * 0.99), len(lags) - 1)],
+            "max": lags[-1]
+        }
+
+    def summary(self, k: int = 5) -> List[str]:
+        """
+        Returns the human readable stats of the loop lag and the top offenders.
+        """
+        recent = self.recent()
+        lines = [
+            f"Loop lag (last {len(self.lags)} beats): "
+            f"mean {recent['mean'] * 1000:.1f} ms, "
+            f"p99 {recent['p99'] * 1000:.1f} ms, "
+            f"max {recent['max'] * 1000:.1f} ms",
+            f"Stalls over {self.threshold * 1000:.0f} ms: {self.stalls}"
+        ]
+        lines.extend(
+            f"{offender['count']}x, {offender['total']:.2f}s total, "
+            f"{offender['max'] * 1000:.0f} ms max - {location}"
+            for location, offender in self.top(k)
+        )
+        return lines
+
+    async def heartbeat(self):
+        """
+        Sleeps for interval seconds in a loop and records how late it woke up.
+        """
+        self.start_watchdog()
+        while True:
+            beat = self._beat = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - beat - self.interval, 0.0)
+            self.lags.append(lag)
+            if lag >= self.threshold:
+                self._record(beat, lag)
+
+    async def reporter(self):
+        """
+        Logs the summary every report_interval seconds, if there were new stalls.
+        """
+        while self.report_interval:
+            await asyncio.sleep(self.report_interval)
+            if self.stalls > self.reported:
+                self.reported = self.stalls
+                self.logger.pprint(
+                    "\n".join(self.summary()),
+                    timestamp=True,
+                    color="yellow"
+                )
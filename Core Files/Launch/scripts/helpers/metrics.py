@@ -0,0 +1,449 @@
+"""
+Prometheus Metrics Exporter
+
+Exposes counters, gauges and histograms of the running bot in the
+Prometheus text format on http://127.0.0.1:<metrics_port>/metrics.
+The HTTP server runs on a daemon thread and only reads the in-memory
+metrics, so a scrape never blocks the Discord event loop.
+Loop side values (lag, tasks, waiters, RSS) are sampled on the loop
+by a lightweight background task.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+from __future__ import annotations
+import asyncio
+import bisect
+import inspect
+import os
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from pokeball import PokeBall
+
+# Latency buckets (in seconds), from a fast cached query to a slow catch.
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(val).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for name, val in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Base class for a labelled metric.
+
+    Attributes
+    ----------
+    name : str
+        the exported metric name.
+    doc : str
+        the HELP text of the metric.
+    labelnames : tuple
+        names of the labels, values are passed positionally.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects the labels {self.labelnames}."
+            )
+        return tuple(str(label) for label in labels)
+
+    def samples(self) -> List[str]:
+        """
+        Returns the sample lines of the metric.
+        """
+        with self._lock:
+            items = list(self.values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {val}"
+            for key, val in items
+        ]
+
+    def render(self) -> List[str]:
+        """
+        Returns the HELP, TYPE and sample lines of the metric.
+        """
+        return [
+            f"# HELP {self.name} {self.doc}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples()
+        ]
+
+
+class Counter(Metric):
+    """
+    A monotonically increasing count.
+    """
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        """
+        Increments the counter for the given label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value which can go up and down.
+    """
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        """
+        Sets the gauge for the given label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Counts observations into cumulative buckets, along with their sum.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labels):
+        """
+        Records an observation for the given label values.
+        """
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self.series.items()
+            ]
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le_val = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(names, key + (le_val,))} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics in registration order and renders all of them.
+    """
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Adds a metric to the registry and returns it.
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns all the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsRouter(BaseHTTPRequestHandler):
+    """
+    Serves the registry of the server on /metrics.
+    """
+    def do_GET(self):
+        """
+        Handles GET requests.
+        """
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # Scrapes would flood the console otherwise.
+        return
+
+
+class MetricsServer(HTTPServer):
+    """
+    HTTP Server bound to localhost, which runs on a daemon thread.
+    """
+    def __init__(self, port: int, registry: MetricsRegistry):
+        super().__init__(("127.0.0.1", port), MetricsRouter)
+        self.registry = registry
+        self.thread = threading.Thread(
+            target=self.serve_forever,
+            name="metrics-server",
+            daemon=True
+        )
+
+    def run(self):
+        """
+        Launches the server in the background.
+        """
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the server and releases the port.
+        """
+        self.shutdown()
+        self.server_close()
+
+
+def instrument(obj, callbacks: List[Callable[[str, float], None]]):
+    """
+    Wraps every public method of an instance (like a DBConnector) to time it.
+    Every callback receives the method name and the seconds it took.
+    Generators are skipped, since their work happens during iteration.
+    """
+    def timed(name, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tstart = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - tstart
+                for callback in callbacks:
+                    callback(name, elapsed)
+        return wrapper
+
+    for name, func in inspect.getmembers(obj, inspect.ismethod):
+        if name.startswith("_") or inspect.isgeneratorfunction(func):
+            continue
+        setattr(obj, name, timed(name, func))
+
+
+def get_rss() -> Optional[int]:
+    """
+    Returns the resident memory of the process in bytes, if available.
+    Uses psutil when installed and falls back to /proc on Linux.
+    """
+    try:
+        import psutil  # pylint: disable=import-outside-toplevel
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", encoding="utf-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class BotMetrics:
+    """The metrics exported by the Pokeball Selfbot.
+
+    Attributes
+    ----------
+    ctx : PokeBall
+        the root class for the Selfbot.
+    registry : MetricsRegistry
+        all the exported metrics.
+    port : int
+        the localhost port to serve on, 0 if disabled.
+
+    Methods
+    -------
+    observe_spawn(spawn)
+        Records the outcome and stage latencies of a spawn.
+
+    observe_db(method, seconds)
+        Records the time taken by a DBConnector method.
+
+    start()
+        Starts the HTTP server if a port is configured.
+
+    [async] sampler()
+        Samples the loop lag, tasks, waiters and RSS.
+
+    stop()
+        Stops the HTTP server.
+    """
+    def __init__(self, ctx: PokeBall, interval: float = 5.0):
+        self.ctx = ctx
+        self.interval = interval
+        self.port = int(self.ctx.configs.get("metrics_port", 0) or 0)
+        self.server: Optional[MetricsServer] = None
+        self.registry = MetricsRegistry()
+        reg = self.registry.register
+        self.spawns = reg(Counter(
+            "pokeball_spawns_total",
+            "Spawns seen by the autocatcher, by outcome.",
+            ("outcome",)
+        ))
+        self.stage_latency = reg(Histogram(
+            "pokeball_autocatcher_stage_seconds",
+            "Latency of every autocatcher stage.",
+            ("stage",)
+        ))
+        self.inference = reg(Histogram(
+            "pokeball_inference_seconds",
+            "Time taken by the detector to predict a spawn."
+        ))
+        self.db_latency = reg(Histogram(
+            "pokeball_db_query_seconds",
+            "Time taken by the DBConnector methods.",
+            ("method",)
+        ))
+        self.loop_lag = reg(Histogram(
+            "pokeball_event_loop_lag_seconds",
+            "Delay of the event loop in waking up a sleeping task.",
+            buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+        ))
+        self.last_lag = reg(Gauge(
+            "pokeball_event_loop_lag_last_seconds",
+            "Most recently sampled event loop lag."
+        ))
+        self.tasks = reg(Gauge(
+            "pokeball_asyncio_tasks",
+            "Number of pending asyncio tasks."
+        ))
+        self.waiters = reg(Gauge(
+            "pokeball_wait_for_waiters",
+            "Number of pending wait_for listeners, by event.",
+            ("event",)
+        ))
+        self.rss = reg(Gauge(
+            "pokeball_resident_memory_bytes",
+            "Resident memory of the process."
+        ))
+
+    def observe_spawn(self, spawn: Dict):
+        """
+        Records the outcome and stage latencies of a finished spawn.
+        """
+        self.spawns.inc(spawn.get("outcome", "skipped"))
+        for stage in ("download", "catch"):
+            if spawn.get(f"{stage}_ms") is not None:
+                self.stage_latency.observe(spawn[f"{stage}_ms"] / 1000, stage)
+        if spawn.get("predict_ms") is not None:
+            self.inference.observe(spawn["predict_ms"] / 1000)
+
+    def observe_db(self, method: str, seconds: float):
+        """
+        Records the time taken by a DBConnector method (see instrument).
+        """
+        self.db_latency.observe(seconds, method)
+
+    def start(self):
+        """
+        Starts the HTTP server on localhost if a port is configured.
+        """
+        if not self.port or self.server is not None:
+            return
+        try:
+            self.server = MetricsServer(self.port, self.registry)
+        except OSError as excp:
+            self.ctx.logger.pprint(
+                f"Unable to start the metrics server on port {self.port}.\n{excp}",
+                timestamp=True,
+                color="red"
+            )
+            return
+        self.server.run()
+        self.ctx.logger.pprint(
+            f"Serving metrics at http://127.0.0.1:{self.port}/metrics",
+            timestamp=True,
+            color="blue"
+        )
+
+    def sample(self, lag: float):
+        """
+        Updates the loop side gauges. Must be called from the event loop.
+        """
+        self.loop_lag.observe(lag)
+        self.last_lag.set(lag)
+        self.tasks.set(len(asyncio.all_tasks()))
+        listeners = getattr(self.ctx, "_listeners", {}) or {}
+        for event in set(listeners) | {
+            key[0] for key in self.waiters.values
+        }:
+            self.waiters.set(len(listeners.get(event, [])), event)
+        rss = get_rss()
+        if rss is not None:
+            self.rss.set(rss)
+
+    async def sampler(self):
+        """
+        Measures how late the loop wakes this task up every interval seconds.
+        """
+        while self.server is not None:
+            tstart = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - tstart - self.interval, 0.0)
+            self.sample(lag)
+
+    def stop(self):
+        """
+        Stops the HTTP server.
+        """
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
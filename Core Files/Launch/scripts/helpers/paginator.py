@@ -6,7 +6,7 @@ Custom Pagination Module for Discord Embeds.
 
 from __future__ import annotations
 import asyncio
-from typing import List, TYPE_CHECKING
+from typing import Awaitable, Callable, List, Optional, TYPE_CHECKING
 
 import discord
 
@@ -31,6 +31,10 @@ class Paginator:
         a list of embeds that need to be paginated
     ctx : Pokeball
         an instance of the main Pokeball class
+    loader : Callable
+        an optional coroutine function which returns the next embed (or None).
+        It is called only when the user pages past the last loaded embed,
+        so that the pages can be fetched lazily.
 
     Methods
     -------
@@ -45,7 +49,10 @@ class Paginator:
         self, message: discord.Message,
         base: discord.Message,
         embeds: List[discord.Embed],
-        ctx: PokeBall
+        ctx: PokeBall,
+        loader: Optional[
+            Callable[[], Awaitable[Optional[discord.Embed]]]
+        ] = None
     ):
         self.message = message
         self.base = base
@@ -53,6 +60,25 @@ class Paginator:
         self.embeds = embeds
         self.cursor = 0
         self.ctx = ctx
+        self.loader = loader
+
+    async def _turn(self, option: int):
+        if all([
+            option == 1,
+            self.cursor == len(self.embeds) - 1,
+            self.loader
+        ]):
+            embed = await self.loader()
+            if embed:
+                self.embeds.append(embed)
+            else:
+                self.loader = None
+        if option == 1 and self.cursor < len(self.embeds) - 1:
+            self.cursor += 1
+            await edit_embed(self.base, embed=self.embeds[self.cursor])
+        elif option == 0 and self.cursor > 0:
+            self.cursor -= 1
+            await edit_embed(self.base, embed=self.embeds[self.cursor])
 
     async def _add_handler(self):
         def reaction_check(reaction, user):
@@ -66,13 +92,7 @@ class Paginator:
             reaction, _ = await discord.Client.wait_for(
                 self.ctx, event='reaction_add', check=reaction_check
             )
-            option = self.pointers.index(reaction.emoji)
-            if option == 1 and self.cursor < len(self.embeds) - 1:
-                self.cursor += 1
-                await edit_embed(self.base, embed=self.embeds[self.cursor])
-            elif option == 0 and self.cursor > 0:
-                self.cursor -= 1
-                await edit_embed(self.base, embed=self.embeds[self.cursor])
+            await self._turn(self.pointers.index(reaction.emoji))
 
     async def _remove_handler(self):
         def reaction_check(reaction, user):
@@ -86,15 +106,7 @@ class Paginator:
             reaction, _ = await discord.Client.wait_for(
                 self.ctx, event='reaction_remove', check=reaction_check
             )
-            option = self.pointers.index(reaction.emoji)
-            if option == 1 and self.cursor < len(self.embeds) - 1:
-                self.cursor += 1
-                await edit_embed(self.base, embed=self.embeds[self.cursor])
-            elif option == 0 and self.cursor > 0:
-                self.cursor -= 1
-                await edit_embed(self.base, embed=self.embeds[self.cursor])
-            else:
-                pass
+            await self._turn(self.pointers.index(reaction.emoji))
 
     async def run(self, content: str = ""):
         """
@@ -0,0 +1,144 @@
+"""
+Fuzz Check and Benchmark for the Command Parser.
+
+Compares the tokenizer based parse_command against the former regex
+based one on random commands they both support, then times both.
+Run it from the Launch folder:
+    python -m scripts.helpers.parserbench --cases 5000
+"""
+
+import argparse
+import random
+import re
+import string
+import time
+from typing import Callable, Dict, List
+
+from .cmdparser import _parse, parse_command
+
+WORDS = [
+    "pikachu", "mr.", "mime", "farfetch'd", "nidoran♀", "porygon2",
+    "10", "3.5", "max", "all", "shiny", "#general", "<@1234>"
+]
+
+
+def legacy_parse_command(prefix: str, msg: str) -> Dict:
+    """The former regex based parser, kept for the comparisons."""
+    non_kwarg_str, *kwarg_str = msg.partition('--')
+    main_sep_patt = (
+        re.escape(prefix) +
+        r'(?:(?P<Command>\S+)\s?)' +
+        r'(?:(?P<Args>.+)\s?)*'
+    )
+    main_parsed_dict = re.search(main_sep_patt, non_kwarg_str).groupdict()
+    if kwarg_str:
+        main_parsed_dict["Kwargs"] = ''.join(kwarg_str)
+    parsed = {
+        'Args': [],
+        'Kwargs': {},
+        'Command': main_parsed_dict["Command"]
+    }
+    if main_parsed_dict["Args"]:
+        parsed["Args"] = main_parsed_dict["Args"].rstrip(' ').split(' ')
+    if main_parsed_dict.get("Kwargs", None):
+        kwarg_patt = r'-{2}(?!-{2})[^-]+'
+        kwargs = [
+            kwarg.rstrip(' ')
+            for kwarg in re.findall(
+                kwarg_patt,
+                main_parsed_dict["Kwargs"]
+            )
+        ]
+        kwarg_dict = {}
+        for kwarg in kwargs:
+            key = kwarg.split(' ')[0].replace('--', '')
+            val = True if len(
+                kwarg.split(' ')
+            ) == 1 else kwarg.replace(f'--{key} ', '')
+            kwarg_dict[key] = val
+        parsed["Kwargs"] = kwarg_dict
+    return parsed
+
+
+def random_command(rng: random.Random, prefix: str) -> str:
+    """
+    Generates a command which the legacy parser handles correctly:
+    single spaces, no quotes/escapes, no dashes and no repeated keys.
+    """
+    def word():
+        if rng.random() < 0.7:
+            return rng.choice(WORDS)
+        return "".join(
+            rng.choice(string.ascii_lowercase + string.digits + "!?.,#@")
+            for _ in range(rng.randint(1, 8))
+        )
+
+    parts = [prefix + rng.choice(["total", "trade", "stats", "c", "help"])]
+    parts.extend(word() for _ in range(rng.randint(0, 4)))
+    keys = rng.sample(["name", "top", "credits", "window", "purge", "table"], rng.randint(0, 3))
+    for key in keys:
+        parts.append(f"--{key}")
+        parts.extend(word() for _ in range(rng.randint(0, 3)))
+    msg = " ".join(parts)
+    if rng.random() < 0.2:
+        msg += " "
+    return msg
+
+
+def fuzz(cases: int = 5000, prefix: str = "$", seed: int = 79) -> List[str]:
+    """
+    Returns the commands for which both the parsers disagree.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(cases):
+        msg = random_command(rng, prefix)
+        if legacy_parse_command(prefix, msg) != parse_command(prefix, msg):
+            mismatches.append(msg)
+    return mismatches
+
+
+def time_parser(func: Callable, msgs: List[str], prefix: str, repeats: int = 5) -> float:
+    """
+    Returns the best time (in microseconds) per command over a few repeats.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        tstart = time.perf_counter()
+        for msg in msgs:
+            func(prefix, msg)
+        best = min(best, time.perf_counter() - tstart)
+    return best / len(msgs) * 1e6
+
+
+def main():
+    """
+    Command line entrypoint for the parser fuzz check and benchmark.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fuzz and benchmark the command parser."
+    )
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=79)
+    parsed = parser.parse_args()
+    mismatches = fuzz(parsed.cases, seed=parsed.seed)
+    print(f"Fuzzed {parsed.cases:,} commands: {len(mismatches)} mismatches.")
+    for msg in mismatches[:10]:
+        print(f"    {msg!r}")
+    rng = random.Random(parsed.seed)
+    unique = [random_command(rng, "$") for _ in range(2000)]
+    repeated = [rng.choice(unique[:20]) for _ in range(2000)]
+    uncached = _parse.__wrapped__
+
+    def tokenizer(prefix, msg):
+        return uncached(prefix, msg, False)
+
+    print(f"{'legacy regex':<24}{time_parser(legacy_parse_command, unique, '$'):>8.2f} us")
+    print(f"{'tokenizer (no cache)':<24}{time_parser(tokenizer, unique, '$'):>8.2f} us")
+    print(f"{'tokenizer (repeated)':<24}{time_parser(parse_command, repeated, '$'):>8.2f} us")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+On-demand CPU and Memory Profiling
+
+The CPU profiler samples the stacks of every thread from a background
+thread and writes them in the collapsed stack format, which can be fed
+to flamegraph.pl or speedscope directly.
+The memory tracker diffs tracemalloc snapshots over time, and
+memory_breakdown estimates the size of the biggest components of the bot.
+"""
+
+# pylint: disable=too-many-instance-attributes
+
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime
+from types import FunctionType, ModuleType
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from pokeball import PokeBall
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _frame_label(code) -> str:
+    path = os.path.abspath(code.co_filename)
+    if path.startswith(ROOT):
+        path = os.path.relpath(path, ROOT)
+    else:
+        path = os.path.basename(path)
+    return f"{code.co_name} ({path})"
+
+
+class SamplingProfiler:
+    """Samples the stacks of all the threads at a fixed interval.
+
+    Attributes
+    ----------
+    interval : float
+        time (in seconds) between two samples.
+    stacks : Counter
+        number of samples per collapsed stack.
+    samples : int
+        number of sampling rounds taken.
+    session : int
+        incremented on every start, so a stale stop can be detected.
+
+    Methods
+    -------
+    start(duration)
+        Starts sampling for at most duration seconds.
+
+    stop(path)
+        Stops sampling and writes the collapsed stacks to a file.
+
+    hottest(k)
+        Returns the k functions with the most samples on top of the stack.
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.session = 0
+        self.started: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether the sampler thread is alive.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def _sample(self):
+        names = {
+            thread.ident: thread.name
+            for thread in threading.enumerate()
+        }
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self, duration: float):
+        deadline = time.perf_counter() + duration
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if time.perf_counter() >= deadline:
+                break
+
+    def start(self, duration: float = 30.0) -> int:
+        """
+        Starts sampling for at most duration seconds and returns the session.
+        """
+        if self.running:
+            raise RuntimeError("The profiler is already running.")
+        self.stacks = Counter()
+        self.samples = 0
+        self.session += 1
+        self.started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(duration,),
+            name="cpu-profiler", daemon=True
+        )
+        self._thread.start()
+        return self.session
+
+    def stop(self, path: str) -> str:
+        """
+        Stops sampling and writes the collapsed stacks to a file.
+        Every line is 'thread;outer;...;inner count'.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.started = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as out_file:
+            out_file.writelines(
+                f"{stack} {count}\n"
+                for stack, count in self.stacks.most_common()
+            )
+        return path
+
+    def hottest(self, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Returns the k functions with the most samples on top of the stack,
+        along with their share of the samples.
+        """
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            (leaf, count / total)
+            for leaf, count in leaves.most_common(k)
+        ]
+
+
+class MemoryTracker:
+    """Takes tracemalloc snapshots and diffs them over time.
+
+    Attributes
+    ----------
+    snapshots : deque
+        (time, snapshot) pairs of the most recent snapshots.
+
+    Methods
+    -------
+    start(frames)
+        Starts tracing the allocations.
+
+    snapshot(k)
+        Takes a snapshot and returns the top allocation sites.
+
+    stop()
+        Stops tracing and drops the snapshots.
+    """
+    def __init__(self, keep: int = 4):
+        self.snapshots = deque(maxlen=keep)
+
+    @staticmethod
+    def tracing() -> bool:
+        """
+        Whether tracemalloc is currently tracing.
+        """
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        """
+        Starts tracing the allocations, storing frames frames per traceback.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def snapshot(self, k: int = 10) -> Dict:
+        """
+        Takes a snapshot and returns the top allocation sites,
+        compared with the previous snapshot if there is one.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Tracing hasn't been started.")
+        snap = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+        ])
+        now = datetime.now()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.snapshots:
+            since, prev = self.snapshots[-1]
+            stats = snap.compare_to(prev, "lineno")
+            top = [
+                (str(stat.traceback[0]), stat.size, stat.size_diff)
+                for stat in stats[:k]
+            ]
+        else:
+            since = None
+            top = [
+                (str(stat.traceback[0]), stat.size, stat.size)
+                for stat in snap.statistics("lineno")[:k]
+            ]
+        self.snapshots.append((now, snap))
+        return {
+            "since": since,
+            "current": current,
+            "peak": peak,
+            "top": top
+        }
+
+    def stop(self):
+        """
+        Stops tracing and drops the snapshots.
+        """
+        self.snapshots.clear()
+        tracemalloc.stop()
+
+
+def format_bytes(num: float) -> str:
+    """
+    Converts a number of bytes into a human readable string.
+    """
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(num) < 1024:
+            return f"{num:,.1f} {unit}"
+        num /= 1024
+    return f"{num:,.1f} GiB"
+
+
+def get_size(obj, exclude: Optional[set] = None, seen: Optional[set] = None) -> int:
+    """
+    Recursively estimates the memory used by an object and its contents.
+    Objects whose ids are in exclude (like the bot itself) are not followed.
+    """
+    exclude = exclude or set()
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or id(item) in exclude:
+            continue
+        if isinstance(item, (type, ModuleType, FunctionType)):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        # Arrays own their buffer (already counted) or are views of another one.
+        if isinstance(item, np.ndarray):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        if hasattr(item, "__dict__"):
+            stack.append(vars(item))
+        for slot in getattr(type(item), "__slots__", ()):
+            if hasattr(item, slot):
+                stack.append(getattr(item, slot))
+    return size
+
+
+def _model_size(model) -> int:
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for tensor in list(model.parameters()) + list(model.buffers())
+    )
+
+
+def memory_breakdown(ctx: PokeBall) -> Dict[str, int]:
+    """
+    Estimates the size (in bytes) of the biggest components of the bot.
+    """
+    # The components all point back to the bot, so those edges aren't followed.
+    exclude = {
+        id(ctx), id(ctx.logger), id(ctx.database),
+        id(ctx.configs), id(ctx.loop)
+    }
+    sizes = {}
+    catcher = getattr(ctx, "catcher", None)
+    if catcher is not None:
+        sizes["Detector Model"] = _model_size(catcher.detector.model)
+    sizes["StatsMonitor"] = get_size(ctx.stats, exclude)
+    sizes["Spawn Buffer"] = get_size(ctx.spawn_recorder.buffer, exclude)
+    sizes["Chart Cache"] = get_size(ctx.charts.cache, exclude)
+    mirror = getattr(ctx.database, "mirror", None)
+    if mirror is not None:
+        sizes["Collection Mirror"] = get_size(mirror, exclude)
+    sizes["Pokenames/Ranks"] = get_size(
+        [ctx.pokenames, ctx.pokeranks, ctx.legendaries], exclude
+    )
+    # discord.py objects reference the whole state, so only shallow sizes are summed.
+    messages = getattr(ctx._connection, "_messages", None) or []  # pylint: disable=protected-access
+    sizes["Message Cache"] = sum(
+        sys.getsizeof(msg) + sys.getsizeof(msg.content)
+        + sum(sys.getsizeof(embed) for embed in msg.embeds)
+        for msg in list(messages)
+    )
+    sizes["Member Cache"] = sum(
+        sys.getsizeof(member)
+        for guild in ctx.guilds
+        for member in guild.members
+    )
+    return sizes
@@ -0,0 +1,209 @@
+"""
+Command Registry Module
+"""
+
+from __future__ import annotations
+import re
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from discord import Embed
+    from ..commands.basecommand import Commands
+
+DOC_PATT = re.compile(
+    r"\$(?P<Syntax>[^\$]+)\$\s+"
+    r"\@(?P<Description>[^\@]+)"
+    r"\@(?:\s+\~(?P<Example>[^\~]+)\~)?"
+)
+
+
+def parse_doc(doc: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Extracts the $Syntax$, @Description@ and ~Example~ sections of a docstring.
+    The {command_prefix} placeholders are kept, since the prefix can change.
+    """
+    if not doc:
+        return None
+    match = DOC_PATT.search(doc)
+    if not match:
+        return None
+    meta = {}
+    for key, val in match.groupdict().items():
+        if val:
+            val = val.replace("  ", " ")
+            val = '\n'.join(
+                line.lstrip()
+                for line in val.split('\n')
+            )
+        meta[key] = val
+    return meta
+
+
+class CommandEntry:
+    """A single command along with its metadata.
+
+    Attributes
+    ----------
+    name : str
+        the command name without the cmd_ prefix.
+    module_type : str
+        the module which defines the command (poke, normal, etc.).
+    method : Callable
+        the bound cmd_ method.
+    aliases : list
+        the alternative names of the command.
+    meta : dict
+        the parsed sections of the docstring, None if undocumented.
+    """
+    __slots__ = ("name", "module_type", "method", "aliases", "meta")
+
+    def __init__(
+        self, name: str, module_type: str,
+        method: Callable, meta: Optional[Dict] = None
+    ):
+        self.name = name
+        self.module_type = module_type
+        self.method = method
+        self.meta = meta
+        self.aliases = [
+            alias.lower()
+            for alias in getattr(method, "alias", [])
+        ]
+
+    @property
+    def disabled(self) -> bool:
+        """
+        Whether the command is under maintenance.
+        """
+        return getattr(self.method, "disabled", False)
+
+    @property
+    def doc(self) -> Optional[str]:
+        """
+        The raw docstring of the command.
+        """
+        return self.method.__doc__
+
+
+class CommandRegistry:
+    """Maps the command names and aliases to the bound methods.
+
+    The mapping is rebuilt whenever a module is (re)loaded or toggled,
+    so dispatching a command is a single dict lookup.
+    Docstrings are parsed once per loaded function, and the rendered
+    help embeds are cached till the next rebuild.
+    Modules from customcommands take precedence over the others,
+    and the real names of the commands take precedence over aliases.
+
+    Attributes
+    ----------
+    modules : dict
+        the loaded command modules by their type.
+    catalog : dict
+        every command of every module (enabled or not) by module type.
+    commands : dict
+        the dispatch table of the enabled commands, by name and alias.
+
+    Methods
+    -------
+    register(module_type, module)
+        Adds or replaces a command module.
+
+    rebuild()
+        Recomputes the catalog and the dispatch table.
+
+    get(name)
+        Returns the enabled command with the name or alias.
+
+    iter_commands(enabled_only)
+        Yields every command once.
+
+    get_embed(key, factory)
+        Returns a copy of a cached embed, rendering it if needed.
+    """
+    def __init__(self):
+        self.modules: Dict[str, Commands] = {}
+        self.catalog: Dict[str, List[CommandEntry]] = {}
+        self.commands: Dict[str, CommandEntry] = {}
+        self.embeds: Dict[Hashable, Embed] = {}
+        self._metas: Dict[Callable, Optional[Dict]] = {}
+
+    def register(self, module_type: str, module: Commands):
+        """
+        Adds or replaces a command module and rebuilds the registry.
+        """
+        self.modules[module_type] = module
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Recomputes the catalog and the dispatch table,
+        then swaps them in at once.
+        """
+        order = sorted(
+            self.modules,
+            key=lambda mtype: (not mtype.startswith("custom"), mtype)
+        )
+        catalog = {}
+        names = {}
+        aliases = {}
+        metas = {}
+        for mtype in order:
+            module = self.modules[mtype]
+            entries = []
+            for attr in dir(type(module)):
+                if not attr.startswith("cmd_"):
+                    continue
+                method = getattr(module, attr)
+                func = getattr(method, "__func__", method)
+                # Reloaded modules bring new functions, so stale docs drop out.
+                if func not in metas:
+                    metas[func] = (
+                        self._metas[func] if func in self._metas
+                        else parse_doc(method.__doc__)
+                    )
+                entries.append(CommandEntry(attr[4:], mtype, method, metas[func]))
+            catalog[mtype] = entries
+            if not module.enabled:
+                continue
+            for entry in entries:
+                names.setdefault(entry.name, entry)
+                for alias in entry.aliases:
+                    aliases.setdefault(alias, entry)
+        for alias, entry in aliases.items():
+            names.setdefault(alias, entry)
+        self.catalog = catalog
+        self.commands = names
+        self._metas = metas
+        self.embeds = {}
+
+    def get(self, name: str) -> Optional[CommandEntry]:
+        """
+        Returns the enabled command with the name or alias.
+        """
+        return self.commands.get((name or "").lower())
+
+    def iter_commands(self, enabled_only: bool = True) -> Iterator[CommandEntry]:
+        """
+        Yields every command once, in the order of precedence.
+        """
+        if enabled_only:
+            seen = set()
+            for entry in self.commands.values():
+                if id(entry) not in seen:
+                    seen.add(id(entry))
+                    yield entry
+            return
+        for entries in self.catalog.values():
+            yield from entries
+
+    def get_embed(self, key: Hashable, factory: Callable[[], Embed]) -> Embed:
+        """
+        Returns a copy of the embed cached under the key,
+        calling the factory to render it on a miss.
+        Keys should include the prefix, as it can change at any time.
+        """
+        if key not in self.embeds:
+            self.embeds[key] = factory()
+        return self.embeds[key].copy()
@@ -0,0 +1,134 @@
+"""
+Spawn History Recorder Module
+"""
+
+from __future__ import annotations
+import asyncio
+import sqlite3
+from collections import deque
+from datetime import datetime
+from typing import Dict, TYPE_CHECKING
+
+import discord
+
+if TYPE_CHECKING:
+    # pylint: disable=cyclic-import
+    from pokeball import PokeBall
+
+
+class SpawnRecorder:
+    """Buffers the spawns seen by the autocatcher and logs them in batches.
+
+    Spawns are appended to a bounded ring buffer, so recording one
+    never touches the disk. A background task flushes the buffer into
+    the spawns table once it holds batch_size spawns or every interval seconds.
+    If the database falls behind, the oldest buffered spawns are dropped.
+
+    Attributes
+    ----------
+    ctx : PokeBall
+        the root class for the Selfbot.
+    buffer : deque
+        the ring buffer of spawns waiting to be flushed.
+    dropped : int
+        number of spawns which were dropped because the buffer was full.
+    flushed : int
+        number of spawns which were written to the database.
+
+    Methods
+    -------
+    new(message)
+        Creates the record for a freshly spawned pokemon.
+
+    record(spawn)
+        Adds a finished spawn record to the buffer.
+
+    flush()
+        Writes all the buffered spawns to the database.
+
+    [async] flusher()
+        Background task which periodically flushes the buffer.
+    """
+    def __init__(
+        self, ctx: PokeBall,
+        capacity: int = 4096,
+        batch_size: int = 64,
+        interval: float = 30.0
+    ):
+        self.ctx = ctx
+        self.logger = self.ctx.logger
+        self.enabled = self.ctx.configs.get("spawn_history", True)
+        self.buffer = deque(maxlen=capacity)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self.flushed = 0
+        self.task = None
+        self._wakeup = asyncio.Event()
+
+    @staticmethod
+    def new(message: discord.Message) -> Dict:
+        """
+        Creates the record for a freshly spawned pokemon.
+        """
+        return {
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "guild_id": message.guild.id,
+            "channel_id": message.channel.id,
+            "image_url": message.embeds[0].image.url
+        }
+
+    def record(self, spawn: Dict):
+        """
+        Adds a finished spawn record to the buffer.
+        Spawns without an outcome are considered to be skipped.
+        """
+        if not self.enabled:
+            return
+        spawn.setdefault("outcome", "skipped")
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(spawn)
+        if len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Writes all the buffered spawns to the database in a single transaction.
+        """
+        batch = []
+        while self.buffer:
+            batch.append(self.buffer.popleft())
+        if not batch:
+            return 0
+        try:
+            self.flushed += self.ctx.database.insert_spawns(batch)
+        except sqlite3.Error as excp:
+            self.dropped += len(batch)
+            self.logger.pprint(
+                f"Unable to log {len(batch)} spawns to the database.\n{excp}",
+                timestamp=True,
+                color="red"
+            )
+            return 0
+        return len(batch)
+
+    def start(self):
+        """
+        Starts the background flusher if it's not already running.
+        """
+        if self.enabled and (self.task is None or self.task.done()):
+            self.task = self.ctx.loop.create_task(self.flusher())
+
+    async def flusher(self):
+        """
+        Flushes the buffer every interval seconds,
+        or as soon as it holds a full batch.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self.flush()
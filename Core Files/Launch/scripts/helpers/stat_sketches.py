@@ -0,0 +1,246 @@
+"""
+Compact Streaming Accumulators for the StatsMonitor.
+"""
+
+import heapq
+import random
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ConfidenceTracker:
+    """Streaming per-species statistics of the prediction confidence.
+
+    Every species gets an integer code and its statistics live in
+    preallocated NumPy arrays at that index, which grow geometrically.
+    The mean and variance are updated using Welford's algorithm
+    and the quantiles are estimated from a fixed-bin histogram sketch,
+    so memory doesn't depend on the number of samples.
+
+    Attributes
+    ----------
+    names : list
+        the species name for every code.
+    count : np.ndarray
+        number of samples per species.
+    mean : np.ndarray
+        running mean per species.
+    minimum : np.ndarray
+        lowest confidence seen per species.
+    maximum : np.ndarray
+        highest confidence seen per species.
+
+    Methods
+    -------
+    update(name, conf)
+        Adds a confidence sample for a species.
+
+    get(name)
+        Returns all the statistics of a species.
+
+    quantile(name, quant)
+        Estimates a quantile of the confidence of a species.
+
+    lowest(k)
+        Returns the k species with the lowest mean confidence.
+    """
+    def __init__(self, bins: int = 50, capacity: int = 1024):
+        self.bins = bins
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.mean = np.zeros(capacity, dtype=np.float64)
+        self.m2 = np.zeros(capacity, dtype=np.float64)
+        self.minimum = np.ones(capacity, dtype=np.float32)
+        self.maximum = np.zeros(capacity, dtype=np.float32)
+        self.hist = np.zeros((capacity, bins), dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        return name.title() in self.codes
+
+    def _code(self, name: str) -> int:
+        name = name.title()
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+            if code >= self.count.size:
+                self._grow(self.count.size * 2)
+        return code
+
+    def _grow(self, capacity: int):
+        for attr, fill in [
+            ("count", 0), ("mean", 0), ("m2", 0),
+            ("minimum", 1), ("maximum", 0), ("hist", 0)
+        ]:
+            old = getattr(self, attr)
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:old.shape[0]] = old
+            setattr(self, attr, new)
+
+    def update(self, name: str, conf: float):
+        """
+        Adds a confidence sample (between 0 and 1) for a species.
+        """
+        conf = min(max(float(conf), 0.0), 1.0)
+        code = self._code(name)
+        self.count[code] += 1
+        delta = conf - self.mean[code]
+        self.mean[code] += delta / self.count[code]
+        self.m2[code] += delta * (conf - self.mean[code])
+        self.minimum[code] = min(self.minimum[code], conf)
+        self.maximum[code] = max(self.maximum[code], conf)
+        self.hist[code, min(int(conf * self.bins), self.bins - 1)] += 1
+
+    def get_mean(self, name: str) -> float:
+        """
+        Returns the mean confidence of a species (0.0 if never seen).
+        """
+        code = self.codes.get(name.title())
+        return 0.0 if code is None else float(self.mean[code])
+
+    def quantile(self, name: str, quant: float) -> Optional[float]:
+        """
+        Estimates a quantile of the confidence of a species
+        by interpolating inside the histogram bins.
+        """
+        code = self.codes.get(name.title())
+        if code is None or self.count[code] == 0:
+            return None
+        hist = self.hist[code]
+        cumulative = np.cumsum(hist)
+        target = quant * cumulative[-1]
+        idx = int(np.searchsorted(cumulative, target))
+        idx = min(idx, self.bins - 1)
+        below = cumulative[idx - 1] if idx > 0 else 0
+        frac = (target - below) / hist[idx] if hist[idx] else 0.0
+        estimate = (idx + frac) / self.bins
+        return float(min(max(estimate, self.minimum[code]), self.maximum[code]))
+
+    def get(self, name: str) -> Optional[Dict]:
+        """
+        Returns count, mean, std, min, max, p10 and p50 for a species.
+        """
+        code = self.codes.get(name.title())
+        if code is None or self.count[code] == 0:
+            return None
+        count = int(self.count[code])
+        return {
+            "count": count,
+            "mean": float(self.mean[code]),
+            "std": float(np.sqrt(self.m2[code] / count)),
+            "min": float(self.minimum[code]),
+            "max": float(self.maximum[code]),
+            "p10": self.quantile(name, 0.1),
+            "p50": self.quantile(name, 0.5)
+        }
+
+    def lowest(self, k: int = 25) -> List[Tuple[str, float]]:
+        """
+        Returns the k species with the lowest mean confidence,
+        using a bounded heap instead of sorting all of them.
+        """
+        size = len(self.names)
+        seen = np.flatnonzero(self.count[:size])
+        return [
+            (self.names[code], mean)
+            for mean, code in heapq.nsmallest(
+                k, zip(self.mean[seen].tolist(), seen.tolist())
+            )
+        ]
+
+
+class MissReservoir:
+    """Bounded storage of the mispredicted image urls.
+
+    Every species keeps a uniform random sample of at most `cap` urls
+    (reservoir sampling), while the exact miss counts are kept separately.
+    The species with the most misses are indexed incrementally,
+    so listing them never sorts the whole map.
+
+    Attributes
+    ----------
+    cap : int
+        maximum number of urls sampled per species.
+    counts : Counter
+        exact number of misses per species.
+    on_evict : Callable
+        optional callback receiving (name, url) for every dropped url.
+
+    Methods
+    -------
+    add(name, url)
+        Records a mispredicted url for a species.
+
+    samples(name)
+        Returns the sampled urls of a species.
+
+    top(k)
+        Returns the species with the most misses.
+    """
+    def __init__(
+        self, cap: int = 10, top_k: int = 25,
+        on_evict: Optional[Callable[[str, str], None]] = None,
+        seed: Optional[int] = None
+    ):
+        self.cap = max(1, int(cap))
+        self.top_k = top_k
+        self.on_evict = on_evict
+        self.counts = Counter()
+        self.reservoirs: Dict[str, List[str]] = {}
+        self.leaders: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+
+    def __len__(self):
+        return len(self.reservoirs)
+
+    def add(self, name: str, url: str):
+        """
+        Records a mispredicted url for a species.
+        Once the reservoir is full, the url replaces a random sample
+        with probability cap / misses, keeping the sample uniform.
+        """
+        name = name.title()
+        self.counts[name] += 1
+        seen = self.counts[name]
+        reservoir = self.reservoirs.setdefault(name, [])
+        evicted = None
+        if len(reservoir) < self.cap:
+            reservoir.append(url)
+        else:
+            idx = self._rng.randrange(seen)
+            if idx < self.cap:
+                evicted, reservoir[idx] = reservoir[idx], url
+            else:
+                evicted = url
+        if evicted is not None and self.on_evict:
+            self.on_evict(name, evicted)
+        self._update_leaders(name, seen)
+
+    def _update_leaders(self, name: str, count: int):
+        if name in self.leaders or len(self.leaders) < self.top_k:
+            self.leaders[name] = count
+            return
+        # Counts only grow, so a newcomer only has to beat the weakest leader.
+        weakest = min(self.leaders, key=self.leaders.get)
+        if count > self.leaders[weakest]:
+            del self.leaders[weakest]
+            self.leaders[name] = count
+
+    def samples(self, name: str) -> List[str]:
+        """
+        Returns the sampled urls of a species.
+        """
+        return list(self.reservoirs.get(name.title(), []))
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Returns (name, misses) of the species with the most misses.
+        """
+        k = min(k or self.top_k, self.top_k)
+        return heapq.nlargest(k, self.leaders.items(), key=lambda x: x[1])
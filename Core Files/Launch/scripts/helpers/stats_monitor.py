@@ -6,37 +6,69 @@ Autocatcher Statistics Monitor Module
 
 from __future__ import annotations
 import asyncio
-from datetime import datetime
+import sqlite3
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
 from functools import partial
-from typing import List, TYPE_CHECKING
+from typing import Dict, Optional, TYPE_CHECKING
 
+from .stat_sketches import ConfidenceTracker, MissReservoir
 from .utils import get_formatted_time
 
 if TYPE_CHECKING:
     # pylint: disable=cyclic-import
     from pokeball import PokeBall
 
+METRICS = ("spawns", "catches", "misses")
+
+# Sliding windows (in seconds) for the recent rates.
+WINDOWS = {"5m": 300, "1h": 3600, "24h": 86400}
+
 
 class StatsMonitor:
     """
     The stats monitor class
     Metrics:
         Catches, Spawns, Misses
+    Every metric is a Counter of names along with its running total
+    and its current leader, so totals and most_* never scan the history.
+    Events are also counted in per-minute buckets covering the largest
+    window, which back the sliding-window rates and keep memory bounded.
+    Checkpoints are persisted to the database, so the totals and the recent
+    buckets get rehydrated after a restart.
     """
     def __init__(
         self, ctx: PokeBall,
-        *args, **kwargs
+        *args, bucket_size: int = 60,
+        max_checkpoints: int = 2016,
+        rehydrate: bool = True,
+        **kwargs
     ):
         self.ctx = ctx
         self.logger = self.ctx.logger
+        self.database = getattr(self.ctx, "database", None)
         self.start_time = datetime.now()
-        self.spawns = []
-        self.catches = []
-        self.misses = []
-        self.checkpoints = {}
-        self.confidence_map = {}
-        self.misses_map = {}
-        for iterable in ["spawns", "catches", "misses"]:
+        self.bucket_size = bucket_size
+        self.prior_duration = 0.0
+        self.spawns = Counter()
+        self.catches = Counter()
+        self.misses = Counter()
+        self.totals = {metric: 0 for metric in METRICS}
+        self.leaders = {metric: (None, 0) for metric in METRICS}
+        self.buckets = {
+            metric: deque(maxlen=max(WINDOWS.values()) // bucket_size + 1)
+            for metric in METRICS
+        }
+        self.checkpoints = {
+            key: deque(maxlen=max_checkpoints)
+            for key in ("duration",) + METRICS
+        }
+        self.confidence = ConfidenceTracker()
+        self.missed_urls = MissReservoir(
+            cap=self.ctx.configs.get("misses_sample_size", 10)
+        )
+        for iterable in METRICS:
             mapper = {
                 f"{iterable}_rate": partial(self.get_rate, iterable, **kwargs),
                 f"update_{iterable}": partial(self.update, iterable, *args),
@@ -45,58 +77,126 @@ class StatsMonitor:
             }
             for key, val in mapper.items():
                 setattr(self, key, val)
+        if rehydrate and self.database is not None:
+            self._rehydrate()
+        self.persisted = {"duration": 0.0, **self.totals}
+
+    def _rehydrate(self):
+        """
+        Restores the totals, the uptime and the last 24 hrs of buckets
+        from the persisted checkpoints.
+        """
+        try:
+            totals = self.database.get_stats_totals()
+            recent = self.database.get_stats_history(
+                start=(
+                    datetime.now() - timedelta(seconds=max(WINDOWS.values()))
+                ).strftime("%Y-%m-%d %H:%M:%S"),
+                points=max(WINDOWS.values()) // self.bucket_size
+            )
+        except sqlite3.Error:
+            return
+        self.prior_duration = float(totals["duration"])
+        for metric in METRICS:
+            self.totals[metric] = int(totals[metric])
+        for row in recent:
+            bucket = int(
+                datetime.strptime(
+                    row["ts"], "%Y-%m-%d %H:%M:%S"
+                ).timestamp() // self.bucket_size
+            )
+            for metric in METRICS:
+                if row[metric]:
+                    self.buckets[metric].append([bucket, row[metric]])
 
-    def calc_rate(self, metric: List[str], unit: str = "sec"):
+    def calc_rate(
+        self, count: int, unit: str = "sec",
+        window: Optional[float] = None
+    ):
         """
-        Calculate metric per unit time.
+        Calculate count per unit time.
+        If a window (in seconds) is provided, the count is
+        considered to be spread over that window instead of the uptime.
         Time unit defaults to seconds.
         """
         curr_time = datetime.now()
         time_diff = (curr_time - self.start_time).total_seconds()
-        rate = len(metric) / time_diff
+        time_diff += self.prior_duration
+        if window:
+            time_diff = min(time_diff, window)
+        rate = count / max(time_diff, 1)
         if unit.lower() in {"hr", "hour"}:
             rate = rate * 3600
         elif unit.lower() in {"min", "minute"}:
             rate = rate * 60
         return rate
 
-    def get_rate(self, iterable: List, **kwargs):
+    def get_rate(self, iterable: str, **kwargs):
         """
         Readable wrapper for calc_rate.
+        A window like "5m", "1h" or "24h" can be provided for a recent rate.
         """
-        metric = getattr(self, iterable)
         unit = kwargs.get("unit", "sec")
-        rate = self.calc_rate(metric, unit=unit)
+        window = kwargs.get("window", None)
+        if window:
+            count = self.window_total(iterable, WINDOWS[window])
+            rate = self.calc_rate(count, unit=unit, window=WINDOWS[window])
+        else:
+            rate = self.calc_rate(self.total(iterable), unit=unit)
         return f"{rate:2.2f} {iterable}/{unit}"
 
-    def update(self, iterable: List[str], elem: str):
+    def update(self, iterable: str, elem: str):
         """
-        Adds the element to the given metric iterable.
+        Counts the element for the given metric.
         """
-        getattr(self, iterable).append(elem)
+        counter = getattr(self, iterable)
+        counter[elem] += 1
+        self.totals[iterable] += 1
+        # Counts only ever increase, so the leader can be tracked incrementally.
+        if counter[elem] > self.leaders[iterable][1]:
+            self.leaders[iterable] = (elem, counter[elem])
+        bucket = int(time.time() // self.bucket_size)
+        buckets = self.buckets[iterable]
+        if buckets and buckets[-1][0] == bucket:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([bucket, 1])
 
-    def total(self, iterable: List[str]):
+    def total(self, iterable: str):
         """
         Computes the total for a metric.
         """
-        return len(getattr(self, iterable))
+        return self.totals[iterable]
+
+    def window_total(self, iterable: str, window: float):
+        """
+        Computes the total for a metric over the last window seconds.
+        """
+        oldest = int((time.time() - window) // self.bucket_size)
+        count = 0
+        for bucket, bucket_count in reversed(self.buckets[iterable]):
+            if bucket <= oldest:
+                break
+            count += bucket_count
+        return count
+
+    def window_rates(self, iterable: str, unit: str = "min") -> Dict[str, str]:
+        """
+        Returns the rates of a metric over all the sliding windows.
+        """
+        return {
+            window: self.get_rate(iterable, unit=unit, window=window)
+            for window in WINDOWS
+        }
 
-    def most(self, iterable: List):
+    def most(self, iterable: str):
         """
         Returns the most common element in the metric.
         """
-        metric = getattr(self, iterable)
-        try:
-            most = sorted(
-                metric,
-                key=metric.count,
-                reverse=True
-            )[0]
-            if metric.count(most) < 2:
-                return "None"
-            return f"{most}({metric.count(most)} times)"
-        except IndexError:
+        most, count = self.leaders[iterable]
+        if most is None or count < 2:
             return "None"
+        return f"{most}({count} times)"
 
     def elapsed(self):
         """
@@ -104,7 +204,7 @@ class StatsMonitor:
         """
         try:
             elapsed = self.checkpoints["duration"][-1]
-        except IndexError:
+        except (IndexError, KeyError):
             elapsed = 0
         return f"Time Elapsed: {get_formatted_time(elapsed)}"
 
@@ -112,42 +212,56 @@ class StatsMonitor:
         """
         Returns the Catches vs Spawns Ratio
         """
-        if len(self.spawns) <= 0:
+        if self.total("spawns") <= 0:
             return "No spawns yet"
 
-        acc = (len(self.catches) / len(self.spawns)) * 100
+        acc = (self.total("catches") / self.total("spawns")) * 100
         return f"{acc:.2f}%"
 
+    @property
+    def confidence_map(self) -> Dict[str, float]:
+        """
+        The mean confidence of every caught pokemon.
+        """
+        return {
+            name: self.confidence.get_mean(name)
+            for name in self.confidence.names
+        }
+
     def get_confidence(self, name: str):
         """
         Get the average confidence for a particular pokemon.
         """
-        return self.confidence_map.get(name.title(), 0.0)
+        return self.confidence.get_mean(name)
 
     def update_confidence(self, name: str, conf: float):
         """
-        Update the confidence for a particular pokemon.
+        Update the confidence statistics for a particular pokemon.
         """
-        if not self.confidence_map.get(name.title(), False):
-            self.confidence_map[name.title()] = conf
-        else:
-            avg = (self.confidence_map[name.title()] + conf) / 2
-            self.confidence_map.update({name.title(): avg})
+        self.confidence.update(name, conf)
+
+    @property
+    def misses_map(self) -> Dict[str, list]:
+        """
+        The sampled image urls of every mis-predicted pokemon.
+        """
+        return {
+            name: list(urls)
+            for name, urls in self.missed_urls.reservoirs.items()
+        }
 
     def get_misses_urls(self, name: str):
         """
-        Returns a list of image urls per mis-predicted pokemon.
+        Returns a sample of image urls per mis-predicted pokemon.
         """
-        return self.misses_map.get(name.title(), [])
+        return self.missed_urls.samples(name)
 
     def update_misses_urls(self, name: str, url: str):
         """
-        Updates the list of image urls for a mis-predicted pokemon.
+        Samples the image url for a mis-predicted pokemon.
+        Every url is also logged in the spawn history along with the outcome.
         """
-        if not self.get_misses_urls(name):
-            self.misses_map[name.title()] = [url]
-        else:
-            self.misses_map[name.title()].append(url)
+        self.missed_urls.add(name, url)
 
     def checkpoint(self):
         """
@@ -160,21 +274,40 @@ class StatsMonitor:
             color="blue",
             timestamp=True
         )
-        if not self.checkpoints:
-            self.checkpoints = {"duration": [elapsed]}
-            self.checkpoints.update({
-                iterable: [self.total(iterable)]
-                for iterable in ["spawns", "catches", "misses"]
-            })
-        else:
-            self.checkpoints["duration"].append(elapsed)
-            for iterable in ["spawns", "catches", "misses"]:
-                self.checkpoints[iterable].append(self.total(iterable))
+        self.checkpoints["duration"].append(elapsed)
+        for iterable in METRICS:
+            self.checkpoints[iterable].append(self.total(iterable))
+        self.persist(elapsed)
+
+    def persist(self, elapsed: float):
+        """
+        Saves the stats collected since the previous checkpoint to the database
+        and downsamples the older checkpoints.
+        """
+        if self.database is None:
+            return
+        current = {"duration": elapsed, **self.totals}
+        deltas = {
+            key: current[key] - self.persisted[key]
+            for key in current
+        }
+        try:
+            self.database.insert_stats_checkpoint(**deltas)
+            self.database.downsample_stats()
+        except sqlite3.Error as excp:
+            self.logger.pprint(
+                f"Unable to persist the stats checkpoint.\n{excp}",
+                color="red",
+                timestamp=True
+            )
+            return
+        self.persisted = current
 
     async def checkpointer(self, duration: int = 300):
         """
         Asynchronous handler for stats monitor checkpointing.
         """
-        while self.ctx.autocatcher_enabled:
+        # Stops once this monitor gets replaced (by a reset for example).
+        while self.ctx.autocatcher_enabled and self.ctx.stats is self:
             self.checkpoint()
             await asyncio.sleep(duration)
@@ -11,7 +11,6 @@ import html
 import inspect
 import json
 import random
-import re
 from abc import ABC
 from datetime import datetime
 from itertools import chain
@@ -27,6 +26,11 @@ import numpy as np
 from discord import Embed
 from discord.embeds import EmbedProxy
 
+from ..base.dbtool import format_report, run_idle_maintenance
+from .cmdparser import parse_command  # noqa: F401 pylint: disable=unused-import
+from .jobs import ResumedMessage
+from .listing_parser import iter_pokemons, parse_pokemon_line
+
 if TYPE_CHECKING:
     # pylint: disable=cyclic-import
     from pokeball import PokeBall
@@ -298,8 +302,22 @@ def typowrite(pokename: str, typo_rate: int) -> str:
     return name
 
 
+def _categorize(ctx: PokeBall, row: Dict) -> Dict:
+    # Replaces the shiny flag of a parsed row with its logging category.
+    category = "common"
+    if row["name"] in ctx.priority_names:
+        category = "priority"
+    if row["name"] in ctx.legendaries:
+        category = "legendary"
+    if row.pop("shiny"):
+        category = "shiny"
+    row["category"] = category
+    return row
+
+
 def log_formatter(ctx: PokeBall, pokemon: str) -> Dict:
-    """ Converts a line from Poketwo's pokemon list to a dictionary."""
+    """ Converts a line from Poketwo's pokemon list to a dictionary.
+    Raises ValueError if the line isn't one."""
     if ctx.configs["clone_id"] != 716390085896962058:
         return {
             "name": None,
@@ -310,29 +328,38 @@ def log_formatter(ctx: PokeBall, pokemon: str) -> Dict:
             "nickname": None
         }
 
-    bad_chars = [r'\\xa0+', r'\*+', r'•+', r'<+.+>+\s', r'\s\s+', '♂', '♀️']
-    pokeline = pokemon.replace(':heart:', '')
-    for char in bad_chars:
-        pokeline = re.sub(char, " ", pokeline)
-    patt = r"`?\s?(\d+)`?\s(?:(✨)\s)?([\w\s\'\.\-:%]+)(?:\"(.+)\")?" + \
-        r"(?:\s.+)?\sLvl\.\s(\d+)\s(\d+\.?\d+)%"
-    searched = re.search(patt, pokeline)
-    name = searched.group(3).title().strip()
-    category = "common"
-    if name in ctx.configs["priority"]:
-        category = "priority"
-    if name in ctx.legendaries:
-        category = "legendary"
-    if searched.group(2):
-        category = "shiny"
-    return {
-            "name": name,
-            "pokeid": int(searched.group(1)),
-            "level": int(searched.group(5)),
-            "iv": float(searched.group(6)) or 0.0,
-            "category": category,
-            "nickname": searched.group(4) or None
-        }
+    row = parse_pokemon_line(pokemon)
+    if row is None:
+        raise ValueError(f"Not a line of the pokemon list: {pokemon!r}")
+    return _categorize(ctx, row)
+
+
+def log_skipped(ctx: PokeBall, skipped: List[str]):
+    """ Warns about the listing lines which couldn't be parsed."""
+    for line in skipped:
+        ctx.logger.pprint(
+            f"Skipped an unreadable listing line: {line}",
+            timestamp=True,
+            color="yellow"
+        )
+
+
+def log_formatter_bulk(ctx: PokeBall, description: str) -> List[Dict]:
+    """ Converts the lines of a pokemon list embed to dictionaries.
+    Lines which don't parse are skipped with a warning, like in the market listings.
+    Use the raw line count (not the rows) to tell if a page was the last one."""
+    if ctx.configs["clone_id"] != 716390085896962058:
+        return [
+            log_formatter(ctx, pokemon)
+            for pokemon in description.splitlines()
+        ]
+    skipped = []
+    rows = [
+        _categorize(ctx, row)
+        for row in iter_pokemons(description, skipped)
+    ]
+    log_skipped(ctx, skipped)
+    return rows
 
 
 async def sleep_handler(ctx: PokeBall):
@@ -415,6 +442,63 @@ async def sleep_handler(ctx: PokeBall):
         ctx.sleep = False
 
 
+async def db_maintainer(ctx: PokeBall):
+    """Runs the cheap database maintenance steps during idle periods.
+    A full vacuum is only done while sleeping and if the DB is fragmented.
+    The steps run in an executor, on a connection of their own."""
+    interval = float(ctx.configs.get("db_maintenance_interval", 21600))
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        while ctx.catching and not ctx.sleep:
+            await asyncio.sleep(1)
+        try:
+            report = await ctx.loop.run_in_executor(
+                None, run_idle_maintenance,
+                ctx.database.db_path, ctx.sleep
+            )
+        except Exception as excp:  # pylint: disable=broad-except
+            ctx.logger.pprint(
+                f"Database maintenance failed.\n{excp}",
+                timestamp=True,
+                color="red"
+            )
+            continue
+        ctx.logger.pprint(
+            "Database maintenance done.\n" + "\n".join(format_report(report)),
+            timestamp=True,
+            color="blue"
+        )
+
+
+async def pokelog_checker(ctx: PokeBall):
+    """Periodically syncs the pokelog in the active channel, if enabled.
+    The incremental sync compares the count and the latest number with Poketwo,
+    a mismatch is only reported (relogging is left to the pokelog command)."""
+    interval = float(ctx.configs.get("pokelog_check_interval", 0))
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        while ctx.catching or ctx.sleep:
+            await asyncio.sleep(5)
+        if not ctx.active_channels or ctx.database.get_total() == 0:
+            continue
+        chan = ctx.active_channels[-1]
+        try:
+            await ctx.pokecommands.check_pokelog(
+                message=ResumedMessage(chan, ctx.user),
+                chan=chan
+            )
+        except Exception as excp:  # pylint: disable=broad-except
+            ctx.logger.pprint(
+                f"Pokelog consistency check failed.\n{excp}",
+                timestamp=True,
+                color="red"
+            )
+
+
 async def get_message(sess: aiohttp.ClientSession) -> str:
     """Randomly retrieves text from one of the authless text APIs."""
     async def sv443():
@@ -545,44 +629,6 @@ async def get_message(sess: aiohttp.ClientSession) -> str:
     return html.unescape(msg)
 
 
-def parse_command(prefix: str, msg: str) -> Dict:
-    """Parses a message to obtain the command, args and kwargs."""
-    non_kwarg_str, *kwarg_str = msg.partition('--')
-    main_sep_patt = (
-        re.escape(prefix) +
-        r'(?:(?P<Command>\S+)\s?)' +
-        r'(?:(?P<Args>.+)\s?)*'
-    )
-    main_parsed_dict = re.search(main_sep_patt, non_kwarg_str).groupdict()
-    if kwarg_str:
-        main_parsed_dict["Kwargs"] = ''.join(kwarg_str)
-    parsed = {
-        'Args': [],
-        'Kwargs': {},
-        'Command': main_parsed_dict["Command"]
-    }
-    if main_parsed_dict["Args"]:
-        parsed["Args"] = main_parsed_dict["Args"].rstrip(' ').split(' ')
-    if main_parsed_dict.get("Kwargs", None):
-        kwarg_patt = r'-{2}(?!-{2})[^-]+'
-        kwargs = [
-            kwarg.rstrip(' ')
-            for kwarg in re.findall(
-                kwarg_patt,
-                main_parsed_dict["Kwargs"]
-            )
-        ]
-        kwarg_dict = {}
-        for kwarg in kwargs:
-            key = kwarg.split(' ')[0].replace('--', '')
-            val = True if len(
-                kwarg.split(' ')
-            ) == 1 else kwarg.replace(f'--{key} ', '')
-            kwarg_dict[key] = val
-        parsed["Kwargs"] = kwarg_dict
-    return parsed
-
-
 # pylint: disable=too-many-arguments
 async def wait_for(
     chan: discord.TextChannel,
@@ -693,16 +739,9 @@ def get_rand_headers() -> Dict:
 
 def get_modules(ctx: PokeBall) -> List[Callable]:
     """
-    Returns a list of all the commands.
+    Returns a list of all the command modules.
     """
-    return [
-        getattr(ctx, comtype)
-        for comtype in dir(ctx)
-        if all([
-            comtype.endswith('commands'),
-            comtype != "load_commands"
-        ])
-    ]
+    return list(ctx.registry.modules.values())
 
 
 async def send_embed(